@@ -0,0 +1,262 @@
+# agregador_contadores.py
+"""
+Agregador write-behind para los contadores de recetas (views, popup_clicks, likes).
+
+Los endpoints solo anotan el incremento en memoria. Un hilo vacía el buffer cada
+CONTADORES_INTERVALO segundos (o antes, si hay CONTADORES_MAX_PENDIENTES recetas
+pendientes) con un batch de Firestore y un solo _bulk de updates parciales a
+OpenSearch. Los incrementos van a un shard al azar de cada receta (ver
+contadores_distribuidos.py); el documento de la receta solo recibe los demás campos
+(p. ej. liked_by). En OpenSearch, además de los contadores, se actualiza la
+tendencia de cada receta (ver senales_popularidad.py). Al apagar la app se vacía lo que quede.
+"""
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from firebase_admin import firestore
+from google.api_core.exceptions import NotFound
+from contadores_distribuidos import ContadoresDistribuidos
+from scripts.firestore_to_opensearch import ALIAS_RECETAS, indexar_en_bulk
+from senales_popularidad import TENDENCIA_INTERVALO_DECAIMIENTO, accion_senales, ahora_ms, decaer_tendencias
+
+CONTADORES_INTERVALO = float(os.getenv('CONTADORES_INTERVALO', 2))
+CONTADORES_MAX_PENDIENTES = int(os.getenv('CONTADORES_MAX_PENDIENTES', 200))
+FIRESTORE_MAX_BATCH = 500  # límite de escrituras por batch de Firestore
+
+class AgregadorContadores:
+
+    def __init__(self, db, index_name=ALIAS_RECETAS, intervalo=CONTADORES_INTERVALO,
+                 max_pendientes=CONTADORES_MAX_PENDIENTES, contadores=None,
+                 intervalo_decaimiento=TENDENCIA_INTERVALO_DECAIMIENTO):
+        self.db = db
+        self.contadores = contadores or ContadoresDistribuidos(db)
+        self.index_name = index_name
+        self.intervalo = intervalo
+        self.max_pendientes = max_pendientes
+        self.intervalo_decaimiento = intervalo_decaimiento
+        self.al_vaciar = []              # hooks que reciben los ids de receta vaciados
+        self.al_modificar_recetas = []   # hooks con los ids cuyo documento de receta cambió (p. ej. liked_by)
+        self.al_cambiar_likes = []       # hooks con los ids cuyo contador de likes cambió
+
+        self._lock = threading.Lock()
+        self._incrementos = defaultdict(Counter)  # receta_id -> {campo: delta}
+        self._campos = defaultdict(dict)          # receta_id -> {campo: valor} (p. ej. liked_by.uid)
+        self._vistas_usuario = defaultdict(set)   # uid -> {receta_id}
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._ultimo_decaimiento = time.monotonic()
+
+    # ---------------------
+    # Escritura en memoria (lo único que hace el request)
+    # ---------------------
+
+    def incrementar(self, receta_id, **deltas):
+        with self._lock:
+            self._incrementos[receta_id].update(deltas)
+            pendientes = len(self._incrementos)
+        if pendientes >= self.max_pendientes:
+            self._despertar.set()
+
+    def actualizar_campos(self, receta_id, campos):
+        with self._lock:
+            self._campos[receta_id].update(campos)
+
+    def registrar_vista(self, uid, receta_id):
+        with self._lock:
+            self._vistas_usuario[uid].add(receta_id)
+
+    def pendiente(self, receta_id, campo):
+        """
+        Delta de `campo` que todavía no se escribió en Firestore.
+        """
+        with self._lock:
+            deltas = self._incrementos.get(receta_id)
+            return deltas[campo] if deltas else 0
+
+    # ---------------------
+    # Vaciado
+    # ---------------------
+
+    def _tomar_pendientes(self):
+        with self._lock:
+            pendientes = (self._incrementos, self._campos, self._vistas_usuario)
+            self._incrementos = defaultdict(Counter)
+            self._campos = defaultdict(dict)
+            self._vistas_usuario = defaultdict(set)
+        return pendientes
+
+    def _devolver_pendientes(self, incrementos, campos, vistas_usuario):
+        """
+        Si Firestore falló, los cambios vuelven al buffer para el próximo vaciado.
+        """
+        with self._lock:
+            for receta_id, deltas in incrementos.items():
+                self._incrementos[receta_id].update(deltas)
+            for receta_id, valores in campos.items():
+                self._campos[receta_id] = {**valores, **self._campos[receta_id]}
+            for uid, recetas in vistas_usuario.items():
+                self._vistas_usuario[uid] |= recetas
+
+    def _escrituras_firestore(self, incrementos, campos, vistas_usuario, num_shards):
+        for receta_id, deltas in incrementos.items():
+            if num_shards.get(receta_id):
+                yield "shard", receta_id, (num_shards[receta_id], deltas)
+        for receta_id, cambios in campos.items():
+            if cambios:
+                yield "update", self.db.collection("recetas").document(receta_id), cambios
+        for uid, recetas in vistas_usuario.items():
+            yield "set", self.db.collection("usuarios").document(uid), {"vistas": firestore.ArrayUnion(sorted(recetas))}
+
+    def _commit(self, escrituras):
+        batch = self.db.batch()
+        for operacion, referencia, cambios in escrituras:
+            if operacion == "shard":
+                self.contadores.escribir_incrementos(batch, referencia, *cambios)
+            elif operacion == "set":
+                batch.set(referencia, cambios, merge=True)
+            else:
+                batch.update(referencia, cambios)
+        batch.commit()
+
+    @staticmethod
+    def _clave_escritura(escritura):
+        operacion, referencia, _ = escritura
+        return operacion, referencia if operacion == "shard" else referencia.id
+
+    def _escribir_firestore(self, escrituras, confirmadas):
+        """
+        Devuelve los ids de las recetas que no existen (sus cambios se descartan).
+        Va anotando en `confirmadas` las (operacion, id) ya commiteadas o descartadas,
+        así si un lote posterior falla solo vuelve al buffer lo que no se escribió.
+        """
+        descartadas = set()
+        for inicio in range(0, len(escrituras), FIRESTORE_MAX_BATCH):
+            lote = escrituras[inicio:inicio + FIRESTORE_MAX_BATCH]
+            try:
+                self._commit(lote)
+            except NotFound:
+                # Una receta inexistente hace fallar todo el batch: se reintenta de a una
+                for escritura in lote:
+                    try:
+                        self._commit([escritura])
+                    except NotFound:
+                        print(f"⚠️ Receta {escritura[1].id} no existe, se descartan sus contadores.")
+                        descartadas.add(escritura[1].id)
+                    confirmadas.add(self._clave_escritura(escritura))
+            else:
+                confirmadas.update(self._clave_escritura(escritura) for escritura in lote)
+        return descartadas
+
+    def _enviar_opensearch(self, incrementos):
+        ahora = ahora_ms()
+        acciones = (
+            accion_senales(self.index_name, receta_id, deltas, ahora)
+            for receta_id, deltas in incrementos.items()
+            if any(deltas.values())
+        )
+        _, errores = indexar_en_bulk(acciones, workers=1)
+        if errores:
+            print(f"⚠️ {len(errores)} contadores no se pudieron actualizar en OpenSearch: {errores[:5]}")
+
+    def vaciar(self):
+        incrementos, campos, vistas_usuario = self._tomar_pendientes()
+        if not (incrementos or campos or vistas_usuario):
+            return []
+
+        descartadas, confirmadas = set(), set()
+        try:
+            # Un get_all (cacheado) da el número de shards y descarta las recetas inexistentes
+            num_shards = self.contadores.configuracion([r for r, d in incrementos.items() if any(d.values())])
+            descartadas = {receta_id for receta_id, n in num_shards.items() if n is None}
+            for receta_id in sorted(descartadas):
+                print(f"⚠️ Receta {receta_id} no existe, se descartan sus contadores.")
+            vistas_validas = {uid: recetas - descartadas for uid, recetas in vistas_usuario.items()}
+            vistas_validas = {uid: recetas for uid, recetas in vistas_validas.items() if recetas}
+            escrituras = list(self._escrituras_firestore(incrementos, campos, vistas_validas, num_shards))
+            descartadas |= self._escribir_firestore(escrituras, confirmadas)
+        except Exception as e:
+            print(f"⚠️ Error escribiendo contadores en Firestore, se reintenta en el próximo vaciado: {e}")
+            # Los lotes que ya se commitearon no vuelven al buffer: se escribirían dos veces
+            self._devolver_pendientes(
+                {r: d for r, d in incrementos.items()
+                 if any(d.values()) and r not in descartadas and ("shard", r) not in confirmadas},
+                {r: c for r, c in campos.items() if c and ("update", r) not in confirmadas},
+                {u: v for u, v in vistas_usuario.items() if ("set", u) not in confirmadas},
+            )
+            incrementos = {r: d for r, d in incrementos.items() if ("shard", r) in confirmadas}
+            campos = {r: c for r, c in campos.items() if ("update", r) in confirmadas}
+            if not (incrementos or campos):
+                return []
+
+        # Firestore es la fuente de verdad; si OpenSearch falla, lo corrige el próximo reindexado
+        for receta_id in descartadas:
+            incrementos.pop(receta_id, None)
+            campos.pop(receta_id, None)
+        for receta_id, deltas in incrementos.items():
+            self.contadores.sumar_en_cache(receta_id, deltas)
+        try:
+            self._enviar_opensearch(incrementos)
+        except Exception as e:
+            print(f"⚠️ Error actualizando contadores en OpenSearch: {e}")
+
+        if campos:
+            self._avisar(sorted(campos), self.al_modificar_recetas)
+        con_likes = sorted(receta_id for receta_id, deltas in incrementos.items() if deltas.get("likes"))
+        if con_likes:
+            self._avisar(con_likes, self.al_cambiar_likes)
+        recetas = sorted(set(incrementos) | set(campos))
+        self._avisar(recetas)
+        return recetas
+
+    def _avisar(self, recetas, hooks=None):
+        for hook in self.al_vaciar if hooks is None else hooks:
+            try:
+                hook(recetas)
+            except Exception as e:
+                print(f"⚠️ Error en un hook de vaciado de contadores: {e}")
+
+    # ---------------------
+    # Hilo de fondo
+    # ---------------------
+
+    def decaer(self):
+        """
+        Decae la tendencia de las recetas sin actividad reciente y avisa a los hooks.
+        """
+        self._ultimo_decaimiento = time.monotonic()
+        try:
+            actualizadas = decaer_tendencias(self.index_name)
+        except Exception as e:
+            print(f"⚠️ Error decayendo tendencias en OpenSearch: {e}")
+            return 0
+        if actualizadas:
+            self._avisar([])
+        return actualizadas
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            self.vaciar()
+            if self.intervalo_decaimiento and time.monotonic() - self._ultimo_decaimiento >= self.intervalo_decaimiento:
+                self.decaer()
+
+    def iniciar(self):
+        if self._hilo is None:
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="agregador-contadores", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        """
+        Para el hilo y vacía lo pendiente (se llama al apagar la app).
+        """
+        if self._hilo is not None:
+            self._detener.set()
+            self._despertar.set()
+            self._hilo.join()
+            self._hilo = None
+        self.vaciar()
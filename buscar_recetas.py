@@ -1,5 +1,18 @@
-from opensearch_client import client
-import string
+from opensearch_client import client, async_client
+from cache_lru import CacheLRU
+from constructor_consultas import ConstructorConsultas
+from senales_popularidad import FUNCION_TENDENCIA
+from consultas_frecuentes import consultas_frecuentes
+from motor_local import respaldo_local
+from normalizacion import limpiar_consulta
+from despensa import terminos_despensa, construir_cuerpo_despensa, cobertura
+from resiliencia import circuito_opensearch, es_falla_de_cluster, CircuitoAbierto, llamar, llamar_con_circuito, preferencia_de, OPENSEARCH_DEADLINE, CERRADO
+from opensearchpy import exceptions
+from functools import lru_cache
+import asyncio
+import base64
+import json
+import os
 
 # Configuración (igual que en tu otro código)
 OPENSEARCH_HOST = "localhost"
@@ -7,6 +20,57 @@ OPENSEARCH_PORT = 9200
 OPENSEARCH_USER = "admin"
 OPENSEARCH_PASS = "admin"
 
+# Cache de resultados de /buscar (clave: consulta normalizada + size)
+CACHE_BUSQUEDAS_MAX = int(os.getenv("CACHE_BUSQUEDAS_MAX", 1000))
+CACHE_BUSQUEDAS_TTL = float(os.getenv("CACHE_BUSQUEDAS_TTL", 60))
+
+cache_busquedas = CacheLRU(max_entradas=CACHE_BUSQUEDAS_MAX, ttl=CACHE_BUSQUEDAS_TTL)
+# Los resultados del motor local se cachean poco, para volver pronto a OpenSearch
+CACHE_RESPALDO_TTL = float(os.getenv("CACHE_RESPALDO_TTL", 5))
+
+# Paginación: from/size hasta BUSQUEDA_MAX_DESDE resultados, después search_after + PIT
+BUSQUEDA_MAX_SIZE = int(os.getenv("BUSQUEDA_MAX_SIZE", 50))
+BUSQUEDA_MAX_DESDE = int(os.getenv("BUSQUEDA_MAX_DESDE", 100))
+PIT_KEEP_ALIVE = os.getenv("BUSQUEDA_PIT_KEEP_ALIVE", "5m")
+
+# texto: búsqueda full-text con sinónimos; despensa: por cobertura de ingredientes (ver despensa.py)
+MODOS_BUSQUEDA = ("texto", "despensa")
+
+# Campos que puede devolver /buscar (con su valor por defecto) y proyecciones predefinidas.
+# contenido_total solo sirve para buscar, nunca se pide a OpenSearch.
+CAMPOS_RESPUESTA = {
+    "titulo": "",
+    "descripcion": "",
+    "imagen_final_url": "",
+    "calorias": 0,
+    "tiempoPreparacion": "",
+    "porciones": 1,
+    "ingrediente_principal": "",
+    "ingredientes": [],
+    "pasos": [],
+    "likes": 0,
+    "popup_clicks": 0,
+    "views": 0,
+    "liked_by": [],  # si lo estás usando en tu lógica de likes
+}
+VISTAS = {
+    "full": tuple(CAMPOS_RESPUESTA),
+    "card": ("titulo", "descripcion", "imagen_final_url", "calorias", "tiempoPreparacion",
+             "porciones", "likes", "popup_clicks"),
+    "ids": (),
+}
+
+# Campos de la respuesta que se leen de otro campo del _source
+CAMPOS_FUENTE = {"pasos": "pasos_detalle"}
+
+# Cuerpos de búsqueda ya serializados y plantilla guardada (BUSQUEDA_USAR_PLANTILLA=1)
+CACHE_CUERPOS_MAX = int(os.getenv("CACHE_CUERPOS_MAX", 2048))
+BUSQUEDA_USAR_PLANTILLA = os.getenv("BUSQUEDA_USAR_PLANTILLA", "0") == "1"
+PLANTILLA_BUSQUEDA_ID = "recetas_busqueda"
+
+RESCORE_VENTANA_MIN = 50
+RESCORE_PESO_FRASE = 1.8
+
 
 SINONIMOS_INGREDIENTES = {
     "pollo": ["gallina", "ave"],
@@ -28,32 +92,45 @@ SINONIMOS_INGREDIENTES = {
 }
 
 def expandir_con_sinonimos(query):
-    palabras = query.lower().split()
-    consulta_expandida = []
-    
-    for palabra in palabras:
-        sinonimos = SINONIMOS_INGREDIENTES.get(palabra, [])
-        # Incluye la palabra original + sus sinónimos
-        palabras_para_buscar = [palabra] + sinonimos
-        
-        # Por cada palabra + sinónimos hacemos una consulta tipo should (OR)
-        consulta_expandida.append({
-            "multi_match": {
-                "query": " ".join(palabras_para_buscar),
-                "fields": ["titulo^3", "ingredientes_texto^2", "descripcion", "pasos", "contenido_total"],
-                "fuzziness": "AUTO",
-                "operator": "or"
-            }
-        })
-    
-    return {
-        "bool": {
-            "must": consulta_expandida
+    """
+    Un must por término de la consulta, con el término + sus sinónimos.
+    Los términos pueden ser frases de varias palabras ("diente de ajo"); ver ConstructorConsultas.
+    """
+    return constructor_consultas.expandir(query)
+
+CAMPOS_BUSQUEDA = ["titulo^3", "ingredientes_texto^2", "descripcion", "pasos", "contenido_total"]
+
+
+def _consulta_frase(query, boost=None):
+    frase = {
+        "multi_match": {
+            "query": query,
+            "fields": CAMPOS_BUSQUEDA,
+            "type": "phrase",
+            "slop": 3
         }
     }
+    if boost:
+        frase["multi_match"]["boost"] = boost
+    return frase
+
 
-def buscar_recetas(query, index="recetas", size=5, return_hits=False):
+def construir_cuerpo_busqueda(query, desde=0, size=5, search_after=None, pit_id=None, campos=None):
+    """
+    Cuerpo de búsqueda para una página. Sin pit_id se pagina con from/size y el
+    rescore cubre toda la página; con pit_id se pagina con search_after.
+    `campos` limita el _source a lo que se va a devolver (() = solo ids).
+    """
+    campos = VISTAS["full"] if campos is None else campos
     query_expandida = expandir_con_sinonimos(query)
+    if pit_id:
+        # rescore no se puede combinar con sort, así que la frase exacta pasa a ser un should
+        query_expandida = {
+            "bool": {
+                "must": [query_expandida],
+                "should": [_consulta_frase(query, boost=RESCORE_PESO_FRASE)]
+            }
+        }
 
     body = {
     "query": {
@@ -75,73 +152,160 @@ def buscar_recetas(query, index="recetas", size=5, return_hits=False):
                         "modifier": "log1p",
                         "missing": 0
                     }
-                }
+                },
+                FUNCION_TENDENCIA  # actividad reciente con decaimiento (ver senales_popularidad.py)
             ],
             "score_mode": "sum",
             "boost_mode": "sum"
         }
     },
-    "rescore": {  # opcional, mantiene coincidencias exactas
-        "window_size": 50,
-        "query": {
-            "rescore_query": {
-                "multi_match": {
-                    "query": query,
-                    "fields": ["titulo^3", "ingredientes_texto^2", "descripcion", "pasos", "contenido_total"],
-                    "type": "phrase",
-                    "slop": 3
-                }
-            },
-            "query_weight": 0.7,
-            "rescore_query_weight": 1.8
-        }
-    },
-    "size": 10
+    "size": size,
+    "_source": [CAMPOS_FUENTE.get(c, c) for c in campos] if campos else False
 }
 
+    if pit_id:
+        body["pit"] = {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE}
+        body["sort"] = [{"_score": "desc"}, {"_id": "asc"}]  # _id desempata para search_after
+        if search_after:
+            body["search_after"] = search_after
+    else:
+        body["from"] = desde
+        body["rescore"] = {  # opcional, mantiene coincidencias exactas
+            "window_size": max(RESCORE_VENTANA_MIN, desde + size),
+            "query": {
+                "rescore_query": _consulta_frase(query),
+                "query_weight": 0.7,
+                "rescore_query_weight": RESCORE_PESO_FRASE
+            }
+        }
+    return body
+
 
-    response = client.search(index=index, body=body, size=size)
-    hits = response.get("hits", {}).get("hits", [])
+@lru_cache(maxsize=CACHE_CUERPOS_MAX)
+def cuerpo_busqueda_json(query, desde=0, size=5, campos=None):
+    """
+    Cuerpo de búsqueda ya serializado. Las consultas repetidas no vuelven a
+    construir ni serializar el dict (opensearch-py envía el str tal cual).
+    """
+    return json.dumps(construir_cuerpo_busqueda(query, desde=desde, size=size, campos=campos))
+
+
+# ---------------------
+# Plantilla de búsqueda guardada en OpenSearch (search template)
+# ---------------------
+
+def plantilla_busqueda():
+    """
+    Fuente mustache de la plantilla, generada a partir de construir_cuerpo_busqueda
+    para que nunca se desincronice del cuerpo normal. Con la plantilla guardada,
+    por la red solo viajan los parámetros.
+    """
+    body = construir_cuerpo_busqueda("__FRASE__", desde=0, size=1, campos=("__FUENTE__",))
+    body["query"]["function_score"]["query"] = {"bool": {"must": "__CLAUSULAS__"}}
+    body["from"] = "__DESDE__"
+    body["size"] = "__SIZE__"
+    body["_source"] = "__FUENTE__"
+    body["rescore"]["window_size"] = "__VENTANA__"
+
+    clausula = json.dumps(constructor_consultas._clausula(("__TEXTO__", ()))).replace('"__TEXTO__"', '"{{texto}}"')
+    fuente = json.dumps(body)
+    for marca, mustache in {
+        '"__CLAUSULAS__"': "[{{#clausulas}}" + clausula + "{{#sep}},{{/sep}}{{/clausulas}}]",
+        '"__FRASE__"': '"{{frase}}"',
+        '"__DESDE__"': "{{desde}}",
+        '"__SIZE__"': "{{size}}",
+        '"__VENTANA__"': "{{ventana}}",
+        '"__FUENTE__"': "{{#toJson}}fuente{{/toJson}}",
+    }.items():
+        fuente = fuente.replace(marca, mustache)
+    return fuente
+
+
+def registrar_plantilla_busqueda():
+    client.put_script(id=PLANTILLA_BUSQUEDA_ID, body={
+        "script": {"lang": "mustache", "source": plantilla_busqueda()}
+    })
+    print(f"✅ Plantilla de búsqueda '{PLANTILLA_BUSQUEDA_ID}' registrada.")
+
+
+def parametros_plantilla(query, desde=0, size=5, campos=None):
+    campos = VISTAS["full"] if campos is None else campos
+    terminos = constructor_consultas.segmentar(query)
+    return {
+        "clausulas": [
+            # El mismo texto que la cláusula de expandir_con_sinonimos
+            {"texto": constructor_consultas.clausula(termino)["multi_match"]["query"], "sep": i < len(terminos) - 1}
+            for i, termino in enumerate(terminos)
+        ],
+        "frase": query,
+        "desde": desde,
+        "size": size,
+        "ventana": max(RESCORE_VENTANA_MIN, desde + size),
+        "fuente": [CAMPOS_FUENTE.get(c, c) for c in campos] if campos else False,
+    }
+
+
+def _pasos_como_lista(pasos_raw):
+    if isinstance(pasos_raw, list):
+        return pasos_raw
+    if isinstance(pasos_raw, str):
+        lineas = [linea.strip() for linea in pasos_raw.split('.') if linea.strip()]
+        return [
+            {"descripcion": linea, "imagen_url": "", "orden": idx + 1}
+            for idx, linea in enumerate(lineas)
+        ]
+    return []
 
+
+def procesar_hits(hits, campos=None):
+    """
+    Arma la respuesta de cada hit con los campos pedidos (todos si campos es None).
+    Los pasos vienen ya estructurados en pasos_detalle; solo los índices viejos
+    sin ese campo caen al texto partido por puntos.
+    """
+    campos = VISTAS["full"] if campos is None else campos
     recetas = []
     for hit in hits:
-        source = hit["_source"]
-
-        pasos_raw = source.get("pasos", "")
-        pasos_lista = []
-
-        if isinstance(pasos_raw, str):
-            lineas = [linea.strip() for linea in pasos_raw.split('.') if linea.strip()]
-            pasos_lista = [
-                {"descripcion": linea, "imagen_url": "", "orden": idx + 1}
-                for idx, linea in enumerate(lineas)
-            ]
-        elif isinstance(pasos_raw, list):
-            pasos_lista = pasos_raw
-
-        recetas.append({
-            "id": hit["_id"],
-            "titulo": source.get("titulo", ""),
-            "descripcion": source.get("descripcion", ""),
-            "imagen_final_url": source.get("imagen_final_url", ""),
-            "calorias": source.get("calorias", 0),
-            "tiempoPreparacion": source.get("tiempoPreparacion", ""),
-            "porciones": source.get("porciones", 1),
-            "ingrediente_principal": source.get("ingrediente_principal", ""),
-            "ingredientes": source.get("ingredientes", []),
-            "pasos": pasos_lista,
-            "likes": source.get("likes", 0),
-            "popup_clicks": source.get("popup_clicks", 0),
-            "liked_by": source.get("liked_by", [])  # si lo estás usando en tu lógica de likes
-        })
+        source = hit.get("_source") or {}
+        receta = {"id": hit["_id"]}
+        for campo in campos:
+            if campo == "pasos":
+                pasos = source.get("pasos_detalle")
+                receta["pasos"] = pasos if pasos is not None else _pasos_como_lista(source.get("pasos", ""))
+            else:
+                receta[campo] = source.get(campo, CAMPOS_RESPUESTA[campo])
+        recetas.append(receta)
+    return recetas
+
+
+def resolver_campos(vista="full", fields=None):
+    """
+    Campos a devolver según la vista ("card", "full") o una lista fields="a,b,c".
+    Lanza ValueError si se pide un campo que no existe.
+    """
+    if fields:
+        campos = tuple(dict.fromkeys(c.strip() for c in fields.split(",") if c.strip()))
+        desconocidos = [c for c in campos if c not in CAMPOS_RESPUESTA]
+        if desconocidos:
+            raise ValueError(f"Campos desconocidos: {', '.join(desconocidos)}")
+        return campos
+    if vista not in VISTAS:
+        raise ValueError(f"Vista desconocida: {vista}")
+    return VISTAS[vista]
 
 
+def buscar_recetas(query, index="recetas", size=5, return_hits=False, desde=0, campos=None):
+    body = cuerpo_busqueda_json(query, desde, size, campos)
+
+    response = client.search(index=index, body=body, request_timeout=OPENSEARCH_DEADLINE)
+    hits = response.get("hits", {}).get("hits", [])
+    recetas = procesar_hits(hits, campos)
 
     if return_hits:
         return recetas
 
     if not hits:
-        print("No se encontraron recetas para la búsqueda:", query_expandida)
+        print("No se encontraron recetas para la búsqueda:", expandir_con_sinonimos(query))
         return
 
     for receta in recetas:
@@ -150,43 +314,371 @@ def buscar_recetas(query, index="recetas", size=5, return_hits=False):
         print(f"Descripción: {receta['descripcion']}")
         print(f"Pasos: {receta['pasos']}")
         print("-" * 40)
-        
 
 
+async def buscar_en_opensearch_async(query, index="recetas", size=5, desde=0, campos=None):
+    """
+    Con plazo, reintentos y hedged requests, detrás del circuit breaker (ver resiliencia.py).
+    """
+    if BUSQUEDA_USAR_PLANTILLA:
+        body = {"id": PLANTILLA_BUSQUEDA_ID, "params": parametros_plantilla(query, desde, size, campos)}
+        operacion = lambda copia: async_client.search_template(index=index, body=body,
+                                                               preference=preferencia_de(copia))
+    else:
+        body = cuerpo_busqueda_json(query, desde, size, campos)
+        operacion = lambda copia: async_client.search(index=index, body=body, preference=preferencia_de(copia))
+    response = await llamar_con_circuito(circuito_opensearch, operacion, "search")
+    return procesar_hits(response.get("hits", {}).get("hits", []), campos)
+
+
+def buscar_en_motor_local(query, size=5, desde=0, campos=None):
+    hits = respaldo_local.buscar(constructor_consultas.segmentar(query), size=size, desde=desde)
+    return procesar_hits(hits, campos)
+
+
+async def buscar_con_respaldo_async(query, index="recetas", size=5, desde=0, campos=None):
+    """
+    Busca en OpenSearch detrás del circuit breaker; si el cluster falla o el
+    circuito está abierto, responde el motor local. Devuelve (resultados, de_respaldo).
+    """
+    try:
+        return await buscar_en_opensearch_async(query, index, size, desde, campos), False
+    except CircuitoAbierto:
+        if not respaldo_local.disponible:
+            raise CircuitoAbierto("OpenSearch no está disponible y el motor local no tiene snapshot")
+    except Exception as e:
+        if not es_falla_de_cluster(e) or not respaldo_local.disponible:
+            raise
+        print(f"⚠️ OpenSearch falló ({e}); se responde con el motor local.")
+    return buscar_en_motor_local(query, size, desde, campos), True
+
+
+async def buscar_recetas_async(query, index="recetas", size=5, desde=0, campos=None):
+    """
+    Versión async de buscar_recetas(..., return_hits=True) sobre AsyncOpenSearch,
+    con el motor local como respaldo.
+    """
+    resultados, _ = await buscar_con_respaldo_async(query, index, size, desde, campos)
+    return resultados
+
+
+# ---------------------
+# Paginación profunda (search_after + point in time)
+# ---------------------
+
+def codificar_cursor(query, pit_id, search_after):
+    datos = json.dumps({"q": query, "pit": pit_id, "after": search_after})
+    return base64.urlsafe_b64encode(datos.encode("utf-8")).decode("ascii")
+
+
+def decodificar_cursor(cursor):
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datos["q"], datos["pit"], datos["after"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Cursor inválido")
+
+
+async def buscar_pagina_profunda_async(query, size=5, cursor=None, index="recetas", campos=None):
+    """
+    Página siguiente a `cursor` (o la primera, abriendo un point in time nuevo).
+    Cada página cuesta lo mismo que la primera porque search_after no recorre
+    las anteriores. Devuelve (query_filtrada, resultados, siguiente_cursor).
+    """
+    if cursor:
+        texto_filtrado, pit_id, search_after = decodificar_cursor(cursor)
+    else:
+        texto_filtrado = limpiar_stopwords(query)
+        respuesta_pit = await llamar_con_circuito(
+            circuito_opensearch,
+            lambda copia: async_client.create_point_in_time(index=index, keep_alive=PIT_KEEP_ALIVE),
+            "create_point_in_time", idempotente=False
+        )
+        pit_id, search_after = respuesta_pit["pit_id"], None
+
+    body = construir_cuerpo_busqueda(texto_filtrado, size=size, search_after=search_after,
+                                     pit_id=pit_id, campos=campos)
+    # Sin hedge: el PIT ya fija los shards que se leen
+    response = await llamar_con_circuito(circuito_opensearch, lambda copia: async_client.search(body=body),
+                                         "search_pit", hedge_despues=0)
+    hits = response.get("hits", {}).get("hits", [])
+    pit_id = response.get("pit_id", pit_id)
+
+    if len(hits) < size:
+        # Última página: se libera el PIT en vez de esperar a que expire
+        try:
+            await llamar_con_circuito(
+                circuito_opensearch,
+                lambda copia: async_client.delete_point_in_time(body={"pit_id": [pit_id]}),
+                "delete_point_in_time", reintentos=0, hedge_despues=0
+            )
+        except Exception as e:
+            print(f"⚠️ No se pudo cerrar el PIT: {e}")
+        siguiente_cursor = None
+    else:
+        siguiente_cursor = codificar_cursor(texto_filtrado, pit_id, hits[-1]["sort"])
+
+    return texto_filtrado, procesar_hits(hits, campos), siguiente_cursor
+
 
 def limpiar_stopwords(texto):
-    texto = texto.lower()
-    texto = texto.translate(str.maketrans('', '', string.punctuation))
-
-    stopwords = {
-        "Quiero","quiero", "una", "unas", "un", "unos",
-        "que", "ke",  
-        "tenga", "tengo", "tienes", "tiene", "tener",
-        "reseta", "receta", 
-        "el", "la", "los", "las",
-        "y", "o", "u",
-        "de", "del", "en", "con", "para", "por", "se", "al", "a", "mi", "tu", "su",
-        "como", "más", "menos", "sin", "pero", "si",
-        "me", "te", "le", "lo", "nos", "os", "les",
-        "este", "esta", "estos", "estas",
-        "es", "son", "fue", "era", "ser",
-        "hoy", "ahora",
-        "durante",
-        "desde", "hasta",
-        "antes", "después", "luego",
-        "también",
-        "algo",
-        "mucho", "muchos", "poco", "pocos",
-        "cada",
-        "todos", "todas",
-        "donde",
-        "cuando",
-        "cual", "cuales",
-        "porque", "por qué"
+    """
+    Consulta normalizada igual que los documentos del índice (ver normalizacion.py) y sin stopwords.
+    """
+    return limpiar_consulta(texto)
+
+def normalizar_consulta(texto):
+    return " ".join(texto.lower().split())
+
+
+async def buscar_recetas_cacheado_async(query, size=5, desde=0, campos=None):
+    """
+    Devuelve (query_filtrada, resultados, de_respaldo); de_respaldo indica que
+    los resultados vienen del motor local y no se deben cachear fuera del proceso.
+    """
+    clave = (normalizar_consulta(query), size, desde, campos)
+    faltante = object()
+    valor = cache_busquedas.obtener(clave, faltante)
+    if valor is faltante:
+        texto_filtrado = limpiar_stopwords(query)
+        resultados, de_respaldo = await buscar_con_respaldo_async(texto_filtrado, size=size, desde=desde, campos=campos)
+        valor = texto_filtrado, resultados, de_respaldo
+        cache_busquedas.guardar(clave, valor, ttl=CACHE_RESPALDO_TTL if de_respaldo else None)
+    return valor
+
+
+# ---------------------
+# Modo despensa: recetas que se pueden cocinar con los ingredientes de la consulta
+# ---------------------
+
+async def buscar_despensa_async(query, index="recetas", size=5, desde=0, campos=None):
+    """
+    Ranking por cobertura de la despensa (ver despensa.py). `query` va sin limpiar:
+    las comas separan ingredientes. Cada resultado trae además "cobertura" (0 a 1)
+    e "ingredientes_faltantes".
+    """
+    campos = VISTAS["full"] if campos is None else campos
+    candidatos, cantidad = terminos_despensa(query, constructor_consultas.segmentar)
+    if not candidatos:
+        return []
+    fuente = [CAMPOS_FUENTE.get(c, c) for c in campos] + ["ingredientes_claves"]
+    body = json.dumps(construir_cuerpo_despensa(candidatos, cantidad, desde, size, fuente))
+
+    response = await llamar_con_circuito(
+        circuito_opensearch,
+        lambda copia: async_client.search(index=index, body=body, preference=preferencia_de(copia)),
+        "search_despensa"
+    )
+
+    hits = response.get("hits", {}).get("hits", [])
+    resultados = procesar_hits(hits, campos)
+    candidatos = set(candidatos)
+    for receta, hit in zip(resultados, hits):
+        claves = (hit.get("_source") or {}).get("ingredientes_claves", [])
+        receta["cobertura"], receta["ingredientes_faltantes"] = cobertura(claves, candidatos)
+    return resultados
+
+
+async def buscar_despensa_cacheado_async(query, size=5, desde=0, campos=None):
+    clave = ("despensa", normalizar_consulta(query), size, desde, campos)
+    valor = cache_busquedas.obtener(clave)
+    if valor is None:
+        texto_filtrado = limpiar_stopwords(query)
+        valor = texto_filtrado, await buscar_despensa_async(query, size=size, desde=desde, campos=campos)
+        cache_busquedas.guardar(clave, valor)
+    return valor
+
+
+async def buscar_paginado_async(query, size=5, pagina=1, cursor=None, paginacion_profunda=False, campos=None,
+                                modo="texto"):
+    """
+    Punto de entrada común de /buscar y /buscar_ids.
+    Las páginas poco profundas van por from/size (y por el cache); con cursor o
+    paginacion_profunda=True se usa search_after. Lanza ValueError si la página
+    pedida con from/size pasa de BUSQUEDA_MAX_DESDE.
+    modo="despensa" busca por ingredientes disponibles (solo con from/size).
+    "de_respaldo" es True si respondió el motor local (ver motor_local.py).
+    """
+    if modo not in MODOS_BUSQUEDA:
+        raise ValueError(f"Modo desconocido: {modo}")
+    if modo == "despensa":
+        if cursor or paginacion_profunda:
+            raise ValueError("El modo despensa no admite paginacion_profunda")
+        desde = (pagina - 1) * size
+        if desde + size > BUSQUEDA_MAX_DESDE:
+            raise ValueError(f"Con pagina/size solo se llega a {BUSQUEDA_MAX_DESDE} resultados")
+        texto_filtrado, resultados = await buscar_despensa_cacheado_async(query, size=size, desde=desde, campos=campos)
+        return {"query_filtrada": texto_filtrado, "resultados": resultados, "siguiente_cursor": None,
+                "de_respaldo": False}
+
+    de_respaldo = False
+    if cursor or paginacion_profunda:
+        texto_filtrado, resultados, siguiente_cursor = await buscar_pagina_profunda_async(
+            query, size=size, cursor=cursor, campos=campos
+        )
+    else:
+        desde = (pagina - 1) * size
+        if desde + size > BUSQUEDA_MAX_DESDE:
+            raise ValueError(
+                f"Con pagina/size solo se llega a {BUSQUEDA_MAX_DESDE} resultados; usá paginacion_profunda=true"
+            )
+        consultas_frecuentes.registrar(normalizar_consulta(query), size, desde, campos)  # para el calentamiento
+        texto_filtrado, resultados, de_respaldo = await buscar_recetas_cacheado_async(
+            query, size=size, desde=desde, campos=campos
+        )
+        siguiente_cursor = None
+
+    return {
+        "query_filtrada": texto_filtrado,
+        "resultados": resultados,
+        "siguiente_cursor": siguiente_cursor,
+        "de_respaldo": de_respaldo
     }
-    palabras = texto.split()
-    palabras_filtradas = [p for p in palabras if p not in stopwords]
-    return " ".join(palabras_filtradas)
+
+
+async def buscar_multi_async(consultas, campos=None, index="recetas"):
+    """
+    Varias búsquedas en un solo _msearch (o _msearch/template), con el mismo
+    cuerpo que /buscar. `consultas` es una lista de (query, size, pagina).
+    Las que ya están en cache no viajan (cada clave se busca una sola vez en el
+    cache). Devuelve una lista en el mismo orden con {query_filtrada, resultados}
+    o {error} por consulta.
+    """
+    claves, valores, pendientes = [], {}, {}
+    for query, size, pagina in consultas:
+        desde = (pagina - 1) * size
+        if desde + size > BUSQUEDA_MAX_DESDE:
+            raise ValueError(
+                f"Con pagina/size solo se llega a {BUSQUEDA_MAX_DESDE} resultados; usá paginacion_profunda=true"
+            )
+        clave = (normalizar_consulta(query), size, desde, campos)
+        consultas_frecuentes.registrar(*clave)
+        claves.append(clave)
+        if clave in valores or clave in pendientes:
+            continue
+        valor = cache_busquedas.obtener(clave)
+        if valor is None:
+            pendientes[clave] = limpiar_stopwords(query)
+        else:
+            valores[clave] = valor
+
+    errores = {}
+    if pendientes:
+        lineas = []
+        for (_, size, desde, _), texto_filtrado in pendientes.items():
+            lineas.append(json.dumps({"index": index}))
+            if BUSQUEDA_USAR_PLANTILLA:
+                lineas.append(json.dumps({
+                    "id": PLANTILLA_BUSQUEDA_ID,
+                    "params": parametros_plantilla(texto_filtrado, desde, size, campos)
+                }))
+            else:
+                lineas.append(cuerpo_busqueda_json(texto_filtrado, desde, size, campos))
+        cuerpo = "\n".join(lineas) + "\n"
+        try:
+            metodo = async_client.msearch_template if BUSQUEDA_USAR_PLANTILLA else async_client.msearch
+            respuesta = await llamar_con_circuito(circuito_opensearch, lambda copia: metodo(body=cuerpo),
+                                                  "msearch", hedge_despues=0)
+        except Exception as e:
+            sin_circuito = isinstance(e, CircuitoAbierto)
+            if not (sin_circuito or es_falla_de_cluster(e)):
+                raise
+            if not respaldo_local.disponible:
+                if sin_circuito:
+                    raise CircuitoAbierto("OpenSearch no está disponible y el motor local no tiene snapshot")
+                raise
+            print(f"⚠️ OpenSearch no respondió ({e}); se responde con el motor local.")
+            respuesta = {"responses": [
+                {"respaldo": buscar_en_motor_local(texto_filtrado, size=clave[1], desde=clave[2], campos=campos)}
+                for clave, texto_filtrado in pendientes.items()
+            ]}
+
+        for (clave, texto_filtrado), item in zip(pendientes.items(), respuesta["responses"]):
+            if "respaldo" in item:
+                valores[clave] = (texto_filtrado, item["respaldo"], True)
+                cache_busquedas.guardar(clave, valores[clave], ttl=CACHE_RESPALDO_TTL)
+                continue
+            if "error" in item:
+                errores[clave] = item["error"]
+                continue
+            valores[clave] = (texto_filtrado, procesar_hits(item.get("hits", {}).get("hits", []), campos), False)
+            cache_busquedas.guardar(clave, valores[clave])
+
+    salida = []
+    for clave in claves:
+        if clave in errores:
+            salida.append({"error": errores[clave]})
+            continue
+        texto_filtrado, resultados, _ = valores[clave]
+        salida.append({"query_filtrada": texto_filtrado, "resultados": resultados})
+    return salida
+
+
+# Índice concreto detrás del alias (recetas_vN): cambia con cada reindexado, así
+# que sirve para los ETag de /buscar sin preguntarle a OpenSearch en cada request.
+# Se pide con un plazo corto y una sola llamada en curso por alias; si el circuito
+# no está cerrado o la llamada falla, se usa la última versión conocida.
+VERSION_INDICE_TTL = float(os.getenv("VERSION_INDICE_TTL", 60))
+VERSION_INDICE_DEADLINE = float(os.getenv("VERSION_INDICE_DEADLINE", 0.3))
+_version_indice = CacheLRU(max_entradas=8, ttl=VERSION_INDICE_TTL)
+_ultima_version = {}      # alias -> última versión conocida (no vence)
+_version_en_curso = {}    # alias -> tarea que la está pidiendo
+
+
+async def _pedir_version_indice(alias):
+    try:
+        indices = await llamar(
+            lambda copia: async_client.indices.get_alias(name=alias),
+            "get_alias", deadline=VERSION_INDICE_DEADLINE, reintentos=0, hedge_despues=0
+        )
+        version = ",".join(sorted(indices))
+    except exceptions.NotFoundError:
+        version = alias  # índice sin alias (antes del primer reindexado blue/green)
+    except Exception as e:
+        if es_falla_de_cluster(e):
+            circuito_opensearch.registrar_fallo()
+        print(f"⚠️ No se pudo obtener la versión del índice '{alias}': {e}")
+        return _ultima_version.get(alias, alias)
+    circuito_opensearch.registrar_exito()
+    _ultima_version[alias] = version
+    _version_indice.guardar(alias, version)
+    return version
+
+
+async def version_indice_async(alias="recetas"):
+    version = _version_indice.obtener(alias)
+    if version is not None:
+        return version
+    if circuito_opensearch.estado != CERRADO:
+        return _ultima_version.get(alias, alias)
+    tarea = _version_en_curso.get(alias)
+    if tarea is None:
+        tarea = asyncio.ensure_future(_pedir_version_indice(alias))
+        _version_en_curso[alias] = tarea
+        tarea.add_done_callback(lambda _: _version_en_curso.pop(alias, None))
+    # shield: si este request se cancela, los demás siguen esperando la misma llamada
+    return await asyncio.shield(tarea)
+
+
+def invalidar_version_indice():
+    _version_indice.invalidar()
+
+
+def invalidar_cache_busquedas():
+    """
+    Hook para cuando cambian likes, clicks o el índice: los rankings cacheados ya no valen.
+    """
+    cache_busquedas.invalidar()
+
+
+# Se compila después de limpiar_stopwords: las frases del diccionario se tokenizan
+# igual que la consulta ("diente de ajo" -> "diente ajo").
+constructor_consultas = ConstructorConsultas(
+    SINONIMOS_INGREDIENTES,
+    tokenizar=lambda texto: limpiar_stopwords(texto).split(),
+    campos=CAMPOS_BUSQUEDA
+)
+
 
 if __name__ == "__main__":
     while True:
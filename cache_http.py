@@ -0,0 +1,120 @@
+# cache_http.py
+"""
+Cache HTTP: Cache-Control por ruta, ETag y respuestas 304.
+
+Cada ReglaCache dice qué rutas GET se pueden cachear, con qué max-age y cómo
+calcular su ETag *antes* de llamar al handler (p. ej. a partir de la versión del
+índice y la query, o del update_time de una receta ya cacheada). Si el
+If-None-Match del cliente coincide, el middleware contesta 304 sin tocar el
+handler, Firestore ni OpenSearch. Si el ETag no se puede calcular barato, el
+request sigue al handler y la respuesta sale con el ETag y Cache-Control de la regla.
+Si el handler responde con Cache-Control: no-store (p. ej. resultados del motor
+local de respaldo), se respeta y la respuesta sale sin ETag. Solo los 200 (y los
+304) llevan el Cache-Control de la regla: el resto sale con no-store.
+"""
+import hashlib
+import re
+from email.utils import format_datetime
+from urllib.parse import parse_qsl
+
+from cache_recetas import etag_coincide
+
+
+def etag_de(*partes):
+    """
+    ETag débil estable a partir de las partes que determinan la respuesta.
+    """
+    clave = "\x1f".join(str(parte) for parte in partes)
+    return 'W/"' + hashlib.sha1(clave.encode()).hexdigest() + '"'
+
+
+def query_canonica(query_string):
+    """
+    La misma query con los parámetros ordenados (el orden no cambia la respuesta).
+    """
+    return "&".join(f"{k}={v}" for k, v in sorted(parse_qsl(query_string, keep_blank_values=True)))
+
+
+def fecha_http(fecha):
+    return format_datetime(fecha, usegmt=True) if fecha else None
+
+
+class ReglaCache:
+
+    def __init__(self, patron, max_age, etag=None, publica=True, stale_while_revalidate=0):
+        """
+        patron: regex sobre el path.
+        etag:   función async (path, query_string, match) -> ETag o None.
+        """
+        self.patron = re.compile(patron)
+        self.max_age = max_age
+        self.etag = etag
+        directivas = ["public" if publica else "private", f"max-age={max_age}"]
+        if stale_while_revalidate:
+            directivas.append(f"stale-while-revalidate={stale_while_revalidate}")
+        self.cache_control = ", ".join(directivas).encode()
+
+
+class MiddlewareCacheHTTP:
+    """
+    Middleware ASGI puro (sin BaseHTTPMiddleware, que agrega overhead por request).
+    """
+
+    def __init__(self, app, reglas=()):
+        self.app = app
+        self.reglas = list(reglas)
+        self.respuestas_304 = 0
+
+    def _regla(self, path):
+        for regla in self.reglas:
+            match = regla.patron.fullmatch(path)
+            if match:
+                return regla, match
+        return None, None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+        regla, match = self._regla(scope["path"])
+        if regla is None:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        query_string = scope.get("query_string", b"").decode()
+        etag = None
+        if regla.etag is not None:
+            try:
+                etag = await regla.etag(scope["path"], query_string, match)
+            except Exception as e:
+                print(f"⚠️ No se pudo calcular el ETag de {scope['path']}: {e}")
+
+        if etag and etag_coincide(headers.get(b"if-none-match", b"").decode(), etag):
+            self.respuestas_304 += 1
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", etag.encode()), (b"cache-control", regla.cache_control)],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                headers_handler = mensaje.get("headers", [])
+                if any(k.lower() == b"cache-control" and b"no-store" in v.lower() for k, v in headers_handler):
+                    # El handler pidió que no se cachee: sin Cache-Control de la regla ni ETag
+                    mensaje = {**mensaje, "headers": [(k, v) for k, v in headers_handler if k.lower() != b"etag"]}
+                    return await send(mensaje)
+                respuesta = [(k, v) for k, v in headers_handler if k.lower() != b"cache-control"]
+                if mensaje["status"] in (200, 304):
+                    respuesta.append((b"cache-control", regla.cache_control))
+                    if etag and not any(k.lower() == b"etag" for k, _ in respuesta):
+                        respuesta.append((b"etag", etag.encode()))
+                else:
+                    # Errores, 404 y demás: nunca cachear
+                    respuesta = [(k, v) for k, v in respuesta if k.lower() != b"etag"]
+                    respuesta.append((b"cache-control", b"no-store"))
+                mensaje = {**mensaje, "headers": respuesta}
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
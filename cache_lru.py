@@ -0,0 +1,84 @@
+# cache_lru.py
+"""
+Cache en memoria LRU con expiración por TTL y métricas de aciertos/fallos.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLRU:
+
+    def __init__(self, max_entradas=1000, ttl=60):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()  # clave -> (expira_en, valor)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.expiraciones = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave, por_defecto=None):
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return por_defecto
+            expira_en, valor = entrada
+            if expira_en <= ahora:
+                del self._datos[clave]
+                self.expiraciones += 1
+                self.fallos += 1
+                return por_defecto
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        expira_en = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._datos[clave] = (expira_en, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.desalojos += 1
+
+    def obtener_o_calcular(self, clave, calcular, ttl=None):
+        """
+        Devuelve el valor cacheado o lo calcula (fuera del lock) y lo guarda.
+        """
+        faltante = object()
+        valor = self.obtener(clave, faltante)
+        if valor is faltante:
+            valor = calcular()
+            self.guardar(clave, valor, ttl)
+        return valor
+
+    def invalidar(self, clave=None):
+        """
+        Borra una clave, o todo el cache si no se pasa ninguna.
+        """
+        with self._lock:
+            if clave is None:
+                self._datos.clear()
+            else:
+                self._datos.pop(clave, None)
+            self.invalidaciones += 1
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "ttl": self.ttl,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+                "desalojos": self.desalojos,
+                "expiraciones": self.expiraciones,
+                "invalidaciones": self.invalidaciones,
+            }
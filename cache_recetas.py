@@ -0,0 +1,185 @@
+# cache_recetas.py
+"""
+Cache read-through de los documentos de recetas.
+
+Dos niveles: un CacheLRU en memoria por proceso y, opcionalmente, un backend
+compartido entre procesos (Redis, o RedisLocal para pruebas) configurado con
+CACHE_RECETAS_REDIS_URL. Lo que no está en ningún nivel se lee de Firestore con
+un solo get_all y se guarda en ambos.
+
+Se cachea el documento tal como está en Firestore (con su update_time, para los
+ETag y Last-Modified de cache_http.py); los contadores (views,
+popup_clicks, likes) se suman aparte desde el cache de shards, así que los
+vaciados del agregador no invalidan el cache salvo que cambien el documento
+(p. ej. liked_by). Con backend compartido, el TTL local es corto
+(CACHE_RECETAS_TTL_LOCAL) para que las invalidaciones de otros procesos se vean pronto.
+"""
+import json
+import os
+
+from fastapi.encoders import jsonable_encoder
+from cache_lru import CacheLRU
+
+CACHE_RECETAS_MAX = int(os.getenv('CACHE_RECETAS_MAX', 5000))
+CACHE_RECETAS_TTL = int(os.getenv('CACHE_RECETAS_TTL', 300))
+CACHE_RECETAS_TTL_LOCAL = int(os.getenv('CACHE_RECETAS_TTL_LOCAL', 30))
+CACHE_RECETAS_REDIS_URL = os.getenv('CACHE_RECETAS_REDIS_URL')  # "local" = RedisLocal en memoria
+CACHE_RECETAS_PREFIJO = "recetas:"
+
+
+def etag_coincide(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # La comparación débil ignora el prefijo W/
+    candidatos = {e.strip().removeprefix("W/") for e in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidatos
+
+
+# ---------------------
+# Backend compartido
+# ---------------------
+
+class BackendRedis:
+    """
+    Guarda las recetas como JSON en Redis (o en cualquier cliente con la misma API).
+    """
+
+    def __init__(self, cliente, prefijo=CACHE_RECETAS_PREFIJO, ttl=CACHE_RECETAS_TTL):
+        self.cliente = cliente
+        self.prefijo = prefijo
+        self.ttl = ttl
+
+    def obtener_varias(self, receta_ids):
+        valores = self.cliente.mget([self.prefijo + receta_id for receta_id in receta_ids])
+        return {
+            receta_id: json.loads(valor)
+            for receta_id, valor in zip(receta_ids, valores)
+            if valor is not None
+        }
+
+    def guardar_varias(self, recetas):
+        for receta_id, receta in recetas.items():
+            self.cliente.set(self.prefijo + receta_id, json.dumps(receta, ensure_ascii=False), ex=self.ttl)
+
+    def invalidar(self, receta_ids=None):
+        if receta_ids is None:
+            claves = list(self.cliente.scan_iter(match=self.prefijo + "*"))
+        else:
+            claves = [self.prefijo + receta_id for receta_id in receta_ids]
+        if claves:
+            self.cliente.delete(*claves)
+
+
+def backend_por_defecto(url=CACHE_RECETAS_REDIS_URL):
+    if not url:
+        return None
+    if url == "local":
+        from redis_local import RedisLocal
+        return BackendRedis(RedisLocal())
+    try:
+        import redis
+    except ImportError:
+        print("⚠️ CACHE_RECETAS_REDIS_URL está definido pero falta el paquete redis; se usa solo el cache local.")
+        return None
+    return BackendRedis(redis.Redis.from_url(url))
+
+
+# ---------------------
+# Cache read-through
+# ---------------------
+
+class CacheRecetas:
+
+    def __init__(self, db, backend=None, max_entradas=CACHE_RECETAS_MAX, ttl=CACHE_RECETAS_TTL,
+                 ttl_local=CACHE_RECETAS_TTL_LOCAL):
+        self.db = db
+        self.backend = backend
+        self.local = CacheLRU(max_entradas, ttl_local if backend else ttl)
+        self.lecturas_firestore = 0
+        self.errores_backend = 0
+
+    def entradas(self, receta_ids):
+        """
+        {receta_id: {"datos", "actualizado"}} de las recetas que existen. Orden de
+        búsqueda: memoria, backend compartido y, para lo que falte, un get_all a Firestore.
+        """
+        resultado, faltantes = {}, []
+        for receta_id in receta_ids:
+            entrada = self.local.obtener(receta_id)
+            if entrada is None:
+                faltantes.append(receta_id)
+            else:
+                resultado[receta_id] = entrada
+
+        if faltantes and self.backend is not None:
+            try:
+                compartidas = self.backend.obtener_varias(faltantes)
+            except Exception as e:
+                # El backend compartido es solo una optimización: si falla, se sigue sin él
+                self.errores_backend += 1
+                print(f"⚠️ Error leyendo el cache compartido de recetas: {e}")
+                compartidas = {}
+            for receta_id, entrada in compartidas.items():
+                self.local.guardar(receta_id, entrada)
+            resultado.update(compartidas)
+            faltantes = [receta_id for receta_id in faltantes if receta_id not in compartidas]
+
+        if faltantes:
+            self.lecturas_firestore += 1
+            snapshots = self.db.get_all([self.db.collection("recetas").document(r) for r in faltantes])
+            leidas = {
+                doc.id: {
+                    "datos": jsonable_encoder(doc.to_dict()),
+                    "actualizado": doc.update_time.isoformat() if doc.update_time else None
+                }
+                for doc in snapshots if doc.exists
+            }
+            for receta_id, entrada in leidas.items():
+                self.local.guardar(receta_id, entrada)
+            if leidas and self.backend is not None:
+                try:
+                    self.backend.guardar_varias(leidas)
+                except Exception as e:
+                    self.errores_backend += 1
+                    print(f"⚠️ Error escribiendo el cache compartido de recetas: {e}")
+            resultado.update(leidas)
+        return resultado
+
+    def obtener_varias(self, receta_ids):
+        return {receta_id: entrada["datos"] for receta_id, entrada in self.entradas(receta_ids).items()}
+
+    def obtener(self, receta_id):
+        entrada = self.entradas([receta_id]).get(receta_id)
+        return entrada["datos"] if entrada else None
+
+    def entrada_local(self, receta_id):
+        """
+        La entrada si está en memoria, sin ir al backend ni a Firestore.
+        """
+        return self.local.obtener(receta_id)
+
+    def invalidar(self, receta_ids=None):
+        """
+        Borra las recetas indicadas, o todo el cache si no se pasa ninguna.
+        """
+        if receta_ids is None:
+            self.local.invalidar()
+        else:
+            for receta_id in receta_ids:
+                self.local.invalidar(receta_id)
+        if self.backend is not None:
+            try:
+                self.backend.invalidar(None if receta_ids is None else list(receta_ids))
+            except Exception as e:
+                self.errores_backend += 1
+                print(f"⚠️ Error invalidando el cache compartido de recetas: {e}")
+
+    def estadisticas(self):
+        return {
+            "local": self.local.estadisticas(),
+            "backend_compartido": type(self.backend.cliente).__name__ if self.backend else None,
+            "lecturas_firestore": self.lecturas_firestore,
+            "errores_backend": self.errores_backend,
+        }
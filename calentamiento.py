@@ -0,0 +1,139 @@
+# calentamiento.py
+"""
+Calentamiento al arrancar y estado de /ready.
+
+En el lifespan se lanza calentar() en segundo plano:
+1. carga el snapshot en disco del motor local de respaldo (ver motor_local.py),
+   sin esperar a OpenSearch,
+2. crea los clientes (credenciales, Firestore, OpenSearch; ver clientes.py),
+3. abre CALENTAMIENTO_CONEXIONES conexiones del pool de OpenSearch con pings concurrentes,
+4. registra la plantilla de búsqueda si está activada,
+5. arma el snapshot desde el índice si no había o está viejo,
+6. repite las CALENTAMIENTO_TOP_CONSULTAS búsquedas más pedidas (ver
+   consultas_frecuentes.py) para que lleguen al cache.
+
+Los pasos 2 y 3 se reintentan hasta que salen bien; /ready devuelve 503 hasta
+entonces, salvo que OpenSearch no responda y el motor local tenga snapshot: ahí
+la instancia queda lista en modo degradado y sigue reintentando. Los pasos 4 a 6
+son best-effort y no bloquean la disponibilidad.
+"""
+import asyncio
+import os
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+import buscar_recetas
+from clientes import registro
+from consultas_frecuentes import consultas_frecuentes
+from motor_local import respaldo_local
+
+CALENTAMIENTO_CONEXIONES = int(os.getenv('CALENTAMIENTO_CONEXIONES', 10))
+CALENTAMIENTO_TOP_CONSULTAS = int(os.getenv('CALENTAMIENTO_TOP_CONSULTAS', 50))
+CALENTAMIENTO_CONCURRENCIA = int(os.getenv('CALENTAMIENTO_CONCURRENCIA', 4))
+CALENTAMIENTO_ESPERA_MAXIMA = float(os.getenv('CALENTAMIENTO_ESPERA_MAXIMA', 30))
+
+
+class EstadoCalentamiento:
+
+    def __init__(self):
+        self.listo = False
+        self.degradado = False  # lista sin OpenSearch, respondiendo con el motor local
+        self.etapas = {}  # etapa -> {"ok", "segundos", "detalle"}
+        self.inicio = None
+        self.duracion = None
+
+    def resumen(self):
+        return {
+            "listo": self.listo,
+            "degradado": self.degradado,
+            "duracion": self.duracion,
+            "etapas": self.etapas,
+        }
+
+
+estado = EstadoCalentamiento()
+
+
+async def _etapa(nombre, funcion):
+    inicio = time.monotonic()
+    try:
+        detalle = await funcion()
+        estado.etapas[nombre] = {"ok": True, "segundos": round(time.monotonic() - inicio, 3), "detalle": detalle}
+        return True
+    except Exception as e:
+        estado.etapas[nombre] = {"ok": False, "segundos": round(time.monotonic() - inicio, 3), "detalle": str(e)}
+        print(f"⚠️ Calentamiento: falló '{nombre}': {e}")
+        return False
+
+
+async def crear_clientes():
+    await run_in_threadpool(registro.crear_todos)
+    return registro.estado()
+
+
+async def abrir_conexiones(cantidad=CALENTAMIENTO_CONEXIONES):
+    # Pings concurrentes: cada uno necesita su propia conexión, así quedan abiertas en el pool
+    respuestas = await asyncio.gather(
+        *(buscar_recetas.async_client.ping() for _ in range(cantidad)), return_exceptions=True
+    )
+    abiertas = sum(r is True for r in respuestas)
+    if not abiertas:
+        raise ConnectionError(f"OpenSearch no responde: {respuestas[0]}")
+    return {"abiertas": abiertas}
+
+
+async def registrar_plantilla():
+    if not buscar_recetas.BUSQUEDA_USAR_PLANTILLA:
+        return "desactivada"
+    await run_in_threadpool(buscar_recetas.registrar_plantilla_busqueda)
+    return "registrada"
+
+
+async def cargar_respaldo():
+    recetas = await run_in_threadpool(respaldo_local.cargar)
+    return {"recetas": recetas}
+
+
+async def exportar_respaldo():
+    recetas = await run_in_threadpool(respaldo_local.exportar_desde_indice, buscar_recetas.client)
+    return {"recetas": recetas}
+
+
+async def repetir_consultas(cantidad=CALENTAMIENTO_TOP_CONSULTAS):
+    semaforo = asyncio.Semaphore(CALENTAMIENTO_CONCURRENCIA)
+
+    async def repetir(query, size, desde, campos):
+        async with semaforo:
+            await buscar_recetas.buscar_recetas_cacheado_async(query, size=size, desde=desde, campos=campos)
+
+    consultas = consultas_frecuentes.top(cantidad)
+    resultados = await asyncio.gather(*(repetir(*clave) for clave in consultas), return_exceptions=True)
+    return {"consultas": len(consultas), "errores": sum(isinstance(r, Exception) for r in resultados)}
+
+
+async def calentar():
+    estado.inicio = time.monotonic()
+    await run_in_threadpool(consultas_frecuentes.cargar)
+
+    # El snapshot en disco no depende de OpenSearch: si el cluster está caído al
+    # arrancar, la instancia igual puede responder con el motor local
+    await _etapa("respaldo", cargar_respaldo)
+
+    espera = 1
+    while not (await _etapa("clientes", crear_clientes) and await _etapa("conexiones", abrir_conexiones)):
+        if respaldo_local.disponible and not estado.listo:
+            estado.listo = estado.degradado = True
+            print("⚠️ OpenSearch no responde: lista en modo degradado con el motor local.")
+        await asyncio.sleep(espera)
+        espera = min(espera * 2, CALENTAMIENTO_ESPERA_MAXIMA)
+    estado.degradado = False
+
+    await _etapa("plantilla", registrar_plantilla)
+    if respaldo_local.necesita_snapshot():
+        await _etapa("respaldo_indice", exportar_respaldo)
+    await _etapa("consultas", repetir_consultas)
+
+    estado.duracion = round(time.monotonic() - estado.inicio, 3)
+    estado.listo = True
+    print(f"✅ Calentamiento terminado en {estado.duracion}s.")
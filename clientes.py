@@ -0,0 +1,141 @@
+# clientes.py
+"""
+Registro de clientes externos (Firestore, OpenSearch) con inicialización perezosa.
+
+Importar un módulo no abre conexiones ni lee credenciales: cada cliente se crea
+la primera vez que se usa (o en el lifespan de FastAPI, con calentar()). Los
+módulos exportan un proxy que se comporta como el cliente real, así el resto del
+código sigue usando `db.collection(...)` o `client.search(...)` sin cambios.
+"""
+import json
+import os
+import threading
+
+
+class _ClientePerezoso:
+    """
+    Delegado que crea el cliente real en el primer acceso a un atributo.
+    """
+
+    __slots__ = ("_registro", "_nombre")
+
+    def __init__(self, registro, nombre):
+        object.__setattr__(self, "_registro", registro)
+        object.__setattr__(self, "_nombre", nombre)
+
+    def __getattr__(self, atributo):
+        return getattr(self._registro.obtener(self._nombre), atributo)
+
+    def __repr__(self):
+        estado = "creado" if self._registro.creado(self._nombre) else "sin crear"
+        return f"<cliente perezoso '{self._nombre}' ({estado})>"
+
+
+class RegistroClientes:
+
+    def __init__(self):
+        self._fabricas = {}
+        self._instancias = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, nombre, fabrica):
+        """
+        Registra la función que crea el cliente y devuelve su proxy.
+        """
+        self._fabricas[nombre] = fabrica
+        return _ClientePerezoso(self, nombre)
+
+    def obtener(self, nombre):
+        instancia = self._instancias.get(nombre)
+        if instancia is None:
+            with self._lock:
+                instancia = self._instancias.get(nombre)
+                if instancia is None:
+                    instancia = self._fabricas[nombre]()
+                    self._instancias[nombre] = instancia
+        return instancia
+
+    def reemplazar(self, nombre, instancia):
+        """
+        Usa `instancia` como cliente ya creado (p. ej. ClienteFirestoreLocal en las pruebas).
+        """
+        with self._lock:
+            self._instancias[nombre] = instancia
+
+    def creado(self, nombre):
+        return nombre in self._instancias
+
+    def crear_todos(self):
+        """
+        Crea los clientes que falten (se llama en el lifespan, fuera del event loop).
+        """
+        for nombre in list(self._fabricas):
+            self.obtener(nombre)
+
+    def estado(self):
+        return {nombre: self.creado(nombre) for nombre in self._fabricas}
+
+    async def cerrar(self):
+        """
+        Cierra solo los clientes que llegaron a crearse.
+        """
+        with self._lock:
+            instancias, self._instancias = self._instancias, {}
+        for nombre, instancia in instancias.items():
+            cerrar = getattr(instancia, "close", None)
+            if cerrar is None:
+                continue
+            try:
+                resultado = cerrar()
+                if hasattr(resultado, "__await__"):
+                    await resultado
+            except Exception as e:
+                print(f"⚠️ Error cerrando el cliente '{nombre}': {e}")
+
+
+registro = RegistroClientes()
+
+
+# ---------------------
+# Firebase
+# ---------------------
+
+FIRESTORE_LOCAL = os.getenv("FIRESTORE_LOCAL", "0") == "1"
+
+
+def inicializar_firebase():
+    """
+    Inicializa la app de Firebase una sola vez, con FIREBASE_CREDENTIALS.
+    """
+    import firebase_admin
+    from firebase_admin import credentials
+
+    if firebase_admin._apps:
+        return firebase_admin.get_app()
+
+    firebase_cred_json = os.getenv("FIREBASE_CREDENTIALS")
+    if not firebase_cred_json:
+        raise Exception("No se encontró la variable FIREBASE_CREDENTIALS")
+    cred_dict = json.loads(firebase_cred_json)
+    cred_dict["private_key"] = cred_dict["private_key"].replace("\\n", "\n")
+    return firebase_admin.initialize_app(credentials.Certificate(cred_dict))
+
+
+def crear_firestore():
+    """
+    Con FIRESTORE_LOCAL=1 usa el Firestore en memoria (ver firestore_local.py),
+    para correr la app o los scripts sin credenciales ni conexión.
+    """
+    if FIRESTORE_LOCAL:
+        from firestore_local import ClienteFirestoreLocal
+
+        print("⚠️ FIRESTORE_LOCAL activo: Firestore en memoria, nada se guarda.")
+        return ClienteFirestoreLocal()
+
+    from firebase_admin import firestore
+
+    inicializar_firebase()
+    return firestore.client()
+
+
+db = registro.registrar("firestore", crear_firestore)
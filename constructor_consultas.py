@@ -0,0 +1,98 @@
+# constructor_consultas.py
+"""
+Expansión de consultas con sinónimos precompilada.
+
+El diccionario de sinónimos se compila una vez en un trie de tokens, así las
+frases de varias palabras ("diente de ajo") se reconocen dentro de la consulta
+con una sola pasada (coincidencia más larga primero). Frases y sinónimos pasan
+por el mismo tokenizador que la consulta (sin acentos ni stopwords, ver
+normalizacion.py) y los sinónimos repetidos se descartan. Las cláusulas que se
+generan por término se memorizan: cada término se expande una sola vez.
+"""
+from functools import lru_cache
+
+_FIN = object()  # marca de nodo terminal en el trie
+
+
+class ConstructorConsultas:
+
+    def __init__(self, sinonimos, tokenizar=str.split, campos=None, max_cache=4096):
+        """
+        sinonimos: {"frase": ["sinonimo", ...]}
+        tokenizar: función texto -> lista de tokens. Debe ser la misma que se
+                   aplica a la consulta (p. ej. la que quita stopwords), para que
+                   "diente de ajo" y la consulta "diente ajo" den los mismos tokens.
+        """
+        self.campos = campos or ["titulo^3", "ingredientes_texto^2", "descripcion", "pasos", "contenido_total"]
+        self._tokenizar = tokenizar
+        self._trie = {}
+        for frase, lista in sinonimos.items():
+            tokens = tokenizar(frase)
+            if not tokens:
+                continue
+            nodo = self._trie
+            for token in tokens:
+                nodo = nodo.setdefault(token, {})
+            # "azúcar" y "azucar" pueden estar las dos como clave: se juntan sus listas
+            frase = " ".join(tokens)
+            expansiones = dict.fromkeys(nodo[_FIN][1] if _FIN in nodo else ())
+            for sinonimo in lista:
+                sinonimo = " ".join(tokenizar(sinonimo))
+                if sinonimo and sinonimo != frase:
+                    expansiones[sinonimo] = None
+            nodo[_FIN] = (frase, tuple(expansiones))
+
+        self.segmentar = lru_cache(maxsize=max_cache)(self._segmentar)
+        self.clausula = lru_cache(maxsize=max_cache)(self._clausula)
+
+    def _segmentar(self, query):
+        """
+        Parte la consulta en términos: frases del diccionario (la más larga posible)
+        o palabras sueltas. Devuelve una tupla de (frase, sinonimos).
+        """
+        tokens = self._tokenizar(query)
+        terminos = []
+        i = 0
+        while i < len(tokens):
+            nodo = self._trie
+            encontrado, fin = None, i + 1
+            for j in range(i, len(tokens)):
+                nodo = nodo.get(tokens[j])
+                if nodo is None:
+                    break
+                if _FIN in nodo:
+                    encontrado, fin = nodo[_FIN], j + 1
+            terminos.append(encontrado or (tokens[i], ()))
+            i = fin
+        return tuple(terminos)
+
+    def _clausula(self, termino):
+        frase, sinonimos = termino
+        # Incluye la palabra original + sus sinónimos. Con operator "or" la query es
+        # una bolsa de palabras: cada una va una sola vez, para no inflar su peso.
+        palabras = dict.fromkeys(" ".join((frase,) + sinonimos).split())
+        return {
+            "multi_match": {
+                "query": " ".join(palabras),
+                "fields": self.campos,
+                "fuzziness": "AUTO",
+                "operator": "or"
+            }
+        }
+
+    def expandir(self, query):
+        """
+        Consulta bool con un must por término. Las cláusulas vienen del cache y se
+        comparten entre llamadas: no modificarlas.
+        """
+        return {
+            "bool": {
+                "must": [self.clausula(termino) for termino in self.segmentar(query)]
+            }
+        }
+
+    def estadisticas(self):
+        return {
+            "segmentar": self.segmentar.cache_info()._asdict(),
+            "clausulas": self.clausula.cache_info()._asdict(),
+        }
@@ -0,0 +1,99 @@
+# consultas_frecuentes.py
+"""
+Registro de las búsquedas más pedidas, para precalentar el cache al arrancar.
+
+Se cuenta en memoria cada clave de cache de /buscar (query normalizada, size,
+desde, campos) y al apagar la app se guarda el top en un documento de Firestore
+(sobrevive a los dynos con disco efímero). El próximo arranque lo lee y repite
+esas búsquedas antes de marcarse como listo. Para desarrollo local se puede
+guardar en un JSON con CONSULTAS_FRECUENTES_ARCHIVO.
+"""
+import json
+import os
+import threading
+from collections import Counter
+
+from clientes import db as firestore_db
+
+CONSULTAS_FRECUENTES_ARCHIVO = os.getenv('CONSULTAS_FRECUENTES_ARCHIVO')  # si no se define, se guarda en Firestore
+CONSULTAS_FRECUENTES_DOCUMENTO = os.getenv('CONSULTAS_FRECUENTES_DOCUMENTO', '_sistema/consultas_frecuentes')
+CONSULTAS_FRECUENTES_MAX = int(os.getenv('CONSULTAS_FRECUENTES_MAX', 5000))  # claves distintas en memoria
+CONSULTAS_FRECUENTES_GUARDAR = int(os.getenv('CONSULTAS_FRECUENTES_GUARDAR', 500))  # cuántas se guardan
+
+
+class ConsultasFrecuentes:
+
+    def __init__(self, ruta=CONSULTAS_FRECUENTES_ARCHIVO, db=firestore_db,
+                 ruta_documento=CONSULTAS_FRECUENTES_DOCUMENTO, max_claves=CONSULTAS_FRECUENTES_MAX):
+        self.ruta = ruta
+        self.db = db
+        self.ruta_documento = ruta_documento
+        self.max_claves = max_claves
+        self._conteos = Counter()
+        self._lock = threading.Lock()
+
+    def registrar(self, query, size, desde, campos):
+        clave = (query, size, desde, None if campos is None else tuple(campos))
+        with self._lock:
+            self._conteos[clave] += 1
+            if len(self._conteos) > self.max_claves:
+                # Se queda con la mitad más pedida para acotar la memoria
+                self._conteos = Counter(dict(self._conteos.most_common(self.max_claves // 2)))
+
+    def top(self, n):
+        with self._lock:
+            return [clave for clave, _ in self._conteos.most_common(n)]
+
+    def _origen(self):
+        return self.ruta or self.ruta_documento
+
+    def _leer(self):
+        if self.ruta:
+            if not os.path.exists(self.ruta):
+                return []
+            with open(self.ruta, encoding="utf-8") as archivo:
+                return json.load(archivo)
+        return (self.db.document(self.ruta_documento).get().to_dict() or {}).get("consultas", [])
+
+    def _escribir(self, datos):
+        if self.ruta:
+            temporal = self.ruta + ".tmp"
+            with open(temporal, "w", encoding="utf-8") as archivo:
+                json.dump(datos, archivo, ensure_ascii=False)
+            os.replace(temporal, self.ruta)
+        else:
+            self.db.document(self.ruta_documento).set({"consultas": datos})
+
+    def cargar(self):
+        """
+        Suma a los conteos en memoria los guardados por el arranque anterior.
+        """
+        try:
+            guardadas = self._leer()
+        except Exception as e:
+            print(f"⚠️ No se pudieron leer las consultas frecuentes de {self._origen()}: {e}")
+            return 0
+        with self._lock:
+            for item in guardadas:
+                campos = item["campos"]
+                clave = (item["query"], item["size"], item["desde"], None if campos is None else tuple(campos))
+                self._conteos[clave] += item["veces"]
+        return len(guardadas)
+
+    def guardar(self, n=CONSULTAS_FRECUENTES_GUARDAR):
+        with self._lock:
+            top = self._conteos.most_common(n)
+        datos = [
+            {"query": query, "size": size, "desde": desde,
+             "campos": None if campos is None else list(campos), "veces": veces}
+            for (query, size, desde, campos), veces in top
+        ]
+        try:
+            self._escribir(datos)
+        except Exception as e:
+            print(f"⚠️ No se pudieron guardar las consultas frecuentes en {self._origen()}: {e}")
+            return 0
+        return len(datos)
+
+
+consultas_frecuentes = ConsultasFrecuentes()
@@ -0,0 +1,195 @@
+# contadores_distribuidos.py
+"""
+Contadores distribuidos (sharded) para views, popup_clicks y likes.
+
+Firestore limita las escrituras por documento, así que los incrementos no van al
+documento de la receta sino a uno de N shards al azar en
+recetas/{id}/contadores_shards/{0..N-1}. El total es el valor que ya tenía el
+documento de la receta (contadores anteriores a los shards) más la suma de los shards.
+
+N sale del campo `num_shards` de la receta (CONTADORES_SHARDS si no lo tiene),
+así una receta viral puede tener más shards que el resto. N solo puede crecer:
+los shards siempre son 0..N-1 y se pueden leer con un get_all sin listar la subcolección.
+"""
+import os
+import random
+from collections import Counter, defaultdict
+
+from firebase_admin import firestore
+from cache_lru import CacheLRU
+
+CONTADORES_SHARDS = int(os.getenv('CONTADORES_SHARDS', 10))
+CONTADORES_SHARDS_MAX = int(os.getenv('CONTADORES_SHARDS_MAX', 100))  # cada lectura sin cache es un get_all de N shards
+CONTADORES_TOTALES_TTL = float(os.getenv('CONTADORES_TOTALES_TTL', 30))
+CONTADORES_CACHE_MAX = int(os.getenv('CONTADORES_CACHE_MAX', 10000))
+
+CAMPOS_DISTRIBUIDOS = ("views", "popup_clicks", "likes")
+COLECCION_SHARDS = "contadores_shards"
+CAMPO_NUM_SHARDS = "num_shards"
+
+
+def sumar_contadores(data, sumas):
+    """
+    Copia de la receta con los contadores del documento + la suma de sus shards.
+    """
+    data = dict(data)
+    for campo in CAMPOS_DISTRIBUIDOS:
+        if campo in data or (sumas and sumas.get(campo)):
+            data[campo] = (data.get(campo) or 0) + (sumas or {}).get(campo, 0)
+    return data
+
+
+class ContadoresDistribuidos:
+
+    def __init__(self, db, shards_por_defecto=CONTADORES_SHARDS, ttl=CONTADORES_TOTALES_TTL,
+                 max_entradas=CONTADORES_CACHE_MAX):
+        self.db = db
+        self.shards_por_defecto = shards_por_defecto
+        self._num_shards = CacheLRU(max_entradas, ttl=300)  # receta_id -> N
+        self._sumas = CacheLRU(max_entradas, ttl)           # receta_id -> {campo: suma de shards}
+
+    def _receta(self, receta_id):
+        return self.db.collection("recetas").document(receta_id)
+
+    def _shards(self, receta_id):
+        return self._receta(receta_id).collection(COLECCION_SHARDS)
+
+    # ---------------------
+    # Configuración por receta
+    # ---------------------
+
+    def configuracion(self, receta_ids):
+        """
+        {receta_id: num_shards} con un solo get_all para las que no están en cache.
+        Las recetas que no existen vienen con None (no se cachean).
+        """
+        resultado, faltantes = {}, []
+        for receta_id in receta_ids:
+            num_shards = self._num_shards.obtener(receta_id)
+            if num_shards is None:
+                faltantes.append(receta_id)
+            else:
+                resultado[receta_id] = num_shards
+
+        if faltantes:
+            for snapshot in self.db.get_all([self._receta(r) for r in faltantes]):
+                if not snapshot.exists:
+                    resultado[snapshot.id] = None
+                    continue
+                num_shards = (snapshot.to_dict() or {}).get(CAMPO_NUM_SHARDS) or self.shards_por_defecto
+                self._num_shards.guardar(snapshot.id, num_shards)
+                resultado[snapshot.id] = num_shards
+        return resultado
+
+    def configurar_shards(self, receta_id, num_shards):
+        """
+        Cambia la cantidad de shards de una receta (p. ej. subirla si se vuelve viral).
+        """
+        actual = self.configuracion([receta_id]).get(receta_id)
+        if actual is None:
+            raise ValueError(f"La receta {receta_id} no existe")
+        if num_shards < actual:
+            raise ValueError(f"num_shards solo puede aumentar (actual: {actual})")
+        if num_shards > CONTADORES_SHARDS_MAX:
+            raise ValueError(f"num_shards no puede pasar de {CONTADORES_SHARDS_MAX}")
+        self._receta(receta_id).update({CAMPO_NUM_SHARDS: num_shards})
+        self._num_shards.invalidar(receta_id)
+
+    # ---------------------
+    # Escritura
+    # ---------------------
+
+    def escribir_incrementos(self, batch, receta_id, num_shards, deltas):
+        """
+        Agrega al batch los incrementos de la receta sobre un shard elegido al azar.
+        """
+        cambios = {campo: firestore.Increment(delta) for campo, delta in deltas.items() if delta}
+        if cambios:
+            shard = self._shards(receta_id).document(str(random.randrange(num_shards)))
+            batch.set(shard, cambios, merge=True)
+
+    def sumar_en_cache(self, receta_id, deltas):
+        """
+        Aplica a la suma cacheada los incrementos que ya se escribieron, para no
+        invalidarla (y volver a leer todos los shards) en cada vaciado.
+        """
+        sumas = self._sumas.obtener(receta_id)
+        if sumas is not None:
+            sumas = Counter(sumas)
+            sumas.update(deltas)
+            self._sumas.guardar(receta_id, dict(sumas))
+
+    # ---------------------
+    # Lectura
+    # ---------------------
+
+    def sumas(self, receta_id):
+        """
+        Suma de los shards de una receta (cacheada CONTADORES_TOTALES_TTL segundos).
+        """
+        def calcular():
+            total = Counter()
+            for shard in self._shards(receta_id).stream():
+                datos = shard.to_dict() or {}
+                total.update({campo: datos.get(campo) or 0 for campo in CAMPOS_DISTRIBUIDOS})
+            return dict(total)
+
+        return self._sumas.obtener_o_calcular(receta_id, calcular)
+
+    def sumas_cacheadas(self, receta_id):
+        """
+        La suma de los shards si está en cache (None si habría que leerlos).
+        """
+        return self._sumas.obtener(receta_id)
+
+    def sumas_varias(self, recetas):
+        """
+        {receta_id: sumas} para varias recetas ({receta_id: data} ya leídas).
+        Las que no están en cache se resuelven con un solo get_all de sus shards.
+        """
+        resultado, faltantes, referencias = {}, {}, []
+        for receta_id, data in recetas.items():
+            sumas = self._sumas.obtener(receta_id)
+            if sumas is not None:
+                resultado[receta_id] = sumas
+                continue
+            faltantes[receta_id] = Counter()
+            num_shards = (data or {}).get(CAMPO_NUM_SHARDS) or self.shards_por_defecto
+            referencias.extend(self._shards(receta_id).document(str(i)) for i in range(num_shards))
+
+        if referencias:
+            for shard in self.db.get_all(referencias):
+                datos = shard.to_dict() or {}
+                faltantes[shard.reference.parent.parent.id].update(
+                    {campo: datos.get(campo) or 0 for campo in CAMPOS_DISTRIBUIDOS}
+                )
+        for receta_id, total in faltantes.items():
+            resultado[receta_id] = dict(total)
+            self._sumas.guardar(receta_id, resultado[receta_id])
+        return resultado
+
+    def totales(self, receta_id, data):
+        """
+        La receta `data` (leída de Firestore) con sus contadores totales.
+        """
+        return sumar_contadores(data, self.sumas(receta_id))
+
+    def sumas_de_todas(self):
+        """
+        {receta_id: {campo: suma}} de todos los shards con una sola consulta
+        collection_group (para el reindexado completo).
+        """
+        sumas = defaultdict(Counter)
+        for shard in self.db.collection_group(COLECCION_SHARDS).stream():
+            receta = shard.reference.parent.parent
+            if receta is None or receta.parent.id != "recetas":
+                continue
+            datos = shard.to_dict() or {}
+            sumas[receta.id].update({campo: datos.get(campo) or 0 for campo in CAMPOS_DISTRIBUIDOS})
+        return {receta_id: dict(total) for receta_id, total in sumas.items()}
+
+    def estadisticas(self):
+        return {
+            "num_shards": self._num_shards.estadisticas(),
+            "sumas": self._sumas.estadisticas(),
+        }
@@ -0,0 +1,127 @@
+# despensa.py
+"""
+Modo "despensa" de /buscar: qué puedo cocinar con lo que tengo.
+
+Al indexar, cada receta guarda sus ingredientes normalizados (sin acentos ni
+stopwords, ver normalizacion.py) como keywords en `ingredientes_claves`, y
+cuántos son en `num_ingredientes`. La consulta ("tengo pollo tomate ajo") se
+parte en ingredientes (por comas o "y", o si no por términos, con el mismo
+segmentador de /buscar: frases del diccionario + sinónimos) y se busca con:
+
+- un filtro terms_set: la receta tiene que tener al menos
+  ceil(num_ingredientes * DESPENSA_COBERTURA_MINIMA) de esos ingredientes
+  (nunca más que los que trae la despensa, nunca menos de 1);
+- un should por ingrediente con puntaje constante 1, así el _score es la cantidad
+  de ingredientes de la receta que hay en la despensa;
+- un script_score que ordena por cobertura (_score / num_ingredientes) más un
+  poco de popularidad.
+
+Solo son term queries sobre keywords: sin fuzzy, sin análisis de texto y sin rescore.
+"""
+import os
+import re
+
+from normalizacion import limpiar_consulta
+
+DESPENSA_COBERTURA_MINIMA = float(os.getenv('DESPENSA_COBERTURA_MINIMA', 0.5))
+DESPENSA_PESO_POPULARIDAD = float(os.getenv('DESPENSA_PESO_POPULARIDAD', 0.1))
+DESPENSA_MAX_NGRAMA = 3  # "aceite oliva virgen": ingredientes de hasta 3 palabras sin stopwords
+
+# Separadores de ingredientes en la consulta: "pollo, tomate y ajo"
+_SEPARADORES = re.compile(r"[,;\n]|\s+y\s+|\s+e\s+")
+
+MAPEO_DESPENSA = {
+    "ingredientes_claves": {"type": "keyword"},
+    "num_ingredientes": {"type": "integer"},
+}
+
+SCRIPT_MINIMO = """
+int n = doc['num_ingredientes'].size() == 0 ? 1 : (int) doc['num_ingredientes'].value;
+return Math.max(1, Math.min(params.despensa, (int) Math.ceil(n * params.cobertura)));
+"""
+
+SCRIPT_COBERTURA = """
+int n = doc['num_ingredientes'].size() == 0 ? 1 : (int) doc['num_ingredientes'].value;
+double likes = doc['likes'].size() == 0 ? 0.0 : doc['likes'].value;
+return Math.min(1.0, _score / Math.max(1, n)) + params.peso_popularidad * Math.log10(1 + likes);
+"""
+
+
+def campos_despensa(ingredientes):
+    """
+    ingredientes: nombres ya normalizados (nombres_de_ingredientes).
+    """
+    claves = sorted({clave for clave in (limpiar_consulta(nombre) for nombre in ingredientes) if clave})
+    return {"ingredientes_claves": claves, "num_ingredientes": len(claves)}
+
+
+def terminos_despensa(query, segmentar):
+    """
+    query: la consulta tal cual ("tengo pollo, aceite de oliva y ajo").
+    segmentar: ConstructorConsultas.segmentar (frases del diccionario + sinónimos).
+    Devuelve (candidatos, cantidad): las claves a buscar y cuántos ingredientes
+    trae la despensa. Si la consulta separa los ingredientes (comas, "y") cada
+    parte es un ingrediente; si no, cada término lo es, y además se prueban las
+    palabras vecinas unidas para los nombres de varias palabras.
+    """
+    partes = [parte for parte in (limpiar_consulta(p) for p in _SEPARADORES.split(query.lower())) if parte]
+    candidatos, terminos_totales = set(partes), 0
+    for parte in partes:
+        terminos = segmentar(parte)
+        terminos_totales += len(terminos)
+        frases = [limpiar_consulta(frase) for frase, _ in terminos]
+        for frase, sinonimos in terminos:
+            candidatos.update(filter(None, (limpiar_consulta(s) for s in (frase,) + tuple(sinonimos))))
+        for largo in range(2, DESPENSA_MAX_NGRAMA + 1):
+            for i in range(len(frases) - largo + 1):
+                candidatos.add(" ".join(frases[i:i + largo]))
+    cantidad = len(partes) if len(partes) > 1 else terminos_totales
+    return sorted(candidatos), cantidad
+
+
+def construir_cuerpo_despensa(candidatos, cantidad, desde=0, size=5, fuente=False):
+    return {
+        "query": {
+            "function_score": {
+                "query": {
+                    "bool": {
+                        "filter": [{
+                            "terms_set": {
+                                "ingredientes_claves": {
+                                    "terms": candidatos,
+                                    "minimum_should_match_script": {
+                                        "source": SCRIPT_MINIMO,
+                                        "params": {"despensa": cantidad, "cobertura": DESPENSA_COBERTURA_MINIMA}
+                                    }
+                                }
+                            }
+                        }],
+                        "should": [
+                            {"constant_score": {"filter": {"term": {"ingredientes_claves": clave}}, "boost": 1}}
+                            for clave in candidatos
+                        ]
+                    }
+                },
+                "script_score": {
+                    "script": {
+                        "source": SCRIPT_COBERTURA,
+                        "params": {"peso_popularidad": DESPENSA_PESO_POPULARIDAD}
+                    }
+                },
+                "boost_mode": "replace"
+            }
+        },
+        "from": desde,
+        "size": size,
+        "_source": fuente
+    }
+
+
+def cobertura(claves_receta, candidatos):
+    """
+    (cobertura, ingredientes_faltantes) de una receta para la despensa dada.
+    """
+    faltantes = [clave for clave in claves_receta if clave not in candidatos]
+    if not claves_receta:
+        return 0.0, faltantes
+    return round(1 - len(faltantes) / len(claves_receta), 3), faltantes
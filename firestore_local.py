@@ -0,0 +1,464 @@
+# firestore_local.py
+"""
+Firestore en memoria con la parte de la API que usa este proyecto
+(colecciones, documentos, subcolecciones, consultas simples, batches,
+transacciones y on_snapshot).
+Sirve para correr la sincronización y los contadores sin conexión: con
+FIRESTORE_LOCAL=1 clientes.db lo usa en vez de firestore.client(), y las
+pruebas lo inyectan con registro.reemplazar("firestore", ...) (ver tests/).
+Los snapshots se comportan como los reales: get() de un campo que no está
+lanza KeyError, así que el código tiene que leer con to_dict().
+"""
+import copy
+import threading
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from google.api_core.exceptions import Aborted, NotFound
+from google.cloud.firestore_v1 import transforms
+
+
+def _ahora():
+    return datetime.now(timezone.utc)
+
+
+def _leer_campo(datos, campo):
+    valor = datos
+    for parte in campo.split("."):
+        if not isinstance(valor, dict) or parte not in valor:
+            return None
+        valor = valor[parte]
+    return valor
+
+
+def _aplicar_valor(actual, valor):
+    """
+    Resuelve los sentinels de Firestore (Increment, ArrayUnion, ...) contra el valor actual.
+    """
+    if valor is transforms.SERVER_TIMESTAMP:
+        return _ahora()
+    if isinstance(valor, transforms.Increment):
+        return (actual if isinstance(actual, (int, float)) else 0) + valor.value
+    if isinstance(valor, transforms.ArrayUnion):
+        lista = list(actual) if isinstance(actual, list) else []
+        return lista + [v for v in valor.values if v not in lista]
+    if isinstance(valor, transforms.ArrayRemove):
+        lista = list(actual) if isinstance(actual, list) else []
+        return [v for v in lista if v not in valor.values]
+    return copy.deepcopy(valor)
+
+
+def _escribir_campo(datos, campo, valor):
+    partes = campo.split(".")
+    destino = datos
+    for parte in partes[:-1]:
+        if not isinstance(destino.get(parte), dict):
+            destino[parte] = {}
+        destino = destino[parte]
+    if valor is transforms.DELETE_FIELD:
+        destino.pop(partes[-1], None)
+    else:
+        destino[partes[-1]] = _aplicar_valor(destino.get(partes[-1]), valor)
+
+
+def _fusionar(datos, cambios):
+    for campo, valor in cambios.items():
+        if isinstance(valor, dict):
+            if not isinstance(datos.get(campo), dict):
+                datos[campo] = {}
+            _fusionar(datos[campo], valor)
+        else:
+            _escribir_campo(datos, campo, valor)
+
+
+_OPERADORES = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+}
+
+
+class SnapshotLocal:
+    def __init__(self, referencia, datos, update_time=None):
+        self.reference = referencia
+        self.id = referencia.id
+        self._datos = datos
+        self.update_time = update_time
+
+    @property
+    def exists(self):
+        return self._datos is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._datos)
+
+    def get(self, campo):
+        # Igual que DocumentSnapshot.get: None si el documento no existe, y
+        # KeyError si existe pero no tiene el campo
+        if self._datos is None:
+            return None
+        valor = self._datos
+        for parte in campo.split("."):
+            if not isinstance(valor, dict) or parte not in valor:
+                raise KeyError(f"'{campo}' no está en el documento {self.reference.path}")
+            valor = valor[parte]
+        return copy.deepcopy(valor)
+
+
+class DocumentoLocal:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self):
+        return ColeccionLocal(self._db, self.path.rsplit("/", 1)[0])
+
+    def collection(self, nombre):
+        return ColeccionLocal(self._db, f"{self.path}/{nombre}")
+
+    def get(self, transaction=None):
+        return self._db._leer(self, transaction)
+
+    def set(self, datos, merge=False):
+        def aplicar(actual):
+            nuevo = copy.deepcopy(actual) if (merge and actual is not None) else {}
+            _fusionar(nuevo, datos)
+            return nuevo
+        self._db._escribir(self, aplicar)
+
+    def create(self, datos):
+        def aplicar(actual):
+            if actual is not None:
+                raise ValueError(f"El documento {self.path} ya existe")
+            nuevo = {}
+            _fusionar(nuevo, datos)
+            return nuevo
+        self._db._escribir(self, aplicar)
+
+    def update(self, datos):
+        def aplicar(actual):
+            if actual is None:
+                raise NotFound(f"No existe el documento {self.path}")
+            nuevo = copy.deepcopy(actual)
+            for campo, valor in datos.items():
+                _escribir_campo(nuevo, campo, valor)
+            return nuevo
+        self._db._escribir(self, aplicar)
+
+    def delete(self):
+        self._db._escribir(self, lambda actual: None)
+
+
+class ConsultaLocal:
+    def __init__(self, db, ruta, filtros=(), orden=(), limite=None, cursor=None, grupo=False):
+        self._db = db
+        self._ruta = ruta
+        self._grupo = grupo  # collection_group: todas las colecciones con ese nombre
+        self._filtros = tuple(filtros)
+        self._orden = tuple(orden)
+        self._limite = limite
+        self._cursor = cursor
+
+    def _copiar(self, **cambios):
+        args = dict(filtros=self._filtros, orden=self._orden, limite=self._limite,
+                    cursor=self._cursor, grupo=self._grupo)
+        args.update(cambios)
+        return ConsultaLocal(self._db, self._ruta, **args)
+
+    def where(self, campo, operador, valor):
+        return self._copiar(filtros=self._filtros + ((campo, _OPERADORES[operador], valor),))
+
+    def order_by(self, campo, direction="ASCENDING"):
+        return self._copiar(orden=self._orden + ((campo, direction == "DESCENDING"),))
+
+    def limit(self, cantidad):
+        return self._copiar(limite=cantidad)
+
+    def start_after(self, cursor):
+        return self._copiar(cursor=cursor)
+
+    def _coincide(self, datos):
+        if datos is None:
+            return False
+        for campo, operador, valor in self._filtros:
+            actual = _leer_campo(datos, campo)
+            if actual is None or not operador(actual, valor):
+                return False
+        # Igual que Firestore: los documentos sin el campo de orden no aparecen
+        return all(_leer_campo(datos, campo) is not None for campo, _ in self._orden)
+
+    def _clave_orden(self, doc_id, datos):
+        return [_leer_campo(datos, campo) for campo, _ in self._orden] + [doc_id]
+
+    def _despues_del_cursor(self, clave):
+        if self._cursor is None:
+            return True
+        if isinstance(self._cursor, SnapshotLocal):
+            limite = self._clave_orden(self._cursor.id, self._cursor._datos or {})
+        else:
+            limite = [self._cursor.get(campo) for campo, _ in self._orden]
+        for (_, descendente), valor, tope in zip(self._orden + ((None, False),), clave, limite):
+            if valor != tope:
+                return (valor < tope) if descendente else (valor > tope)
+        return False
+
+    def stream(self, transaction=None):
+        docs = [
+            (path, datos, update_time)
+            for path, datos, update_time in self._db._listar(self._ruta, self._grupo)
+            if self._coincide(datos)
+        ]
+        docs.sort(key=lambda d: d[0])  # el id desempata, como en Firestore
+        for campo, descendente in reversed(self._orden):
+            docs.sort(key=lambda d: _leer_campo(d[1], campo), reverse=descendente)
+
+        resultado = []
+        for path, datos, update_time in docs:
+            if not self._despues_del_cursor(self._clave_orden(path.rsplit("/", 1)[-1], datos)):
+                continue
+            referencia = DocumentoLocal(self._db, path)
+            resultado.append(SnapshotLocal(referencia, copy.deepcopy(datos), update_time))
+            if self._limite is not None and len(resultado) >= self._limite:
+                break
+        return iter(resultado)
+
+    def get(self, transaction=None):
+        return list(self.stream())
+
+    def count(self, alias=None):
+        """
+        Consulta de agregación: .get() devuelve [[resultado]] con .value, como Firestore.
+        """
+        return SimpleNamespace(get=lambda transaction=None: [[
+            SimpleNamespace(alias=alias or "count", value=len(self.get()))
+        ]])
+
+    def on_snapshot(self, callback):
+        return self._db._escuchar(self, callback)
+
+
+class ColeccionLocal(ConsultaLocal):
+    def __init__(self, db, ruta):
+        super().__init__(db, ruta)
+        self.id = ruta.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self):
+        if "/" not in self._ruta:
+            return None
+        return DocumentoLocal(self._db, self._ruta.rsplit("/", 1)[0])
+
+    def document(self, doc_id=None):
+        return DocumentoLocal(self._db, f"{self._ruta}/{doc_id or uuid.uuid4().hex[:20]}")
+
+    def add(self, datos):
+        referencia = self.document()
+        referencia.set(datos)
+        return _ahora(), referencia
+
+
+class BatchLocal:
+    """
+    WriteBatch: las escrituras se aplican todas juntas en commit(). Si algún
+    update apunta a un documento inexistente, no se aplica ninguna.
+    """
+
+    def __init__(self, db):
+        self._db = db
+        self._escrituras = []
+
+    def set(self, referencia, datos, merge=False):
+        self._escrituras.append(("set", referencia, datos, merge))
+
+    def create(self, referencia, datos):
+        self._escrituras.append(("create", referencia, datos, False))
+
+    def update(self, referencia, datos):
+        self._escrituras.append(("update", referencia, datos, False))
+
+    def delete(self, referencia):
+        self._escrituras.append(("delete", referencia, None, False))
+
+    def commit(self):
+        with self._db._lock:
+            existentes = {}
+            for operacion, referencia, _, _ in self._escrituras:
+                existe = existentes.get(referencia.path, referencia.path in self._db._docs)
+                if operacion == "update" and not existe:
+                    raise NotFound(f"No existe el documento {referencia.path}")
+                if operacion == "create" and existe:
+                    raise ValueError(f"El documento {referencia.path} ya existe")
+                existentes[referencia.path] = operacion != "delete"
+
+            for operacion, referencia, datos, merge in self._escrituras:
+                if operacion == "set":
+                    referencia.set(datos, merge=merge)
+                elif operacion == "create":
+                    referencia.create(datos)
+                elif operacion == "update":
+                    referencia.update(datos)
+                else:
+                    referencia.delete()
+        escrituras, self._escrituras = self._escrituras, []
+        return escrituras
+
+
+class TransaccionLocal(BatchLocal):
+    """
+    Transacción optimista compatible con firestore.transactional: recuerda la
+    versión de cada documento que leyó y, si alguno cambió antes del commit,
+    lanza Aborted para que el decorador la reintente.
+    """
+
+    def __init__(self, db, max_attempts=5, read_only=False):
+        super().__init__(db)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+        self._lecturas = {}
+
+    @property
+    def in_progress(self):
+        return self._id is not None
+
+    def get(self, referencia):
+        return referencia.get(transaction=self)
+
+    def get_all(self, referencias):
+        return self._db.get_all(referencias, transaction=self)
+
+    def _registrar_lectura(self, path, version):
+        self._lecturas.setdefault(path, version)
+
+    def _begin(self, retry_id=None):
+        self._id = uuid.uuid4().hex
+
+    def _clean_up(self):
+        self._escrituras = []
+        self._lecturas = {}
+        self._id = None
+
+    def _rollback(self):
+        self._clean_up()
+
+    def _commit(self):
+        with self._db._lock:
+            for path, version in self._lecturas.items():
+                if self._db._versiones.get(path) != version:
+                    raise Aborted(f"El documento {path} cambió durante la transacción")
+            escrituras = self.commit()
+        self._clean_up()
+        return escrituras
+
+
+class ClienteFirestoreLocal:
+    """
+    Reemplazo de firestore.client() que guarda todo en un dict en memoria.
+    """
+
+    def __init__(self, datos_iniciales=None):
+        self._docs = {}
+        self._update_times = {}
+        self._versiones = {}  # path -> contador de escrituras (para las transacciones)
+        self._lock = threading.RLock()
+        self._oyentes = []
+        for ruta, datos in (datos_iniciales or {}).items():
+            self._docs[ruta] = copy.deepcopy(datos)
+            self._update_times[ruta] = _ahora()
+
+    def collection(self, nombre):
+        return ColeccionLocal(self, nombre)
+
+    def document(self, path):
+        return DocumentoLocal(self, path)
+
+    def batch(self):
+        return BatchLocal(self)
+
+    def transaction(self, max_attempts=5, read_only=False):
+        return TransaccionLocal(self, max_attempts, read_only)
+
+    def collection_group(self, nombre):
+        return ConsultaLocal(self, nombre, grupo=True)
+
+    def get_all(self, referencias, transaction=None):
+        for referencia in referencias:
+            yield self._leer(referencia, transaction)
+
+    def _leer(self, referencia, transaction=None):
+        with self._lock:
+            datos = self._docs.get(referencia.path)
+            if transaction is not None:
+                transaction._registrar_lectura(referencia.path, self._versiones.get(referencia.path))
+            return SnapshotLocal(referencia, copy.deepcopy(datos), self._update_times.get(referencia.path))
+
+    def _listar(self, ruta, grupo=False):
+        """
+        (path, datos, update_time) de los documentos de la colección `ruta`, o de
+        todas las colecciones llamadas `ruta` si grupo=True.
+        """
+        prefijo = ruta + "/"
+        with self._lock:
+            return [
+                (path, copy.deepcopy(datos), self._update_times[path])
+                for path, datos in self._docs.items()
+                if (path.rsplit("/", 2)[-2] == ruta if grupo
+                    else path.startswith(prefijo) and "/" not in path[len(prefijo):])
+            ]
+
+    def _escribir(self, referencia, aplicar):
+        with self._lock:
+            antes = self._docs.get(referencia.path)
+            despues = aplicar(antes)
+            self._versiones[referencia.path] = self._versiones.get(referencia.path, 0) + 1
+            if despues is None:
+                self._docs.pop(referencia.path, None)
+                self._update_times.pop(referencia.path, None)
+            else:
+                self._docs[referencia.path] = despues
+                self._update_times[referencia.path] = _ahora()
+            oyentes = list(self._oyentes)
+        self._notificar(oyentes, referencia, antes, despues)
+
+    # ---------------------
+    # Listeners (on_snapshot)
+    # ---------------------
+
+    def _escuchar(self, consulta, callback):
+        oyente = (consulta, callback)
+        with self._lock:
+            self._oyentes.append(oyente)
+        docs = list(consulta.stream())
+        cambios = [SimpleNamespace(type=SimpleNamespace(name="ADDED"), document=doc) for doc in docs]
+        callback(docs, cambios, _ahora())
+
+        db = self
+
+        class _Watch:
+            def unsubscribe(self):
+                with db._lock:
+                    if oyente in db._oyentes:
+                        db._oyentes.remove(oyente)
+
+        return _Watch()
+
+    def _notificar(self, oyentes, referencia, antes, despues):
+        ruta_coleccion = referencia.path.rsplit("/", 1)[0]
+        for consulta, callback in oyentes:
+            if consulta._grupo or consulta._ruta != ruta_coleccion:
+                continue
+            estaba = consulta._coincide(antes)
+            esta = consulta._coincide(despues)
+            if not estaba and not esta:
+                continue
+            tipo = "REMOVED" if not esta else ("MODIFIED" if estaba else "ADDED")
+            snapshot = SnapshotLocal(referencia, copy.deepcopy(despues if esta else antes))
+            callback(list(consulta.stream()), [SimpleNamespace(type=SimpleNamespace(name=tipo), document=snapshot)], _ahora())
@@ -1,17 +1,46 @@
-from fastapi import FastAPI, Query, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Query, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from typing import List
-from buscar_recetas import buscar_recetas, limpiar_stopwords
-from opensearch_client import client  
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from buscar_recetas import buscar_recetas, limpiar_stopwords, buscar_paginado_async, buscar_multi_async, cache_busquedas, invalidar_cache_busquedas, resolver_campos, BUSQUEDA_MAX_SIZE
+from buscar_recetas import constructor_consultas
+from opensearch_client import client, async_client
+from clientes import registro
+from consultas_frecuentes import consultas_frecuentes
+import calentamiento
+from motor_local import respaldo_local
+import resiliencia
+from resiliencia import CircuitoAbierto
+from sugerencias import sugeridor, SUGERIR_MAX_SIZE
+from contadores_distribuidos import CONTADORES_SHARDS_MAX
 import os
-from scripts.firestore_to_opensearch import crear_indice_con_sinonimos, exportar_e_indexar_recetas  # <--- IMPORTA LAS FUNCIONES
+from scripts.firestore_to_opensearch import reindexar_blue_green  # <--- IMPORTA LAS FUNCIONES
+from routes.recetas import router as recetas_router, agregador, motor_likes, cache_recetas, etag_receta
+from buscar_recetas import version_indice_async, invalidar_version_indice
+from cache_http import MiddlewareCacheHTTP, ReglaCache, etag_de, query_canonica
 import time
-from opensearchpy import exceptions
-from routes.recetas import router as recetas_router
+from fastapi.concurrency import run_in_threadpool
 
 
-app = FastAPI(title="Buscador de Recetas")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clientes, conexiones y cache en segundo plano; /ready avisa cuando terminó
+    tarea_calentamiento = asyncio.create_task(calentamiento.calentar())
+    agregador.iniciar()
+    yield
+    tarea_calentamiento.cancel()
+    await run_in_threadpool(agregador.detener)  # escribe los contadores pendientes
+    try:
+        await run_in_threadpool(consultas_frecuentes.guardar)  # para el próximo calentamiento
+    except OSError as e:
+        print(f"⚠️ No se pudieron guardar las consultas frecuentes: {e}")
+    await registro.cerrar()
+
+
+app = FastAPI(title="Buscador de Recetas", lifespan=lifespan)
 app.include_router(recetas_router)
 
 host = os.getenv('OPENSEARCH_HOST', 'localhost')
@@ -24,6 +53,35 @@ password = os.getenv('OPENSEARCH_PASS', 'admin')
 def read_root():
     return {"message": "Hola FastAPI"}
 
+# ---------------------
+# Cache HTTP (ver cache_http.py): max-age por ruta y 304 sin llegar al handler
+# ---------------------
+CACHE_HTTP_MAX_AGE_BUSCAR = int(os.getenv('CACHE_HTTP_MAX_AGE_BUSCAR', 30))
+CACHE_HTTP_MAX_AGE_RECETA = int(os.getenv('CACHE_HTTP_MAX_AGE_RECETA', 60))
+CACHE_HTTP_MAX_AGE_SUGERIR = int(os.getenv('CACHE_HTTP_MAX_AGE_SUGERIR', 300))
+# El ranking cambia con los contadores: el ETag de /buscar se renueva cada ventana
+CACHE_HTTP_VENTANA_BUSCAR = int(os.getenv('CACHE_HTTP_VENTANA_BUSCAR', 300))
+
+
+async def etag_busqueda(path, query_string, match):
+    ventana = int(time.time() // CACHE_HTTP_VENTANA_BUSCAR)
+    return etag_de(await version_indice_async(), ventana, path, query_canonica(query_string))
+
+
+async def etag_detalle(path, query_string, match):
+    return etag_receta(match["receta_id"])
+
+
+app.add_middleware(
+    MiddlewareCacheHTTP,
+    reglas=[
+        ReglaCache(r"/buscar|/buscar_ids", CACHE_HTTP_MAX_AGE_BUSCAR, etag_busqueda,
+                   stale_while_revalidate=CACHE_HTTP_MAX_AGE_BUSCAR),
+        ReglaCache(r"/recetas/(?P<receta_id>[^/]+)", CACHE_HTTP_MAX_AGE_RECETA, etag_detalle),
+        ReglaCache(r"/sugerir", CACHE_HTTP_MAX_AGE_SUGERIR, etag_busqueda),
+    ]
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  
@@ -33,29 +91,133 @@ app.add_middleware(
 )
 
 @app.get("/buscar")
-def buscar(query: str = Query(..., description="Palabras clave para buscar recetas")):
+async def buscar(
+    response: Response,
+    query: str = Query(..., description="Palabras clave para buscar recetas"),
+    size: int = Query(5, ge=1, le=BUSQUEDA_MAX_SIZE, description="Resultados por página"),
+    pagina: int = Query(1, ge=1, description="Página (from/size)"),
+    paginacion_profunda: bool = Query(False, description="Abrir un cursor search_after para scroll profundo"),
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la respuesta anterior"),
+    vista: str = Query("full", description="Proyección de cada resultado: card o full"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (reemplaza a vista)"),
+    modo: str = Query("texto", description="texto, o despensa para buscar por los ingredientes que se tienen")
+):
     try:
-        texto_filtrado = limpiar_stopwords(query)
-        resultados = buscar_recetas(texto_filtrado, return_hits=True)  # usamos versión modificada
+        campos = resolver_campos(vista, fields)
+        pagina_resultados = await buscar_paginado_async(query, size, pagina, cursor, paginacion_profunda, campos,
+                                                        modo=modo)
+        resultados = pagina_resultados["resultados"]
+        if pagina_resultados["de_respaldo"]:
+            # Respuesta degradada del motor local: ni el navegador ni la CDN la guardan
+            response.headers["Cache-Control"] = "no-store"
         return {
             "query_original": query,
-            "query_filtrada": texto_filtrado,
+            "query_filtrada": pagina_resultados["query_filtrada"],
+            "modo": modo,
+            "pagina": None if (cursor or paginacion_profunda) else pagina,
+            "size": size,
             "total_resultados": len(resultados),
-            "resultados": resultados
+            "resultados": resultados,
+            "siguiente_cursor": pagina_resultados["siguiente_cursor"]
             }
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except CircuitoAbierto as e:
+        return JSONResponse(status_code=503, content={"error": str(e)})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+@app.get("/sugerir")
+async def sugerir(
+    q: str = Query(..., description="Lo que lleva escrito el usuario"),
+    size: int = Query(5, ge=1, le=SUGERIR_MAX_SIZE, description="Sugerencias por tipo")
+):
+    # Autocompletado (ver sugerencias.py): respuesta chica y sin el ranking completo de /buscar
+    try:
+        return await sugeridor.sugerir(q, size)
+    except Exception as e:
+        # Listas vacías para que el frontend no se rompa; el 503 evita que se cachee
+        print(f"⚠️ No se pudieron obtener sugerencias para '{q}': {e}")
+        return JSONResponse(status_code=503, content={"recetas": [], "ingredientes": []})
+
+# ---------------------
+# Varias búsquedas en un solo _msearch
+# ---------------------
+BUSQUEDA_MULTI_MAX = int(os.getenv('BUSQUEDA_MULTI_MAX', 20))
+
+class ConsultaMulti(BaseModel):
+    query: str
+    size: int = Field(5, ge=1, le=BUSQUEDA_MAX_SIZE)
+    pagina: int = Field(1, ge=1)
+
+class BuscarMultiRequest(BaseModel):
+    consultas: List[ConsultaMulti] = Field(..., min_length=1, max_length=BUSQUEDA_MULTI_MAX)
+    vista: str = "full"
+    fields: Optional[str] = None
+
+@app.post("/buscar/multi")
+async def buscar_multi(request: BuscarMultiRequest):
+    """
+    Mismo scoring que /buscar para cada consulta, en un solo round trip a OpenSearch.
+    Las respuestas vuelven en el orden pedido; si una consulta falla, su entrada trae "error".
+    """
+    try:
+        campos = resolver_campos(request.vista, request.fields)
+        respuestas = await buscar_multi_async(
+            [(c.query, c.size, c.pagina) for c in request.consultas], campos
+        )
+        resultados = []
+        for consulta, respuesta in zip(request.consultas, respuestas):
+            item = {"query_original": consulta.query, "pagina": consulta.pagina, "size": consulta.size}
+            if "error" in respuesta:
+                item["error"] = respuesta["error"]
+            else:
+                item.update({
+                    "query_filtrada": respuesta["query_filtrada"],
+                    "total_resultados": len(respuesta["resultados"]),
+                    "resultados": respuesta["resultados"],
+                })
+            resultados.append(item)
+        return {"total_consultas": len(resultados), "respuestas": resultados}
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except CircuitoAbierto as e:
+        return JSONResponse(status_code=503, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@app.get("/ready")
+async def ready():
+    # Para el health check del balanceador: 503 hasta que termine el calentamiento
+    return JSONResponse(status_code=200 if calentamiento.estado.listo else 503,
+                        content=calentamiento.estado.resumen())
+
 @app.get("/ping")
-def ping_opensearch():
+async def ping_opensearch():
     try:
-        if client.ping():
+        if await async_client.ping():
             return {"status": "OpenSearch OK"}
         else:
             return {"status": "OpenSearch no responde"}
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/admin/cache")
+def estadisticas_cache():
+    return {
+        "busquedas": cache_busquedas.estadisticas(),
+        "consultas": constructor_consultas.estadisticas(),
+        "recetas": cache_recetas.estadisticas(),
+        "contadores": agregador.contadores.estadisticas(),
+        "motor_local": respaldo_local.estadisticas(),
+        "sugerencias": sugeridor.estadisticas()
+    }
+
+@app.get("/admin/resiliencia")
+def estadisticas_resiliencia():
+    # Estado del circuit breaker y, por operación: llamadas, reintentos, plazos vencidos, hedges
+    return resiliencia.resumen()
+
 # @app.post("/admin/reindexar")
 # def reindexar():
 #     try:
@@ -67,32 +229,39 @@ def ping_opensearch():
 #         return JSONResponse(status_code=500, content={"error": str(e)})
 @app.post("/admin/reindexar")
 def reindexar():
-    index_name = "recetas"
     try:
-        # Intentar eliminar si existe
-        if client.indices.exists(index=index_name):
-            try:
-                client.indices.delete(index=index_name)
-                print(f"Índice '{index_name}' eliminado correctamente.")
-                time.sleep(1)
-            except Exception as e:
-                print(f"No se pudo eliminar el índice: {e}")
-
-        # Crear índice (pero solo si no existe)
-        try:
-            if not client.indices.exists(index=index_name):
-                crear_indice_con_sinonimos()
-                print(f"Índice '{index_name}' creado correctamente.")
-            else:
-                print(f"Índice '{index_name}' ya existe, se usará tal cual.")
-        except exceptions.RequestError as e:
-            if "resource_already_exists_exception" in str(e):
-                print("El índice ya existía, continuando...")
-            else:
-                raise
+        # Se carga un índice versionado nuevo y luego se cambia el alias "recetas",
+        # así /buscar sigue respondiendo con el índice anterior durante la carga.
+        resultado = reindexar_blue_green()
+        invalidar_cache_busquedas()
+        invalidar_version_indice()
+        cache_recetas.invalidar()
+        sugeridor.invalidar()
+        return {
+            "message": f"Reindexado correctamente ({resultado['total']} recetas).",
+            "indice": resultado["indice"],
+            "indices_eliminados": resultado["indices_eliminados"]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/admin/recetas/{receta_id}/shards")
+def configurar_shards(receta_id: str, num_shards: int = Query(..., ge=1, le=CONTADORES_SHARDS_MAX)):
+    # Más shards para una receta viral: reparte sus incrementos de views/likes (ver contadores_distribuidos.py)
+    contadores = agregador.contadores
+    if contadores.configuracion([receta_id]).get(receta_id) is None:
+        raise HTTPException(status_code=404, detail="Receta no encontrada")
+    try:
+        contadores.configurar_shards(receta_id, num_shards)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": f"La receta {receta_id} usa {num_shards} shards."}
 
-        # Reindexar las recetas desde Firebase
-        total = exportar_e_indexar_recetas()
-        return {"message": f"Reindexado correctamente ({total} recetas)."}
+@app.post("/admin/migrar_likes")
+def migrar_likes():
+    try:
+        # Copia los arrays `likes` de los usuarios a usuarios/{uid}/likes (ver motor_likes.py)
+        migrados = motor_likes.migrar_likes_legados()
+        return {"message": f"Likes migrados para {migrados} usuarios."}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
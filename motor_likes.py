@@ -0,0 +1,117 @@
+# motor_likes.py
+"""
+Likes transaccionales.
+
+Cada like es un documento usuarios/{uid}/likes/{receta_id}: saber si el usuario
+ya dio like es leer un documento (O(1)), no recorrer el array `likes` del usuario.
+La lectura (receta + usuario + like, un solo get_all) y las escrituras van en una
+transacción de Firestore, así dos likes simultáneos del mismo usuario no cuentan doble.
+
+El array `likes` del usuario se sigue escribiendo para los clientes que lo leen.
+Mientras el usuario no tenga `likes_migrados`, un like que está solo en el array
+también cuenta (y se migra al subdocumento en esa misma transacción).
+
+El contador de la receta lo escribe el agregador (ver agregador_contadores.py):
+se encola solo después del commit, así los reintentos de la transacción no suman dos veces.
+"""
+from firebase_admin import firestore
+from google.api_core.exceptions import NotFound
+
+COLECCION_LIKES_USUARIO = "likes"
+CAMPO_LIKES_MIGRADOS = "likes_migrados"
+
+
+class MotorLikes:
+
+    def __init__(self, db, agregador):
+        self.db = db
+        self.agregador = agregador
+
+    def _referencias(self, receta_id, uid):
+        usuario = self.db.collection("usuarios").document(uid)
+        return (
+            self.db.collection("recetas").document(receta_id),
+            usuario,
+            usuario.collection(COLECCION_LIKES_USUARIO).document(receta_id),
+        )
+
+    def _cambiar_en_transaccion(self, transaction, receta_id, uid, dar):
+        """
+        Devuelve (cambio, receta): cambio es +1/-1, o 0 si el like ya estaba así.
+        """
+        receta_ref, usuario_ref, like_ref = self._referencias(receta_id, uid)
+        snapshots = {s.reference.path: s for s in self.db.get_all([receta_ref, usuario_ref, like_ref], transaction=transaction)}
+        receta, usuario, like = (snapshots[r.path] for r in (receta_ref, usuario_ref, like_ref))
+        if not receta.exists:
+            raise NotFound(f"Receta {receta_id} no encontrada")
+
+        tenia_like = like.exists
+        datos_usuario = usuario.to_dict() or {}
+        if not tenia_like and not datos_usuario.get(CAMPO_LIKES_MIGRADOS):
+            tenia_like = receta_id in set(datos_usuario.get("likes") or [])
+
+        if tenia_like == dar:
+            if dar and not like.exists:
+                transaction.set(like_ref, {"receta_id": receta_id, "creado_en": firestore.SERVER_TIMESTAMP})
+            return 0, receta.to_dict()
+
+        if dar:
+            transaction.set(like_ref, {"receta_id": receta_id, "creado_en": firestore.SERVER_TIMESTAMP})
+            transaction.set(usuario_ref, {"likes": firestore.ArrayUnion([receta_id])}, merge=True)
+        else:
+            transaction.delete(like_ref)
+            transaction.set(usuario_ref, {"likes": firestore.ArrayRemove([receta_id])}, merge=True)
+        return (1 if dar else -1), receta.to_dict()
+
+    def cambiar(self, receta_id, uid, dar):
+        """
+        Da o quita el like. Devuelve (cambio, likes) con el total nuevo de likes,
+        calculado sin volver a leer la receta: lo leído en la transacción + la suma
+        cacheada de los shards + lo que el agregador todavía no escribió.
+        Lanza NotFound si la receta no existe.
+        """
+        cambiar = firestore.transactional(self._cambiar_en_transaccion)
+        cambio, receta = cambiar(self.db.transaction(), receta_id, uid, dar)
+
+        if cambio:
+            self.agregador.incrementar(receta_id, likes=cambio)
+            self.agregador.actualizar_campos(
+                receta_id, {f"liked_by.{uid}": True if dar else firestore.DELETE_FIELD}
+            )
+        likes = self.agregador.contadores.totales(receta_id, receta).get("likes", 0)
+        return cambio, max(0, likes + self.agregador.pendiente(receta_id, "likes"))
+
+    def dar(self, receta_id, uid):
+        return self.cambiar(receta_id, uid, True)
+
+    def quitar(self, receta_id, uid):
+        return self.cambiar(receta_id, uid, False)
+
+    def tiene_like(self, receta_id, uid):
+        return self._referencias(receta_id, uid)[2].get().exists
+
+    def migrar_likes_legados(self, tamano_lote=400):
+        """
+        Pasa el array `likes` de cada usuario a la subcolección y marca
+        `likes_migrados`, para que dejen de consultarse los arrays.
+        Devuelve cuántos usuarios se migraron.
+        """
+        migrados = 0
+        for usuario in self.db.collection("usuarios").stream():
+            datos = usuario.to_dict() or {}
+            if datos.get(CAMPO_LIKES_MIGRADOS):
+                continue
+            likes = list(dict.fromkeys(datos.get("likes") or []))
+            for inicio in range(0, len(likes), tamano_lote):
+                batch = self.db.batch()
+                for receta_id in likes[inicio:inicio + tamano_lote]:
+                    batch.set(
+                        usuario.reference.collection(COLECCION_LIKES_USUARIO).document(receta_id),
+                        {"receta_id": receta_id, "creado_en": firestore.SERVER_TIMESTAMP},
+                        merge=True
+                    )
+                batch.commit()
+            usuario.reference.set({CAMPO_LIKES_MIGRADOS: True}, merge=True)
+            migrados += 1
+        print(f"✅ Likes migrados a subcolecciones para {migrados} usuarios.")
+        return migrados
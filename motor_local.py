@@ -0,0 +1,240 @@
+# motor_local.py
+"""
+Motor de búsqueda local (en proceso) para cuando OpenSearch no responde.
+
+Índice invertido con BM25 sobre los mismos campos normalizados que
+exportar_e_indexar_recetas manda a OpenSearch (titulo, ingredientes_texto,
+descripcion, pasos), con los mismos boosts por campo y por likes/popup_clicks.
+Se construye desde un snapshot JSONL con el formato del spool de
+preparar_reindexado ({"_id", "_source"} por línea): cada reindexado deja una
+copia en MOTOR_LOCAL_SNAPSHOT y el calentamiento la carga al arrancar. Si no
+hay snapshot (disco efímero, arranque sin reindexado) o tiene más de
+MOTOR_LOCAL_SNAPSHOT_MAX_EDAD segundos, el calentamiento lo arma desde el índice.
+
+Es una aproximación: sin fuzziness ni tendencia, y los contadores son los del
+último reindexado. Solo se usa detrás del circuit breaker (ver resiliencia.py).
+"""
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from opensearchpy import helpers
+
+from normalizacion import normalizar_texto
+
+MOTOR_LOCAL_SNAPSHOT = os.getenv('MOTOR_LOCAL_SNAPSHOT', os.path.join(tempfile.gettempdir(), 'recetas_snapshot.jsonl'))
+MOTOR_LOCAL_SNAPSHOT_MAX_EDAD = float(os.getenv('MOTOR_LOCAL_SNAPSHOT_MAX_EDAD', 24 * 3600))
+
+# Mismos pesos que CAMPOS_BUSQUEDA en buscar_recetas.py
+CAMPOS_LOCALES = {"titulo": 3.0, "ingredientes_texto": 2.0, "descripcion": 1.0, "pasos": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def _raiz(token):
+    # Aproxima el light_spanish del índice en lo que más importa: plurales
+    if len(token) > 4 and token.endswith("ces"):
+        return token[:-3] + "z"
+    if len(token) > 4 and token.endswith("es"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def tokenizar(texto):
+    # Misma normalización que el indexado y las consultas (ver normalizacion.py)
+    return [_raiz(token) for token in normalizar_texto(texto).split()]
+
+
+def _log1p(valor):
+    # El modifier log1p de field_value_factor es log10(1 + x)
+    try:
+        return math.log10(1 + max(float(valor or 0), 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class MotorLocal:
+
+    def __init__(self, documentos):
+        """
+        documentos: iterable de {"_id", "_source"} (líneas del spool/snapshot).
+        """
+        self.ids = []
+        self.fuentes = []
+        self.popularidad = []
+        self._postings = {campo: defaultdict(list) for campo in CAMPOS_LOCALES}  # token -> [(doc, tf)]
+        self._largos = {campo: [] for campo in CAMPOS_LOCALES}
+
+        for documento in documentos:
+            indice = len(self.ids)
+            fuente = documento["_source"]
+            self.ids.append(documento["_id"])
+            self.fuentes.append(fuente)
+            self.popularidad.append(_log1p(fuente.get("likes")) + 0.5 * _log1p(fuente.get("popup_clicks")))
+            for campo in CAMPOS_LOCALES:
+                frecuencias = defaultdict(int)
+                tokens = tokenizar(fuente.get(campo, ""))
+                for token in tokens:
+                    frecuencias[token] += 1
+                for token, tf in frecuencias.items():
+                    self._postings[campo][token].append((indice, tf))
+                self._largos[campo].append(len(tokens))
+
+        total = len(self.ids)
+        self._promedios = {
+            campo: (sum(largos) / total if total else 0) or 1 for campo, largos in self._largos.items()
+        }
+
+    @classmethod
+    def desde_snapshot(cls, ruta):
+        with open(ruta, encoding="utf-8") as snapshot:
+            return cls(json.loads(linea) for linea in snapshot if linea.strip())
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _idf(self, campo, token):
+        n = len(self._postings[campo].get(token, ()))
+        return math.log(1 + (len(self.ids) - n + 0.5) / (n + 0.5))
+
+    def _puntajes_termino(self, tokens):
+        """
+        {doc: puntaje} de un término (frase + sinónimos): por campo se suman los
+        BM25 de sus tokens y se queda el mejor campo con su boost, como multi_match.
+        """
+        mejores = {}
+        for campo, boost in CAMPOS_LOCALES.items():
+            largos, promedio = self._largos[campo], self._promedios[campo]
+            por_doc = defaultdict(float)
+            for token in tokens:
+                postings = self._postings[campo].get(token)
+                if not postings:
+                    continue
+                idf = self._idf(campo, token)
+                for doc, tf in postings:
+                    norma = BM25_K1 * (1 - BM25_B + BM25_B * largos[doc] / promedio)
+                    por_doc[doc] += idf * tf * (BM25_K1 + 1) / (tf + norma)
+            for doc, puntaje in por_doc.items():
+                puntaje *= boost
+                if puntaje > mejores.get(doc, 0):
+                    mejores[doc] = puntaje
+        return mejores
+
+    def buscar(self, terminos, size=5, desde=0):
+        """
+        terminos: lo que devuelve ConstructorConsultas.segmentar, ((frase, sinonimos), ...).
+        Cada término es obligatorio (como los must de la consulta real). Devuelve hits
+        con la forma de OpenSearch ({"_id", "_score", "_source"}) para procesar_hits.
+        """
+        puntajes = None
+        for frase, sinonimos in terminos:
+            tokens = {token for texto in (frase,) + tuple(sinonimos) for token in tokenizar(texto)}
+            del_termino = self._puntajes_termino(tokens)
+            if puntajes is None:
+                puntajes = del_termino
+            else:
+                puntajes = {doc: p + del_termino[doc] for doc, p in puntajes.items() if doc in del_termino}
+            if not puntajes:
+                return []
+        if not puntajes:
+            return []
+
+        ordenados = sorted(
+            ((p + self.popularidad[doc], doc) for doc, p in puntajes.items()),
+            key=lambda par: (-par[0], self.ids[par[1]])
+        )
+        return [
+            {"_id": self.ids[doc], "_score": puntaje, "_source": self.fuentes[doc]}
+            for puntaje, doc in ordenados[desde:desde + size]
+        ]
+
+
+class RespaldoLocal:
+    """
+    Mantiene el MotorLocal vigente; se reemplaza entero al recargar el snapshot.
+    """
+
+    def __init__(self, ruta=MOTOR_LOCAL_SNAPSHOT):
+        self.ruta = ruta
+        self.motor = None
+        self.cargado_en = None
+        self.busquedas = 0
+        self._lock = threading.Lock()
+
+    @property
+    def disponible(self):
+        return self.motor is not None
+
+    def cargar(self):
+        if not self.ruta or not os.path.exists(self.ruta):
+            return 0
+        with self._lock:
+            motor = MotorLocal.desde_snapshot(self.ruta)
+            self.motor, self.cargado_en = motor, time.time()
+        print(f"✅ Motor local cargado con {len(motor)} recetas desde {self.ruta}.")
+        return len(motor)
+
+    def necesita_snapshot(self, max_edad=MOTOR_LOCAL_SNAPSHOT_MAX_EDAD):
+        """
+        True si no hay snapshot o es más viejo que max_edad segundos.
+        """
+        if not self.ruta:
+            return False
+        if not os.path.exists(self.ruta):
+            return True
+        return bool(max_edad) and time.time() - os.path.getmtime(self.ruta) > max_edad
+
+    def exportar_desde_indice(self, client, index="recetas"):
+        """
+        Arma el snapshot recorriendo el índice con scroll (helpers.scan) y recarga
+        el motor. Los documentos del índice tienen los mismos campos que el spool.
+        """
+        if not self.ruta:
+            return 0
+        temporal = f"{self.ruta}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8") as snapshot:
+                for hit in helpers.scan(client, index=index, query={"query": {"match_all": {}}}, size=1000):
+                    snapshot.write(json.dumps({"_id": hit["_id"], "_source": hit["_source"]}, ensure_ascii=False) + "\n")
+            os.replace(temporal, self.ruta)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        return self.cargar()
+
+    def guardar_snapshot(self, ruta_spool):
+        """
+        Copia el spool de un reindexado como snapshot y recarga el motor.
+        """
+        if not self.ruta:
+            return 0
+        temporal = self.ruta + ".tmp"
+        shutil.copyfile(ruta_spool, temporal)
+        os.replace(temporal, self.ruta)
+        return self.cargar()
+
+    def buscar(self, terminos, size=5, desde=0):
+        motor = self.motor
+        if motor is None:
+            raise RuntimeError("El motor local no tiene snapshot cargado")
+        self.busquedas += 1
+        return motor.buscar(terminos, size=size, desde=desde)
+
+    def estadisticas(self):
+        return {
+            "disponible": self.disponible,
+            "recetas": len(self.motor) if self.motor else 0,
+            "snapshot": self.ruta,
+            "cargado_en": self.cargado_en,
+            "busquedas": self.busquedas,
+        }
+
+
+respaldo_local = RespaldoLocal()
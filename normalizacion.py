@@ -0,0 +1,102 @@
+# normalizacion.py
+"""
+Normalización de texto compartida por el indexado y las consultas.
+
+Los documentos (firestore_to_opensearch.construir_documento), las consultas
+(buscar_recetas.limpiar_stopwords) y el motor local pasan por las mismas
+tablas: minúsculas, sin acentos ("después" -> "despues", "ñ" -> "n") y sin
+signos de puntuación. Así la consulta y el índice siempre coinciden.
+
+Las tablas de traducción y las stopwords se arman una sola vez al importar.
+limpiar_consulta memoriza las consultas repetidas y normalizar_lote normaliza
+muchos textos en una sola pasada (para el indexado).
+Ver scripts/benchmark_normalizacion.py.
+"""
+import os
+import string
+import unicodedata
+from functools import lru_cache
+
+NORMALIZACION_CACHE_MAX = int(os.getenv('NORMALIZACION_CACHE_MAX', 4096))
+
+# Separador para normalizar_lote: no es puntuación ni se modifica al normalizar
+_SEPARADOR = "\x1f"
+
+# Tablas precompiladas para bytes.translate (en C, sin regex): mayúsculas ->
+# minúsculas, y los signos de puntuación se borran. Se aplican después de pasar
+# a ASCII, así que los signos españoles (¿ ¡ « ») ya no están.
+_MINUSCULAS = bytes.maketrans(string.ascii_uppercase.encode(), string.ascii_lowercase.encode())
+_PUNTUACION = string.punctuation.encode()
+
+
+def _a_ascii(texto):
+    # NFKD separa la letra de su tilde; el encode descarta lo que no es ASCII
+    if texto.isascii():
+        return texto.encode("ascii")
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore")
+
+
+STOPWORDS = frozenset(
+    unicodedata.normalize("NFKD", palabra).encode("ASCII", "ignore").decode()
+    for palabra in (
+        "quiero", "una", "unas", "un", "unos",
+        "que", "ke",
+        "tenga", "tengo", "tienes", "tiene", "tener",
+        "reseta", "receta",
+        "el", "la", "los", "las",
+        "y", "o", "u",
+        "de", "del", "en", "con", "para", "por", "se", "al", "a", "mi", "tu", "su",
+        "como", "más", "menos", "sin", "pero", "si",
+        "me", "te", "le", "lo", "nos", "os", "les",
+        "este", "esta", "estos", "estas",
+        "es", "son", "fue", "era", "ser",
+        "hoy", "ahora",
+        "durante",
+        "desde", "hasta",
+        "antes", "después", "luego",
+        "también",
+        "algo",
+        "mucho", "muchos", "poco", "pocos",
+        "cada",
+        "todos", "todas",
+        "donde",
+        "cuando",
+        "cual", "cuales",
+        "porque",
+    )
+)
+
+
+def normalizar_texto(texto):
+    """
+    Minúsculas, sin acentos y sin puntuación. Lo que no es texto devuelve "".
+    """
+    if not isinstance(texto, str):
+        return ""
+    return _a_ascii(texto).translate(_MINUSCULAS, _PUNTUACION).decode("ascii")
+
+
+def normalizar_lote(textos):
+    """
+    normalizar_texto para muchos textos a la vez (campos de un documento, o de
+    varios): se unen, se normalizan con una sola pasada y se vuelven a partir.
+    """
+    textos = [texto if isinstance(texto, str) else "" for texto in textos]
+    if not textos:
+        return []
+    unido = _SEPARADOR.join(textos)
+    if unido.count(_SEPARADOR) != len(textos) - 1:
+        return [normalizar_texto(texto) for texto in textos]
+    return _a_ascii(unido).translate(_MINUSCULAS, _PUNTUACION).decode("ascii").split(_SEPARADOR)
+
+
+def quitar_stopwords(texto_normalizado):
+    return " ".join(palabra for palabra in texto_normalizado.split() if palabra not in STOPWORDS)
+
+
+@lru_cache(maxsize=NORMALIZACION_CACHE_MAX)
+def limpiar_consulta(texto):
+    """
+    Consulta normalizada y sin stopwords. Memoriza las consultas repetidas.
+    """
+    return quitar_stopwords(normalizar_texto(texto))
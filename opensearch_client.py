@@ -1,6 +1,7 @@
 # opensearch_client.py
-from opensearchpy import OpenSearch
+from opensearchpy import OpenSearch, AsyncOpenSearch
 from dotenv import load_dotenv
+from clientes import registro
 import os
 
 load_dotenv()  # Carga desde .env
@@ -10,12 +11,39 @@ port = int(os.getenv('OPENSEARCH_PORT', 443))
 user = os.getenv('OPENSEARCH_USER')  # antes: OPENSEARCH_USERNAME
 password = os.getenv('OPENSEARCH_PASS')  # antes: OPENSEARCH_PASSWORD
 
-client = OpenSearch(
-    hosts=[{"host": host, "port": port}],
-    http_auth=(user, password),
-    use_ssl=True,
-    verify_certs=False,
-    ssl_assert_hostname=True,
-    ssl_show_warn=True,
-    http_compress=True
-)
+# Conexiones abiertas por cliente; cada búsqueda concurrente necesita una
+pool_maxsize = int(os.getenv('OPENSEARCH_POOL_MAXSIZE', 50))
+timeout = int(os.getenv('OPENSEARCH_TIMEOUT', 10))
+
+def crear_cliente():
+    return OpenSearch(
+        hosts=[{"host": host, "port": port}],
+        http_auth=(user, password),
+        use_ssl=True,
+        verify_certs=False,
+        ssl_assert_hostname=True,
+        ssl_show_warn=True,
+        http_compress=True,
+        pool_maxsize=pool_maxsize,
+        timeout=timeout
+    )
+
+
+# Cliente asíncrono (aiohttp) para los endpoints async: no ocupa un hilo del
+# threadpool mientras espera la red. La sesión se crea en la primera petición.
+def crear_cliente_async():
+    return AsyncOpenSearch(
+        hosts=[{"host": host, "port": port}],
+        http_auth=(user, password),
+        use_ssl=True,
+        verify_certs=False,
+        ssl_show_warn=True,
+        http_compress=True,
+        maxsize=pool_maxsize,
+        timeout=timeout
+    )
+
+
+# Se crean en el primer uso (ver clientes.py): importar este módulo no abre conexiones
+client = registro.registrar("opensearch", crear_cliente)
+async_client = registro.registrar("opensearch_async", crear_cliente_async)
@@ -0,0 +1,67 @@
+# redis_local.py
+"""
+Redis en memoria con la parte de la API de redis-py que usa el cache de recetas
+(get, mget, set con ex, delete, scan_iter). Sirve para probar el backend
+compartido sin un servidor Redis (CACHE_RECETAS_REDIS_URL=local).
+"""
+import fnmatch
+import threading
+import time
+
+
+class RedisLocal:
+
+    def __init__(self):
+        self._datos = {}  # clave -> (expira_en | None, valor)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bytes(valor):
+        return valor if isinstance(valor, bytes) else str(valor).encode()
+
+    @staticmethod
+    def _clave(clave):
+        # Como en Redis, "receta:1" y b"receta:1" son la misma clave (scan_iter devuelve bytes)
+        return clave.decode() if isinstance(clave, bytes) else str(clave)
+
+    def _vigente(self, clave, ahora):
+        clave = self._clave(clave)
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            return None
+        expira_en, valor = entrada
+        if expira_en is not None and expira_en <= ahora:
+            del self._datos[clave]
+            return None
+        return valor
+
+    def get(self, clave):
+        with self._lock:
+            return self._vigente(clave, time.monotonic())
+
+    def mget(self, claves):
+        ahora = time.monotonic()
+        with self._lock:
+            return [self._vigente(clave, ahora) for clave in claves]
+
+    def set(self, clave, valor, ex=None):
+        expira_en = time.monotonic() + ex if ex else None
+        with self._lock:
+            self._datos[self._clave(clave)] = (expira_en, self._bytes(valor))
+        return True
+
+    def delete(self, *claves):
+        with self._lock:
+            return sum(self._datos.pop(self._clave(clave), None) is not None for clave in claves)
+
+    def scan_iter(self, match="*"):
+        match = self._clave(match)
+        ahora = time.monotonic()
+        with self._lock:
+            claves = [clave for clave in list(self._datos) if self._vigente(clave, ahora) is not None]
+        return iter([clave.encode() for clave in claves if fnmatch.fnmatchcase(clave, match)])
+
+    def flushdb(self):
+        with self._lock:
+            self._datos.clear()
+        return True
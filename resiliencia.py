@@ -0,0 +1,287 @@
+# resiliencia.py
+"""
+Capa de resiliencia alrededor de las llamadas a OpenSearch.
+
+- Plazo (deadline) por llamada: OPENSEARCH_DEADLINE segundos en total, contando
+  reintentos y coberturas. Vencido el plazo, la llamada se cancela y falla.
+- Reintentos con backoff exponencial y jitter completo, solo para lecturas
+  idempotentes y solo ante fallos del cluster.
+- Hedged requests opcionales (OPENSEARCH_HEDGE_DESPUES > 0): si la respuesta
+  tarda más que eso, se lanza una copia con otra `preference` (así va a otras
+  réplicas de los shards) y gana la primera que responde.
+- Circuit breaker: después de CIRCUITO_UMBRAL_FALLOS fallos seguidos del
+  cluster (conexión, timeout o 5xx) el circuito se abre y las búsquedas se
+  responden sin esperar a OpenSearch: desde el cache o con el motor local
+  (ver motor_local.py). Pasados CIRCUITO_ESPERA_APERTURA segundos se deja pasar
+  una sola llamada de prueba (semiabierto); si sale bien el circuito se cierra,
+  si no vuelve a abrirse. Los errores del request (400, 404) no cuentan.
+
+Las métricas de cada operación y el estado del circuito salen en /admin/resiliencia.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from opensearchpy import exceptions
+
+CIRCUITO_UMBRAL_FALLOS = int(os.getenv('CIRCUITO_UMBRAL_FALLOS', 5))
+CIRCUITO_ESPERA_APERTURA = float(os.getenv('CIRCUITO_ESPERA_APERTURA', 30))
+OPENSEARCH_DEADLINE = float(os.getenv('OPENSEARCH_DEADLINE', 2.5))
+OPENSEARCH_REINTENTOS = int(os.getenv('OPENSEARCH_REINTENTOS', 2))
+OPENSEARCH_ESPERA_BASE = float(os.getenv('OPENSEARCH_ESPERA_BASE', 0.05))
+OPENSEARCH_ESPERA_MAXIMA = float(os.getenv('OPENSEARCH_ESPERA_MAXIMA', 0.5))
+OPENSEARCH_HEDGE_DESPUES = float(os.getenv('OPENSEARCH_HEDGE_DESPUES', 0))  # 0 = sin hedged requests
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+class CircuitoAbierto(Exception):
+    pass
+
+
+class PlazoVencido(asyncio.TimeoutError):
+    pass
+
+
+def es_falla_de_cluster(error):
+    """
+    True si el error es del cluster y no del request.
+    """
+    if isinstance(error, (exceptions.ConnectionError, asyncio.TimeoutError, TimeoutError, OSError)):
+        return True
+    if isinstance(error, exceptions.TransportError):
+        estado = error.status_code
+        return not isinstance(estado, int) or estado >= 500 or estado == 429
+    return False
+
+
+class CircuitBreaker:
+
+    def __init__(self, nombre, umbral_fallos=CIRCUITO_UMBRAL_FALLOS, espera_apertura=CIRCUITO_ESPERA_APERTURA):
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos
+        self.espera_apertura = espera_apertura
+        self.estado = CERRADO
+        self.fallos_seguidos = 0
+        self.abierto_en = None
+        self.cambio_en = time.time()
+        self.transiciones = Counter()  # estado -> veces que se entró
+        self.exitos = 0
+        self.fallos = 0
+        self.rechazadas = 0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    def _cambiar(self, estado):
+        # Se llama con el lock tomado
+        if estado == self.estado:
+            return
+        if estado == ABIERTO:
+            print(f"⚠️ Circuito '{self.nombre}' abierto tras {self.fallos_seguidos} fallos.")
+        elif estado == SEMIABIERTO:
+            print(f"🔄 Circuito '{self.nombre}' semiabierto: probando el cluster.")
+        else:
+            print(f"✅ Circuito '{self.nombre}' cerrado: el cluster responde.")
+        self.estado = estado
+        self.cambio_en = time.time()
+        self.transiciones[estado] += 1
+
+    def permite(self):
+        """
+        True si la llamada puede ir al cluster. En semiabierto solo pasa una prueba a la vez.
+        """
+        with self._lock:
+            if self.estado == CERRADO:
+                return True
+            if self.estado == ABIERTO and time.monotonic() - self.abierto_en >= self.espera_apertura:
+                self._cambiar(SEMIABIERTO)
+            if self.estado == SEMIABIERTO and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                return True
+            self.rechazadas += 1
+            return False
+
+    @contextmanager
+    def intento(self):
+        """
+        Envuelve una llamada recién admitida por permite(). Si era la prueba del
+        semiabierto y termina sin registrar_exito ni registrar_fallo (la cancela un
+        cliente que se desconecta, o es la copia perdedora de un hedge), la prueba
+        se libera; si no, el circuito rechazaría todo para siempre.
+        """
+        with self._lock:
+            prueba = self.estado == SEMIABIERTO and self._prueba_en_curso
+        try:
+            yield
+        finally:
+            if prueba:
+                with self._lock:
+                    if self.estado == SEMIABIERTO:
+                        self._prueba_en_curso = False
+
+    def registrar_exito(self):
+        with self._lock:
+            self.exitos += 1
+            self.fallos_seguidos = 0
+            self._prueba_en_curso = False
+            self._cambiar(CERRADO)
+
+    def registrar_fallo(self):
+        with self._lock:
+            self.fallos += 1
+            self.fallos_seguidos += 1
+            self._prueba_en_curso = False
+            if self.estado == SEMIABIERTO or self.fallos_seguidos >= self.umbral_fallos:
+                self._cambiar(ABIERTO)
+                self.abierto_en = time.monotonic()
+
+    def resumen(self):
+        with self._lock:
+            return {
+                "estado": self.estado,
+                "segundos_en_estado": round(time.time() - self.cambio_en, 1),
+                "fallos_seguidos": self.fallos_seguidos,
+                "umbral_fallos": self.umbral_fallos,
+                "espera_apertura": self.espera_apertura,
+                "aperturas": self.transiciones[ABIERTO],
+                "exitos": self.exitos,
+                "fallos": self.fallos,
+                "rechazadas": self.rechazadas,
+            }
+
+
+circuito_opensearch = CircuitBreaker("opensearch")
+
+
+# ---------------------
+# Métricas por operación
+# ---------------------
+
+class MetricasResiliencia:
+
+    def __init__(self):
+        self._eventos = defaultdict(Counter)  # operacion -> evento -> veces
+        self._lock = threading.Lock()
+
+    def sumar(self, operacion, evento, cantidad=1):
+        with self._lock:
+            self._eventos[operacion][evento] += cantidad
+
+    def resumen(self):
+        with self._lock:
+            return {operacion: dict(eventos) for operacion, eventos in self._eventos.items()}
+
+
+metricas = MetricasResiliencia()
+
+
+# ---------------------
+# Llamadas con plazo, reintentos y hedged requests
+# ---------------------
+
+def espera_con_jitter(intento, base=OPENSEARCH_ESPERA_BASE, maxima=OPENSEARCH_ESPERA_MAXIMA):
+    # Jitter completo: evita que todos los workers reintenten a la vez
+    return random.uniform(0, min(maxima, base * 2 ** intento))
+
+
+async def _primera_respuesta(operacion, nombre, limite, hedge_despues):
+    """
+    Lanza operacion(0) y, si tarda más que hedge_despues, una copia operacion(1).
+    Devuelve la primera respuesta correcta y cancela la otra.
+    """
+    original = asyncio.ensure_future(operacion(0))
+    tareas = {original}
+    cubierta = False
+    error = None
+    try:
+        while tareas:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                raise PlazoVencido(f"{nombre}: venció el plazo")
+            espera = restante
+            if hedge_despues and not cubierta:
+                espera = min(espera, hedge_despues)
+            hechas, tareas = await asyncio.wait(tareas, timeout=espera, return_when=asyncio.FIRST_COMPLETED)
+            for tarea in hechas:
+                if tarea.exception() is None:
+                    if tarea is not original:
+                        metricas.sumar(nombre, "hedges_ganados")
+                    return tarea.result()
+                error = tarea.exception()
+            if not hechas and hedge_despues and not cubierta:
+                cubierta = True
+                metricas.sumar(nombre, "hedges")
+                tareas.add(asyncio.ensure_future(operacion(1)))
+        raise error
+    finally:
+        for tarea in tareas:
+            tarea.cancel()
+
+
+async def llamar(operacion, nombre, deadline=OPENSEARCH_DEADLINE, reintentos=OPENSEARCH_REINTENTOS,
+                 idempotente=True, hedge_despues=None):
+    """
+    Ejecuta operacion(copia) (una corrutina; copia es 0, o 1 para la copia de
+    cobertura) con plazo total `deadline`. Las lecturas idempotentes se reintentan
+    ante fallos del cluster mientras quede plazo.
+    """
+    if hedge_despues is None:
+        hedge_despues = OPENSEARCH_HEDGE_DESPUES if idempotente else 0
+    limite = time.monotonic() + deadline
+    metricas.sumar(nombre, "llamadas")
+    intento = 0
+    while True:
+        try:
+            return await _primera_respuesta(operacion, nombre, limite, hedge_despues)
+        except PlazoVencido:
+            metricas.sumar(nombre, "plazos_vencidos")
+            raise
+        except Exception as e:
+            if not es_falla_de_cluster(e):
+                raise
+            metricas.sumar(nombre, "fallos")
+            espera = espera_con_jitter(intento)
+            if not idempotente or intento >= reintentos or time.monotonic() + espera >= limite:
+                raise
+            metricas.sumar(nombre, "reintentos")
+            intento += 1
+            await asyncio.sleep(espera)
+
+
+async def llamar_con_circuito(circuito, operacion, nombre, **opciones):
+    """
+    llamar() detrás del circuit breaker. Lanza CircuitoAbierto si el circuito no
+    deja pasar la llamada. Los errores del request cuentan como éxito (el cluster
+    respondió); los del cluster, como fallo.
+    """
+    if not circuito.permite():
+        raise CircuitoAbierto("OpenSearch no está disponible")
+    with circuito.intento():
+        try:
+            respuesta = await llamar(operacion, nombre, **opciones)
+        except Exception as e:
+            if es_falla_de_cluster(e):
+                circuito.registrar_fallo()
+            else:
+                circuito.registrar_exito()
+            raise
+        circuito.registrar_exito()
+        return respuesta
+
+
+def preferencia_de(copia):
+    """
+    `preference` de la copia: la original deja elegir al cluster (adaptive replica
+    selection); la de cobertura usa otra clave para caer en otras réplicas.
+    """
+    return None if copia == 0 else f"cobertura-{copia}"
+
+
+def resumen():
+    return {"circuito_opensearch": circuito_opensearch.resumen(), "operaciones": metricas.resumen()}
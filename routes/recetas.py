@@ -1,15 +1,22 @@
-from fastapi import APIRouter, Body, HTTPException
-import firebase_admin
-from firebase_admin import firestore, credentials, auth
+from fastapi import APIRouter, HTTPException, Header, Response
+from fastapi.responses import JSONResponse
 import os
-import json
-from pydantic import BaseModel
-from typing import List
-from pydantic import BaseModel
-from opensearch_client import client
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from buscar_recetas import invalidar_cache_busquedas
+from agregador_contadores import AgregadorContadores
+from motor_likes import MotorLikes
+from contadores_distribuidos import sumar_contadores
+from cache_recetas import CacheRecetas, backend_por_defecto, etag_coincide
+from cache_http import etag_de, fecha_http
+from datetime import datetime
+from google.api_core.exceptions import NotFound
 
 router = APIRouter()
 
+RECETAS_BATCH_MAX = int(os.getenv("RECETAS_BATCH_MAX", 100))
+
 
 # 🔹 Modelo de salida de receta
 class RecetaOut(BaseModel):
@@ -25,17 +32,24 @@ def string_a_lista(ingredientes_str: str) -> List[str]:
     # Puedes usar split por espacio o por coma según cómo tengas los datos
     return ingredientes_str.split()  # ejemplo: separar por espacios
 
-# 🔥 Inicializar Firebase solo si no está inicializado
-if not firebase_admin._apps:
-    firebase_cred_json = os.getenv("FIREBASE_CREDENTIALS")
-    if not firebase_cred_json:
-        raise Exception("No se encontró la variable FIREBASE_CREDENTIALS")
-    cred_dict = json.loads(firebase_cred_json)
-    cred_dict["private_key"] = cred_dict["private_key"].replace("\\n", "\n")
-    cred = credentials.Certificate(cred_dict)
-    firebase_admin.initialize_app(cred)
+# Firestore se crea en el primer uso (ver clientes.py), no al importar
+from clientes import db
+
+# Los contadores se acumulan en memoria y se escriben en lote (ver agregador_contadores.py);
+# main.py lo arranca y lo vacía al apagar.
+agregador = AgregadorContadores(db)
+# El orden de /buscar depende de los likes: solo los vaciados que los cambian invalidan
+# el cache de búsquedas. Las vistas, clics y el decaimiento de la tendencia se
+# corrigen solos al vencer el TTL (CACHE_BUSQUEDAS_TTL).
+agregador.al_cambiar_likes.append(lambda recetas: invalidar_cache_busquedas())
+
+# Documentos de recetas cacheados (memoria + backend compartido opcional, ver cache_recetas.py).
+# Los vaciados del agregador que tocan el documento (liked_by) invalidan esas recetas.
+cache_recetas = CacheRecetas(db, backend_por_defecto())
+agregador.al_modificar_recetas.append(cache_recetas.invalidar)
 
-db = firestore.client()
+# Likes en una transacción, con un documento por like en usuarios/{uid}/likes (ver motor_likes.py)
+motor_likes = MotorLikes(db, agregador)
 
 
 # -------------------------------------------------------------
@@ -46,12 +60,8 @@ class ViewRequest(BaseModel):
 
 @router.post("/receta/{receta_id}/view")
 def incrementar_view(receta_id: str, request: ViewRequest):
-    uid = request.uid
-    receta_ref = db.collection("recetas").document(receta_id)
-    user_ref = db.collection("usuarios").document(uid)
-
-    receta_ref.update({"views": firestore.Increment(1), "popup_clicks": firestore.Increment(1)})
-    user_ref.set({"vistas": firestore.ArrayUnion([receta_id])}, merge=True)
+    agregador.incrementar(receta_id, views=1, popup_clicks=1)
+    agregador.registrar_vista(request.uid, receta_id)
 
     return {"message": f"✅ Se incrementó la vista de la receta {receta_id}"}
 
@@ -62,94 +72,99 @@ class LikeRequest(BaseModel):
     uid: str
 
 @router.post("/receta/{receta_id}/like")
-def dar_like(receta_id: str, request: LikeRequest):
-    uid = request.uid
-    receta_ref = db.collection("recetas").document(receta_id)
-    user_ref = db.collection("usuarios").document(uid)
-
-    receta_doc = receta_ref.get()
-    if not receta_doc.exists:
-        raise HTTPException(status_code=404, detail="Receta no encontrada")
-
-    user_doc = user_ref.get().to_dict() or {}
-    likes_actuales = user_doc.get("likes", [])
-
-    if receta_id in likes_actuales:
-        return {"message": "❌ Ya diste like a esta receta"}
-
-    receta_ref.update({
-        "likes": firestore.Increment(1),
-        f"liked_by.{uid}": True
-    })
-    user_ref.set({"likes": firestore.ArrayUnion([receta_id])}, merge=True)
-
-    # 🔹 Sincronizar con OpenSearch usando ID real de Firestore
+async def dar_like(receta_id: str, request: LikeRequest):
     try:
-        receta_data = receta_ref.get().to_dict()
-        nuevo_like_count = receta_data.get("likes", 0)
-        client.update(
-            index="recetas",
-            id=receta_id,
-            body={"doc": {"likes": nuevo_like_count}}
-        )
-    except Exception as e:
-        print(f"⚠️ Error actualizando likes en OpenSearch: {e}")
-
-    return {"message": f"❤️ Like agregado a la receta {receta_id}"}
+        cambio, likes = await run_in_threadpool(motor_likes.dar, receta_id, request.uid)
+    except NotFound:
+        raise HTTPException(status_code=404, detail="Receta no encontrada")
+    if not cambio:
+        return {"message": "❌ Ya diste like a esta receta", "likes": likes}
+    return {"message": f"❤️ Like agregado a la receta {receta_id}", "likes": likes}
 
 @router.post("/receta/{receta_id}/unlike")
-def quitar_like(receta_id: str, request: LikeRequest):
-    uid = request.uid
-    receta_ref = db.collection("recetas").document(receta_id)
-    user_ref = db.collection("usuarios").document(uid)
-
-    receta_doc = receta_ref.get()
-    if not receta_doc.exists:
+async def quitar_like(receta_id: str, request: LikeRequest):
+    try:
+        cambio, likes = await run_in_threadpool(motor_likes.quitar, receta_id, request.uid)
+    except NotFound:
         raise HTTPException(status_code=404, detail="Receta no encontrada")
+    if not cambio:
+        return {"message": "⚠️ No habías dado like a esta receta", "likes": likes}
+    return {"message": f"💔 Like quitado de la receta {receta_id}", "likes": likes}
 
-    user_doc = user_ref.get().to_dict() or {}
-    likes_actuales = user_doc.get("likes", [])
 
-    if receta_id not in likes_actuales:
-        return {"message": "⚠️ No habías dado like a esta receta"}
+def etag_receta(receta_id, entrada=None):
+    """
+    ETag del detalle a partir del update_time del documento y de la suma de sus
+    contadores. Sin ir a Firestore: None si alguno de los dos no está en cache.
+    """
+    entrada = entrada or cache_recetas.entrada_local(receta_id)
+    sumas = agregador.contadores.sumas_cacheadas(receta_id)
+    if entrada is None or sumas is None:
+        return None
+    return etag_de(receta_id, entrada["actualizado"], sorted(sumas.items()))
 
-    receta_ref.update({
-        "likes": firestore.Increment(-1),
-        f"liked_by.{uid}": firestore.DELETE_FIELD
-    })
-    user_ref.update({"likes": firestore.ArrayRemove([receta_id])})
 
-    try:
-        receta_data = receta_ref.get().to_dict()
-        nuevo_like_count = receta_data.get("likes", 0)
-        client.update(
-            index="recetas",
-            id=receta_id,
-            body={"doc": {"likes": nuevo_like_count}}
-        )
-    except Exception as e:
-        print(f"⚠️ Error actualizando likes en OpenSearch: {e}")
-
-    return {"message": f"💔 Like quitado de la receta {receta_id}"}
+@router.get("/recetas/{receta_id}")
+def get_receta_por_id(receta_id: str, if_none_match: Optional[str] = Header(None)):
+    entrada = cache_recetas.entradas([receta_id]).get(receta_id)
+    if entrada is None:
+        raise HTTPException(status_code=404, detail="Receta no encontrada")
 
+    # views, popup_clicks y likes viven repartidos en shards (ver contadores_distribuidos.py)
+    receta = agregador.contadores.totales(receta_id, entrada["datos"])
+    etag = etag_receta(receta_id, entrada)
+    headers = {"ETag": etag} if etag else {}
+    if entrada["actualizado"]:
+        headers["Last-Modified"] = fecha_http(datetime.fromisoformat(entrada["actualizado"]))
+    if etag and etag_coincide(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(receta, headers=headers)
 
-@router.get("/recetas/{receta_id}")
-def get_receta_por_id(receta_id: str):
-    doc = db.collection("recetas").document(receta_id).get()
-    if doc.exists:
-        return doc.to_dict()
-    return {"error": "Receta no encontrada"}
+# -------------------------------------------------------------
+# 🔹 ENDPOINT: varias recetas por id (p. ej. los de /buscar_ids)
+# -------------------------------------------------------------
+class BatchRecetasRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=RECETAS_BATCH_MAX)
+
+@router.post("/recetas/batch")
+def get_recetas_batch(request: BatchRecetasRequest):
+    """
+    Como mucho un get_all para las recetas que no estén en cache y otro para los
+    shards de contadores, sin importar cuántos ids lleguen. Respeta el orden pedido.
+    """
+    ids = list(dict.fromkeys(request.ids))
+    encontradas = cache_recetas.obtener_varias(ids)
+    sumas = agregador.contadores.sumas_varias(encontradas)
+
+    return {
+        "recetas": [
+            {"id": receta_id, **sumar_contadores(encontradas[receta_id], sumas[receta_id])}
+            for receta_id in ids if receta_id in encontradas
+        ],
+        "no_encontradas": [receta_id for receta_id in ids if receta_id not in encontradas]
+    }
 
 from fastapi import Query
-from buscar_recetas import buscar_recetas  # Importá tu función de búsqueda
-from buscar_recetas import limpiar_stopwords, buscar_recetas
+from buscar_recetas import buscar_paginado_async, BUSQUEDA_MAX_SIZE
 
 @router.get("/buscar_ids")
-def buscar_ids(query: str = Query(..., min_length=1)):
-    query_limpia = limpiar_stopwords(query)
-    recetas = buscar_recetas(query_limpia, return_hits=True)
-    ids = [receta["id"] for receta in recetas]
-    return {"ids": ids}
+async def buscar_ids(
+    response: Response,
+    query: str = Query(..., min_length=1),
+    size: int = Query(5, ge=1, le=BUSQUEDA_MAX_SIZE),
+    pagina: int = Query(1, ge=1),
+    paginacion_profunda: bool = False,
+    cursor: Optional[str] = None
+):
+    try:
+        # Solo hacen falta los ids: OpenSearch no devuelve _source
+        pagina_resultados = await buscar_paginado_async(query, size, pagina, cursor, paginacion_profunda, campos=())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if pagina_resultados["de_respaldo"]:
+        response.headers["Cache-Control"] = "no-store"  # resultados del motor local (ver main.buscar)
+    ids = [receta["id"] for receta in pagina_resultados["resultados"]]
+    return {"ids": ids, "siguiente_cursor": pagina_resultados["siguiente_cursor"]}
 
 
 
@@ -0,0 +1,91 @@
+# scripts/benchmark_normalizacion.py
+"""
+Microbenchmarks de normalizacion.py contra las versiones anteriores.
+
+    python -m scripts.benchmark_normalizacion [repeticiones]
+
+Mide textos por segundo de: consultas (limpiar_stopwords anterior vs
+limpiar_consulta con y sin cache) e indexado (normalize_text por campo
+anterior vs normalizar_texto y normalizar_lote por documento).
+"""
+import re
+import string
+import sys
+import timeit
+import unicodedata
+
+from normalizacion import limpiar_consulta, normalizar_texto, normalizar_lote, STOPWORDS
+
+CONSULTAS = [
+    "Quiero una receta de pollo con arroz",
+    "tengo tomate, ajo y cebolla",
+    "algo dulce para después de la cena",
+    "Sopa de lentejas sin carne",
+    "¿Qué puedo cocinar con espinacas y queso?",
+    "pastel de chocolate rápido",
+    "ensalada césar con pollo",
+    "guiso de garbanzos también con chorizo",
+]
+
+DOCUMENTO = [
+    "Pollo al horno con papas",
+    "Un clásico de los domingos: pollo jugoso, papas doradas y mucho ajo.",
+    "Precalentá el horno a 200°C.",
+    "Salpimentá el pollo y untalo con manteca, ajo y romero.",
+    "Cortá las papas en gajos; acomodalas alrededor del pollo.",
+    "Horneá 50 minutos, dando vuelta a mitad de cocción.",
+    "pollo", "papas", "ajo", "romero", "manteca", "sal", "pimienta",
+]
+
+
+# ---------------------
+# Versiones anteriores (referencia)
+# ---------------------
+
+def limpiar_stopwords_anterior(texto):
+    # Como antes: la tabla y el set de stopwords se arman en cada llamada
+    stopwords = set(STOPWORDS)
+    texto = texto.lower()
+    texto = texto.translate(str.maketrans('', '', string.punctuation))
+    palabras = texto.split()
+    return " ".join(p for p in palabras if p not in stopwords)
+
+
+def normalize_text_anterior(text):
+    text = unicodedata.normalize("NFKD", text).encode("ASCII", "ignore").decode()
+    text = re.sub(r"[^\w\s]", "", text)
+    return text.lower()
+
+
+def _medir(nombre, funcion, textos_por_llamada, repeticiones):
+    segundos = timeit.timeit(funcion, number=repeticiones)
+    por_segundo = textos_por_llamada * repeticiones / segundos
+    print(f"  {nombre:<42} {por_segundo:>12,.0f} textos/s")
+    return por_segundo
+
+
+def main(repeticiones=20000):
+    print(f"🔹 Consultas ({len(CONSULTAS)} por ronda, {repeticiones} rondas)")
+    anterior = _medir("limpiar_stopwords anterior", lambda: [limpiar_stopwords_anterior(c) for c in CONSULTAS],
+                      len(CONSULTAS), repeticiones)
+    sin_cache = _medir("limpiar_consulta (sin cache)",
+                       lambda: [limpiar_consulta.__wrapped__(c) for c in CONSULTAS], len(CONSULTAS), repeticiones)
+    con_cache = _medir("limpiar_consulta (cache LRU)", lambda: [limpiar_consulta(c) for c in CONSULTAS],
+                       len(CONSULTAS), repeticiones)
+    print(f"  📈 x{sin_cache / anterior:.1f} sin cache, x{con_cache / anterior:.1f} con cache")
+
+    print(f"🔹 Indexado ({len(DOCUMENTO)} campos por documento, {repeticiones} documentos)")
+    anterior = _medir("normalize_text anterior (por campo)", lambda: [normalize_text_anterior(t) for t in DOCUMENTO],
+                      len(DOCUMENTO), repeticiones)
+    por_campo = _medir("normalizar_texto (por campo)", lambda: [normalizar_texto(t) for t in DOCUMENTO],
+                       len(DOCUMENTO), repeticiones)
+    lote = _medir("normalizar_lote (por documento)", lambda: normalizar_lote(DOCUMENTO),
+                  len(DOCUMENTO), repeticiones)
+    print(f"  📈 x{por_campo / anterior:.1f} por campo, x{lote / anterior:.1f} en lote")
+
+    # Las dos normalizaciones tienen que dar lo mismo que la anterior del indexado
+    assert normalizar_lote(DOCUMENTO) == [normalize_text_anterior(t) for t in DOCUMENTO]
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -1,35 +1,29 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-from opensearchpy import OpenSearch
-import unicodedata
-import re
 import os
-import requests
 import json
+import random
+import tempfile
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from opensearchpy import exceptions
 from diccionario_sinonimos import obtener_sinonimos
 from opensearch_client import client
-from firebase_admin import credentials, initialize_app
+from contadores_distribuidos import ContadoresDistribuidos, sumar_contadores
+from senales_popularidad import MAPEO_SENALES
+from normalizacion import normalizar_texto, normalizar_lote
+from sugerencias import ANALIZADOR_SUGERENCIAS, MAPEO_SUGERENCIAS, campos_sugerencias
+from despensa import MAPEO_DESPENSA, campos_despensa
+from motor_local import respaldo_local
+from opensearchpy import helpers
 
 # ---------------------
 # Configuración Firebase
 # ---------------------
 
-firebase_cred_json = os.getenv("FIREBASE_CREDENTIALS")
-if not firebase_cred_json:
-    raise Exception("No se encontró variable de entorno FIREBASE_CREDENTIALS")
-
-cred_dict = json.loads(firebase_cred_json)
-
-# 🔹 ESTA LÍNEA ES NECESARIA EN TU CASO
-cred_dict['private_key'] = cred_dict['private_key'].replace('\\n', '\n')
-
-cred = credentials.Certificate(cred_dict)
-firebase_admin.initialize_app(cred)
-
-if not firebase_admin._apps:
-    firebase_admin.initialize_app(cred)
-
-db = firestore.client()
+# Firestore se crea en el primer uso (ver clientes.py): importar este módulo
+# desde main.py no lee credenciales ni abre conexiones.
+from clientes import db
 
 
 # ---------------------
@@ -42,6 +36,25 @@ port = int(os.getenv('OPENSEARCH_PORT', 443))
 user = os.getenv('OPENSEARCH_USER', 'admin')  # Cambio aquí para que coincida con tu env
 password = os.getenv('OPENSEARCH_PASS', 'admin')  # Cambio aquí
 
+# Indexado masivo: tamaño de lote (documentos y bytes), hilos y reintentos
+BULK_MAX_DOCS = int(os.getenv('BULK_MAX_DOCS', 1000))
+BULK_MAX_BYTES = int(os.getenv('BULK_MAX_BYTES', 5 * 1024 * 1024))
+BULK_WORKERS = int(os.getenv('BULK_WORKERS', 4))
+BULK_MAX_REINTENTOS = int(os.getenv('BULK_MAX_REINTENTOS', 5))
+BULK_ESPERA_INICIAL = float(os.getenv('BULK_ESPERA_INICIAL', 0.5))
+BULK_ESPERA_MAXIMA = float(os.getenv('BULK_ESPERA_MAXIMA', 30))
+
+# Reindexado blue/green: el alias apunta al índice versionado activo (recetas_v{N})
+ALIAS_RECETAS = "recetas"
+OPENSEARCH_REPLICAS = int(os.getenv('OPENSEARCH_REPLICAS', 1))
+VERSIONES_A_CONSERVAR = int(os.getenv('VERSIONES_A_CONSERVAR', 1))  # versiones viejas para rollback
+REINDEX_SPOOL_DIR = os.getenv('REINDEX_SPOOL_DIR')  # carpeta del JSONL intermedio (por defecto /tmp)
+# Recetas borradas lógicamente: no se indexan (ver sincronizacion_incremental.py)
+CAMPO_ELIMINADA = os.getenv('SYNC_CAMPO_ELIMINADA', 'eliminada')
+
+# 429 = cola de bulk llena en el cluster; el resto son fallos transitorios
+ESTADOS_REINTENTABLES = {429, 502, 503, 504}
+
 
 # ---------------------
 # Funciones auxiliares
@@ -49,35 +62,36 @@ password = os.getenv('OPENSEARCH_PASS', 'admin')  # Cambio aquí
 def normalize_text(text):
     """
     Quita acentos, convierte a minúsculas, quita signos de puntuación.
-    Esto ayuda a que la búsqueda sea más tolerante.
+    Esto ayuda a que la búsqueda sea más tolerante. Es la misma normalización
+    que se aplica a las consultas (ver normalizacion.py).
     """
-    if not isinstance(text, str):
-        return ""
-    text = unicodedata.normalize("NFKD", text).encode("ASCII", "ignore").decode()
-    text = re.sub(r"[^\w\s]", "", text)
-    return text.lower()
+    return normalizar_texto(text)
 
 # Simulamos una función que llama a una API de sinónimos para cada ingrediente
 def obtener_sinonimos_api(ingredientes):
     return obtener_sinonimos(ingredientes)
 
-def crear_indice_con_sinonimos():
-    index_name = "recetas"
+def nombres_de_ingredientes(data):
+    return normalizar_lote([i.get("nombre", "") for i in data.get("ingredientes", [])])
+
+
+def crear_indice_con_sinonimos(index_name="recetas", carga_masiva=False, ingredientes_unicos=None):
+    """
+    Crea el índice con el analizador de sinónimos.
+    Con carga_masiva=True se crea sin refresh ni réplicas; activar_indice los restaura.
+    Si no se pasan ingredientes_unicos (ver preparar_reindexado), se leen de Firestore.
+    """
     if client.indices.exists(index=index_name):
         client.indices.delete(index=index_name)
 
-    # Sacamos todos los ingredientes que hay en la base
-    recetas_ref = db.collection("recetas")
-    docs = recetas_ref.stream()
-    ingredientes_unicos = set()
+    if ingredientes_unicos is None:
+        # Sacamos todos los ingredientes que hay en la base
+        recetas_ref = db.collection("recetas")
+        docs = recetas_ref.stream()
+        ingredientes_unicos = set()
 
-    for doc in docs:
-        data = doc.to_dict()
-        ingredientes = data.get("ingredientes", [])
-        for ingr in ingredientes:
-            nombre = normalize_text(ingr.get("nombre", ""))
-            if nombre:
-                ingredientes_unicos.add(nombre)
+        for doc in docs:
+            ingredientes_unicos.update(n for n in nombres_de_ingredientes(doc.to_dict()) if n)
 
     # Obtenemos sinónimos solo para los ingredientes que existen
     sinonimos_dict = obtener_sinonimos_api(ingredientes_unicos)
@@ -110,7 +124,8 @@ def crear_indice_con_sinonimos():
                             "my_synonym_filter",
                             "spanish_stemmer"
                         ]
-                    }
+                    },
+                    **ANALIZADOR_SUGERENCIAS
                 }
             }
         },
@@ -135,6 +150,10 @@ def crear_indice_con_sinonimos():
                     "type": "text",
                     "analyzer": "my_spanish_analyzer"
                 },
+                "pasos_detalle": {
+                    "type": "object",
+                    "enabled": False  # solo se guarda para devolverlo tal cual
+                },
                 "contenido_total": {
                     "type": "text",
                     "analyzer": "my_spanish_analyzer"
@@ -143,11 +162,20 @@ def crear_indice_con_sinonimos():
                     "type": "integer"
                 },
                 "likes": { "type": "integer" },
-                "popup_clicks": { "type": "integer" }
+                "popup_clicks": { "type": "integer" },
+                **MAPEO_SENALES,
+                **MAPEO_SUGERENCIAS,  # autocompletado de /sugerir
+                **MAPEO_DESPENSA  # modo despensa de /buscar
             }
         }
     }
 
+    if carga_masiva:
+        index_body["settings"]["index"] = {
+            "refresh_interval": "-1",
+            "number_of_replicas": 0
+        }
+
     client.indices.create(index=index_name, body=index_body)
     print(f"✅ Índice '{index_name}' creado con sinónimos dinámicos.")
 
@@ -168,7 +196,8 @@ def crear_indice():
                 "analyzer": {
                     "default": {
                         "type": "standard"
-                    }
+                    },
+                    **ANALIZADOR_SUGERENCIAS
                 }
             }
         },
@@ -189,6 +218,10 @@ def crear_indice():
                 "pasos": {
                     "type": "text"
                 },
+                "pasos_detalle": {
+                    "type": "object",
+                    "enabled": False
+                },
                 "contenido_total": {
                     "type": "text"
                 },
@@ -196,7 +229,10 @@ def crear_indice():
                     "type": "integer"
                 },
                 "likes": { "type": "integer" },
-                "popup_clicks": { "type": "integer" }
+                "popup_clicks": { "type": "integer" },
+                **MAPEO_SENALES,
+                **MAPEO_SUGERENCIAS,  # autocompletado de /sugerir
+                **MAPEO_DESPENSA  # modo despensa de /buscar
             }
         }
     }
@@ -204,42 +240,381 @@ def crear_indice():
     client.indices.create(index=index_name, body=index_body)
     print(f"✅ Índice '{index_name}' creado en OpenSearch.")
 
+# ---------------------
+# Indexado masivo (_bulk)
+# ---------------------
+
+def construir_documento(data, ingredientes=None):
+    """
+    Convierte una receta de Firestore al documento que se guarda en OpenSearch.
+    `ingredientes` permite pasar los nombres ya normalizados con nombres_de_ingredientes.
+    """
+    if ingredientes is None:
+        ingredientes = nombres_de_ingredientes(data)
+    # Todos los textos del documento se normalizan en una sola pasada
+    titulo, desc, *pasos = normalizar_lote(
+        [data.get("titulo", ""), data.get("descripcion", "")]
+        + [p.get("descripcion", "") for p in data.get("pasos", [])]
+    )
+
+    return {
+        "titulo": titulo,
+        "ingredientes_texto": " ".join(ingredientes),
+        "descripcion": desc,
+        "pasos": " ".join(pasos),
+        # Pasos ya estructurados para la respuesta de /buscar (no se indexan)
+        "pasos_detalle": [
+            {
+                "descripcion": p.get("descripcion", ""),
+                "imagen_url": p.get("imagen_url", ""),
+                "orden": p.get("orden", idx + 1)
+            }
+            for idx, p in enumerate(data.get("pasos", []))
+        ],
+        "contenido_total": f"{titulo} {desc} {' '.join(ingredientes)} {' '.join(pasos)}",
+        "calorias": data.get("calorias", 0),
+        "likes": data.get("likes", 0),
+        "popup_clicks": data.get("popup_clicks", 0),
+        "views": data.get("views", 0),
+        **campos_despensa(ingredientes),
+        **campos_sugerencias(data)
+    }
+
+
+def _serializar_accion(accion):
+    """
+    Convierte una acción (formato de opensearchpy.helpers) en sus líneas NDJSON para _bulk.
+    """
+    op_type = accion.get("_op_type", "index")
+    meta = {op_type: {"_index": accion["_index"], "_id": accion["_id"]}}
+    lineas = json.dumps(meta)
+    if op_type == "update":
+        cuerpo = {k: accion[k] for k in ("doc", "script", "upsert", "doc_as_upsert") if k in accion}
+        lineas += "\n" + json.dumps(cuerpo, ensure_ascii=False)
+    elif op_type != "delete":
+        lineas += "\n" + json.dumps(accion["_source"], ensure_ascii=False)
+    return lineas + "\n"
+
+
+def generar_lotes(acciones, max_docs=BULK_MAX_DOCS, max_bytes=BULK_MAX_BYTES):
+    """
+    Agrupa las acciones en lotes que no superan max_docs documentos ni max_bytes bytes.
+    Cada elemento del lote es la tupla (accion, lineas_ndjson).
+    """
+    lote = []
+    tamano = 0
+    for accion in acciones:
+        lineas = _serializar_accion(accion)
+        peso = len(lineas.encode("utf-8"))
+        if lote and (len(lote) >= max_docs or tamano + peso > max_bytes):
+            yield lote
+            lote = []
+            tamano = 0
+        lote.append((accion, lineas))
+        tamano += peso
+    if lote:
+        yield lote
+
+
+def _espera_reintento(intento):
+    espera = min(BULK_ESPERA_MAXIMA, BULK_ESPERA_INICIAL * (2 ** intento))
+    return espera / 2 + random.uniform(0, espera / 2)
+
+
+def _es_reintentable(error):
+    if isinstance(error, exceptions.ConnectionError):
+        return True
+    return error.status_code in ESTADOS_REINTENTABLES
+
+
+def enviar_lote(lote, max_reintentos=BULK_MAX_REINTENTOS):
+    """
+    Envía un lote a _bulk. Si todo el request falla con 429/5xx, o solo algunos
+    documentos vuelven con un estado reintentable, se reenvían únicamente esos
+    documentos con backoff exponencial.
+    Devuelve (documentos_ok, errores).
+    """
+    pendientes = lote
+    ok = 0
+    errores = []
+
+    for intento in range(max_reintentos + 1):
+        if intento > 0:
+            time.sleep(_espera_reintento(intento - 1))
+
+        try:
+            respuesta = client.bulk(body="".join(lineas for _, lineas in pendientes))
+        except exceptions.TransportError as e:
+            if not _es_reintentable(e):
+                raise
+            print(f"⚠️ Lote de {len(pendientes)} documentos rechazado ({e}), reintentando...")
+            continue
+
+        if not respuesta.get("errors"):
+            return ok + len(pendientes), errores
+
+        reintentar = []
+        for (accion, lineas), item in zip(pendientes, respuesta["items"]):
+            op_type, resultado = next(iter(item.items()))
+            status = resultado.get("status", 500)
+            if status < 300 or (op_type == "delete" and status == 404):
+                ok += 1
+            elif status in ESTADOS_REINTENTABLES:
+                reintentar.append((accion, lineas))
+            else:
+                errores.append({"_id": accion["_id"], "status": status, "error": resultado.get("error")})
+
+        if not reintentar:
+            return ok, errores
+        pendientes = reintentar
+
+    for accion, _ in pendientes:
+        errores.append({"_id": accion["_id"], "status": 429, "error": "reintentos agotados"})
+    return ok, errores
+
+
+def indexar_en_bulk(acciones, max_docs=BULK_MAX_DOCS, max_bytes=BULK_MAX_BYTES,
+                    workers=BULK_WORKERS, max_reintentos=BULK_MAX_REINTENTOS):
+    """
+    Consume un iterable de acciones y las envía a _bulk con `workers` hilos en paralelo.
+    Como mucho hay 2 * workers lotes en memoria, así que el iterable puede ser un
+    stream de Firestore sin cargar toda la colección.
+    Devuelve (documentos_ok, errores).
+    """
+    total_ok = 0
+    errores = []
+
+    def recoger(futuros):
+        nonlocal total_ok
+        for futuro in futuros:
+            ok, errs = futuro.result()
+            total_ok += ok
+            errores.extend(errs)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        en_vuelo = set()
+        for lote in generar_lotes(acciones, max_docs, max_bytes):
+            if len(en_vuelo) >= workers * 2:
+                hechos, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                recoger(hechos)
+            en_vuelo.add(pool.submit(enviar_lote, lote, max_reintentos))
+        recoger(wait(en_vuelo).done)
+
+    return total_ok, errores
+
+
 # ---------------------
 # Función principal para exportar e indexar
 # ---------------------
 
-def exportar_e_indexar_recetas():
-
-    recetas_ref = db.collection("recetas")
-    docs = recetas_ref.stream()
-
-    count = 0
-    for doc in docs:
-        data = doc.to_dict()
-        doc_id = doc.id  # ✅ Usar ID real de Firestore
-
-        ingredientes = [normalize_text(i.get("nombre", "")) for i in data.get("ingredientes", [])]
-        pasos = [normalize_text(p.get("descripcion", "")) for p in data.get("pasos", [])]
-        titulo = normalize_text(data.get("titulo", ""))
-        desc = normalize_text(data.get("descripcion", ""))
-
-        doc_opensearch = {
-            "titulo": titulo,
-            "ingredientes_texto": " ".join(ingredientes),
-            "descripcion": desc,
-            "pasos": " ".join(pasos),
-            "contenido_total": f"{titulo} {desc} {' '.join(ingredientes)} {' '.join(pasos)}",
-            "calorias": data.get("calorias", 0),
-            "likes": data.get("likes", 0),
-            "popup_clicks": data.get("popup_clicks", 0)
-        }
+def preparar_reindexado(ruta_spool):
+    """
+    Lee la colección de Firestore una sola vez: junta los ingredientes únicos (para
+    los sinónimos del índice) y deja los documentos ya normalizados en un JSONL.
+    Las recetas con `eliminada: true` quedan afuera.
+    Devuelve (ingredientes_unicos, total_recetas).
+    """
+    ingredientes_unicos = set()
+    total = 0
+    sumas = ContadoresDistribuidos(db).sumas_de_todas()
+
+    with open(ruta_spool, "w", encoding="utf-8") as spool:
+        for doc in db.collection("recetas").stream():
+            data = doc.to_dict() or {}
+            if data.get(CAMPO_ELIMINADA):
+                continue
+            data = sumar_contadores(data, sumas.get(doc.id))
+            ingredientes = nombres_de_ingredientes(data)
+            ingredientes_unicos.update(n for n in ingredientes if n)
+            documento = construir_documento(data, ingredientes)
+            spool.write(json.dumps({"_id": doc.id, "_source": documento}, ensure_ascii=False) + "\n")
+            total += 1
+
+    print(f"📦 {total} recetas leídas de Firestore y guardadas en {ruta_spool}.")
+    return ingredientes_unicos, total
 
-        client.index(index="recetas", id=doc_id, body=doc_opensearch)
-        count += 1
+
+def acciones_desde_spool(ruta_spool, index_name):
+    with open(ruta_spool, encoding="utf-8") as spool:
+        for linea in spool:
+            documento = json.loads(linea)
+            yield {"_index": index_name, "_id": documento["_id"], "_source": documento["_source"]}
+
+
+def exportar_e_indexar_recetas(index_name="recetas", ruta_spool=None):
+    """
+    Indexa las recetas en bulk. Con ruta_spool se cargan desde el JSONL de
+    preparar_reindexado en vez de volver a leer Firestore.
+    Devuelve (indexadas, errores).
+    """
+    if ruta_spool:
+        acciones = acciones_desde_spool(ruta_spool, index_name)
+    else:
+        recetas_ref = db.collection("recetas")
+        docs = ((doc.id, doc.to_dict() or {}) for doc in recetas_ref.stream())
+        sumas = ContadoresDistribuidos(db).sumas_de_todas()
+
+        acciones = (
+            {
+                "_index": index_name,
+                "_id": doc_id,  # ✅ Usar ID real de Firestore
+                "_source": construir_documento(sumar_contadores(data, sumas.get(doc_id)))
+            }
+            for doc_id, data in docs
+            if not data.get(CAMPO_ELIMINADA)
+        )
+
+    count, errores = indexar_en_bulk(acciones)
+    if errores:
+        print(f"⚠️ {len(errores)} recetas no se pudieron indexar. Primeros errores: {errores[:5]}")
 
     print(f"✅ Exportadas e indexadas {count} recetas en OpenSearch.")
+    return count, errores
+
+
+# ---------------------
+# Reindexado sin cortes (índices versionados + alias)
+# ---------------------
+
+def copiar_senales(origen, destino):
+    """
+    Copia la tendencia (que solo vive en OpenSearch, ver senales_popularidad.py)
+    del índice activo al recién cargado, con updates parciales en bulk.
+    """
+    if not client.indices.exists(index=origen):
+        return 0
+    acciones = (
+        {"_op_type": "update", "_index": destino, "_id": hit["_id"], "doc": hit["_source"]}
+        for hit in helpers.scan(
+            client,
+            index=origen,
+            query={"query": {"range": {"tendencia": {"gt": 0}}}},
+            _source=["tendencia", "tendencia_actualizada"]
+        )
+    )
+    ok, errores = indexar_en_bulk(acciones)
+    errores = [e for e in errores if e["status"] != 404]  # recetas que ya no existen
+    if errores:
+        print(f"⚠️ {len(errores)} tendencias no se pudieron copiar: {errores[:5]}")
+    print(f"📈 Copiadas {ok} tendencias de '{origen}' a '{destino}'.")
+    return ok
+
+
+_lock_reindexado = threading.Lock()
+
+
+def versiones_de_indice(alias=ALIAS_RECETAS):
+    """
+    Devuelve {numero_version: nombre_indice} de los índices {alias}_v{N} existentes.
+    """
+    patron = re.compile(rf"^{re.escape(alias)}_v(\d+)$")
+    versiones = {}
+    for nombre in client.indices.get(index=f"{alias}_v*"):
+        coincidencia = patron.match(nombre)
+        if coincidencia:
+            versiones[int(coincidencia.group(1))] = nombre
+    return versiones
+
+
+def indices_del_alias(alias=ALIAS_RECETAS):
+    try:
+        return list(client.indices.get_alias(name=alias).keys())
+    except exceptions.NotFoundError:
+        return []
+
+
+def siguiente_indice_versionado(alias=ALIAS_RECETAS):
+    return f"{alias}_v{max(versiones_de_indice(alias), default=0) + 1}"
+
+
+def activar_indice(index_name, alias=ALIAS_RECETAS):
+    """
+    Restaura refresh y réplicas del índice recién cargado y mueve el alias
+    hacia él en una sola operación atómica.
+    """
+    client.indices.put_settings(index=index_name, body={
+        "index": {
+            "refresh_interval": None,
+            "number_of_replicas": OPENSEARCH_REPLICAS
+        }
+    })
+    client.indices.refresh(index=index_name)
+    client.cluster.health(index=index_name, wait_for_status="yellow", timeout="60s")
+
+    anteriores = indices_del_alias(alias)
+    acciones = [
+        {"remove": {"index": anterior, "alias": alias}}
+        for anterior in anteriores
+        if anterior != index_name
+    ]
+    acciones.append({"add": {"index": index_name, "alias": alias}})
+
+    # Instalaciones anteriores tenían un índice real llamado igual que el alias
+    if not anteriores and client.indices.exists(index=alias):
+        acciones.append({"remove_index": {"index": alias}})
+
+    client.indices.update_aliases(body={"actions": acciones})
+    print(f"✅ Alias '{alias}' apunta ahora a '{index_name}'.")
+
+
+def limpiar_versiones_antiguas(alias=ALIAS_RECETAS, conservar=VERSIONES_A_CONSERVAR):
+    """
+    Borra las versiones que no están detrás del alias, dejando las `conservar` más recientes.
+    """
+    activos = set(indices_del_alias(alias))
+    inactivos = [
+        nombre for _, nombre in sorted(versiones_de_indice(alias).items())
+        if nombre not in activos
+    ]
+    borrados = inactivos[:max(0, len(inactivos) - conservar)]
+    for nombre in borrados:
+        client.indices.delete(index=nombre)
+        print(f"🗑️ Índice '{nombre}' eliminado.")
+    return borrados
+
+
+def reindexar_blue_green(alias=ALIAS_RECETAS):
+    """
+    Reconstruye el índice en una versión nueva mientras las búsquedas siguen usando
+    la actual, y cambia el alias solo cuando la carga terminó bien: todas las
+    recetas del spool indexadas y sin errores. Si no, borra el índice nuevo y
+    lanza RuntimeError.
+    """
+    if not _lock_reindexado.acquire(blocking=False):
+        raise RuntimeError("Ya hay un reindexado en curso")
+
+    try:
+        index_name = siguiente_indice_versionado(alias)
+        with tempfile.TemporaryDirectory(dir=REINDEX_SPOOL_DIR) as carpeta:
+            # Una sola lectura de Firestore alimenta los sinónimos y la carga en bulk
+            ruta_spool = os.path.join(carpeta, "recetas.jsonl")
+            ingredientes_unicos, esperadas = preparar_reindexado(ruta_spool)
+            crear_indice_con_sinonimos(index_name=index_name, carga_masiva=True,
+                                       ingredientes_unicos=ingredientes_unicos)
+            try:
+                total, errores = exportar_e_indexar_recetas(index_name=index_name, ruta_spool=ruta_spool)
+                if errores or total != esperadas:
+                    # Un índice incompleto nunca reemplaza al actual
+                    raise RuntimeError(
+                        f"Carga incompleta en '{index_name}': {total} de {esperadas} recetas indexadas "
+                        f"({len(errores)} errores). El alias '{alias}' sigue en el índice anterior."
+                    )
+                copiar_senales(alias, index_name)
+            except Exception:
+                client.indices.delete(index=index_name, ignore=[404])
+                raise
+            # El mismo JSONL queda como snapshot del motor local (respaldo si OpenSearch cae)
+            try:
+                respaldo_local.guardar_snapshot(ruta_spool)
+            except Exception as e:
+                print(f"⚠️ No se pudo guardar el snapshot del motor local: {e}")
+
+        activar_indice(index_name, alias)
+        borrados = limpiar_versiones_antiguas(alias)
+        return {"indice": index_name, "total": total, "indices_eliminados": borrados}
+    finally:
+        _lock_reindexado.release()
 
 
 if __name__ == "__main__":
-    crear_indice_con_sinonimos()
-    exportar_e_indexar_recetas()
\ No newline at end of file
+    reindexar_blue_green()
\ No newline at end of file
@@ -0,0 +1,283 @@
+"""
+Sincronización incremental Firestore -> OpenSearch.
+
+En vez de releer toda la colección, se guarda una marca de agua (el valor más alto
+de `actualizado_en` ya indexado) y en cada pasada solo se piden las recetas con
+una marca mayor o igual. Las recetas con `eliminada: true` se borran del índice.
+Con `escuchar()` se usa un listener de Firestore, que también detecta borrados reales.
+
+Quien escribe recetas en Firestore debe poner `actualizado_en` (p. ej. SERVER_TIMESTAMP).
+"""
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from opensearch_client import client
+from contadores_distribuidos import ContadoresDistribuidos, sumar_contadores
+from scripts.firestore_to_opensearch import (
+    ALIAS_RECETAS,
+    CAMPO_ELIMINADA,
+    construir_documento,
+    db as firestore_db,
+    indexar_en_bulk,
+    reindexar_blue_green,
+)
+
+CAMPO_ACTUALIZACION = os.getenv('SYNC_CAMPO_ACTUALIZACION', 'actualizado_en')
+SYNC_TAMANO_PAGINA = int(os.getenv('SYNC_TAMANO_PAGINA', 500))
+SYNC_CHECKPOINT_ARCHIVO = os.getenv('SYNC_CHECKPOINT_ARCHIVO')  # si no se define, se guarda en Firestore
+SYNC_CHECKPOINT_DOCUMENTO = os.getenv('SYNC_CHECKPOINT_DOCUMENTO', '_sistema/sincronizacion_opensearch')
+
+# Margen para relojes desfasados entre quien escribe y este proceso
+MARGEN_RELOJ = timedelta(seconds=int(os.getenv('SYNC_MARGEN_RELOJ', 60)))
+
+
+# ---------------------
+# Checkpoints
+# ---------------------
+
+class CheckpointArchivo:
+    """
+    Guarda la marca de agua en un JSON local (escritura atómica con os.replace).
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    def leer(self):
+        if not os.path.exists(self.ruta):
+            return None, []
+        with open(self.ruta, encoding="utf-8") as f:
+            estado = json.load(f)
+        marca = estado.get("marca")
+        return (datetime.fromisoformat(marca) if marca else None), estado.get("ids", [])
+
+    def guardar(self, marca, ids):
+        temporal = f"{self.ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"marca": marca.isoformat() if marca else None, "ids": sorted(ids)}, f)
+        os.replace(temporal, self.ruta)
+
+
+class CheckpointFirestore:
+    """
+    Guarda la marca de agua en un documento de Firestore, así sobrevive a los
+    reinicios de dynos con disco efímero.
+    """
+
+    def __init__(self, db, ruta_documento=SYNC_CHECKPOINT_DOCUMENTO):
+        self.referencia = db.document(ruta_documento)
+
+    def leer(self):
+        estado = self.referencia.get().to_dict() or {}
+        return estado.get("marca"), estado.get("ids", [])
+
+    def guardar(self, marca, ids):
+        self.referencia.set({"marca": marca, "ids": sorted(ids)})
+
+
+def checkpoint_por_defecto(db):
+    if SYNC_CHECKPOINT_ARCHIVO:
+        return CheckpointArchivo(SYNC_CHECKPOINT_ARCHIVO)
+    return CheckpointFirestore(db)
+
+
+# ---------------------
+# Motor de sincronización
+# ---------------------
+
+class SincronizadorIncremental:
+
+    def __init__(self, db=None, index_name=ALIAS_RECETAS, checkpoint=None,
+                 campo=CAMPO_ACTUALIZACION, tamano_pagina=SYNC_TAMANO_PAGINA):
+        self.db = db or firestore_db
+        self.index_name = index_name
+        self.checkpoint = checkpoint or checkpoint_por_defecto(self.db)
+        self.campo = campo
+        self.tamano_pagina = tamano_pagina
+        self.contadores = ContadoresDistribuidos(self.db)
+
+    def _accion(self, receta_id, data, sumas):
+        if data.get(CAMPO_ELIMINADA):
+            return {"_op_type": "delete", "_index": self.index_name, "_id": receta_id}
+        # Los contadores se suman desde los shards (ver contadores_distribuidos.py).
+        # Update parcial para no pisar la tendencia, que solo vive en OpenSearch.
+        return {
+            "_op_type": "update",
+            "_index": self.index_name,
+            "_id": receta_id,
+            "doc": construir_documento(sumar_contadores(data, sumas)),
+            "doc_as_upsert": True
+        }
+
+    def _paginas(self, docs):
+        docs = iter(docs)
+        while True:
+            pagina = list(islice(docs, self.tamano_pagina))
+            if not pagina:
+                return
+            yield pagina
+
+    def _cambios(self, marca, ids_en_marca):
+        """
+        Recorre por páginas las recetas con campo >= marca, ordenadas por ese campo.
+        Las que tienen exactamente la marca y ya se indexaron se saltan.
+        """
+        recetas = self.db.collection("recetas")
+        if marca is None:
+            yield from recetas.stream()
+            return
+
+        consulta = recetas.where(self.campo, ">=", marca).order_by(self.campo)
+        ids_en_marca = set(ids_en_marca)
+        ultimo = None
+        while True:
+            pagina = consulta.limit(self.tamano_pagina)
+            if ultimo is not None:
+                pagina = pagina.start_after(ultimo)
+            docs = list(pagina.stream())
+            for doc in docs:
+                if doc.id in ids_en_marca and (doc.to_dict() or {}).get(self.campo) == marca:
+                    continue
+                yield doc
+            if len(docs) < self.tamano_pagina:
+                return
+            ultimo = docs[-1]
+
+    def _indexar(self, docs, marca, ids_en_marca, completa=False):
+        """
+        Manda los documentos a _bulk y devuelve (ok, errores, estado) con la nueva marca.
+        Las sumas de los shards se leen una vez por página (un get_all) o, en la
+        pasada completa, todas juntas con una consulta collection_group.
+        """
+        estado = {"marca": marca, "ids": set(ids_en_marca), "eliminadas": 0}
+
+        def acciones():
+            todas = self.contadores.sumas_de_todas() if completa else None
+            for pagina in self._paginas(docs):
+                datos = {doc.id: doc.to_dict() or {} for doc in pagina}
+                sumas = todas if completa else self.contadores.sumas_varias(
+                    {receta_id: data for receta_id, data in datos.items() if not data.get(CAMPO_ELIMINADA)}
+                )
+                for doc in pagina:
+                    data = datos[doc.id]
+                    valor = data.get(self.campo)
+                    if valor is not None:
+                        if estado["marca"] is None or valor > estado["marca"]:
+                            estado["marca"] = valor
+                            estado["ids"] = {doc.id}
+                        elif valor == estado["marca"]:
+                            estado["ids"].add(doc.id)
+                    accion = self._accion(doc.id, data, sumas.get(doc.id))
+                    if accion.get("_op_type") == "delete":
+                        estado["eliminadas"] += 1
+                    yield accion
+
+        ok, errores = indexar_en_bulk(acciones())
+        return ok, errores, estado
+
+    def sincronizar(self):
+        """
+        Sube a OpenSearch lo que cambió desde la última pasada. Sin checkpoint,
+        recorre toda la colección una vez. La marca solo avanza si no hubo errores.
+        """
+        inicio = datetime.now(timezone.utc)
+        marca, ids_en_marca = self.checkpoint.leer()
+        ok, errores, estado = self._indexar(self._cambios(marca, ids_en_marca), marca, ids_en_marca,
+                                            completa=marca is None)
+
+        if estado["marca"] is None:
+            # Pasada completa sobre recetas que todavía no tienen el campo de marca
+            estado["marca"] = inicio - MARGEN_RELOJ
+
+        if errores:
+            print(f"⚠️ {len(errores)} recetas no se pudieron sincronizar, la marca no avanza: {errores[:5]}")
+        elif estado["marca"] != marca or estado["ids"] != set(ids_en_marca):
+            self.checkpoint.guardar(estado["marca"], estado["ids"])
+
+        print(f"✅ Sincronizadas {ok} recetas ({estado['eliminadas']} eliminadas) desde {marca}.")
+        return {
+            "sincronizadas": ok,
+            "eliminadas": estado["eliminadas"],
+            "errores": errores,
+            "marca": estado["marca"]
+        }
+
+    def escuchar(self):
+        """
+        Modo listener: Firestore empuja los cambios y se indexan en bulk al llegar.
+        Detecta borrados reales de las recetas que entran en la consulta (marca >= checkpoint).
+        Devuelve el watch; llamar a unsubscribe() para parar.
+        """
+        marca, ids_en_marca = self.checkpoint.leer()
+        consulta = self.db.collection("recetas")
+        if marca is not None:
+            consulta = consulta.where(self.campo, ">=", marca)
+
+        def al_cambiar(_docs, cambios, _read_time):
+            nonlocal marca, ids_en_marca
+            eliminadas = [c.document.id for c in cambios if c.type.name == "REMOVED"]
+            modificadas = [c.document for c in cambios if c.type.name != "REMOVED"]
+            if eliminadas:
+                indexar_en_bulk(
+                    {"_op_type": "delete", "_index": self.index_name, "_id": doc_id}
+                    for doc_id in eliminadas
+                )
+            if modificadas:
+                _, errores, estado = self._indexar(modificadas, marca, ids_en_marca)
+                if not errores and estado["marca"] is not None:
+                    marca, ids_en_marca = estado["marca"], estado["ids"]
+                    self.checkpoint.guardar(marca, ids_en_marca)
+
+        return consulta.on_snapshot(al_cambiar)
+
+    def marcar_reindexado_completo(self, inicio):
+        """
+        Tras un reindexado completo, la próxima pasada empieza desde su inicio.
+        """
+        self.checkpoint.guardar(inicio - MARGEN_RELOJ, [])
+
+
+def total_recetas_firestore(db=None):
+    """
+    Recetas que deberían estar en el índice (sin las marcadas como eliminadas),
+    con consultas de agregación count(): no se lee ningún documento.
+    """
+    recetas = (db or firestore_db).collection("recetas")
+    total = recetas.count().get()[0][0].value
+    eliminadas = recetas.where(CAMPO_ELIMINADA, "==", True).count().get()[0][0].value
+    return total - eliminadas
+
+
+def preparar_indice_al_arrancar(alias=ALIAS_RECETAS):
+    """
+    Lo que corre start.sh antes de levantar la app. Solo se reindexa todo si no
+    hay índice o si, después de la sincronización incremental, la cantidad de
+    documentos no coincide con Firestore (p. ej. se perdió el checkpoint).
+    """
+    sincronizador = SincronizadorIncremental(index_name=alias)
+
+    def reindexar(motivo):
+        print(f"🔄 Reindexado completo: {motivo}.")
+        inicio = datetime.now(timezone.utc)
+        resultado = reindexar_blue_green(alias)
+        sincronizador.marcar_reindexado_completo(inicio)
+        return {"accion": "reindexado", "motivo": motivo, **resultado}
+
+    if not client.indices.exists(index=alias):
+        return reindexar("no existe el índice")
+
+    resultado = sincronizador.sincronizar()
+    client.indices.refresh(index=alias)
+    en_indice = client.count(index=alias)["count"]
+    en_firestore = total_recetas_firestore(sincronizador.db)
+    if en_indice != en_firestore:
+        return reindexar(f"el índice tiene {en_indice} recetas y Firestore {en_firestore}")
+
+    print(f"✅ Índice al día ({en_indice} recetas), no hace falta reindexar.")
+    return {"accion": "sincronizado", "sincronizadas": resultado["sincronizadas"], "total": en_indice}
+
+
+if __name__ == "__main__":
+    preparar_indice_al_arrancar()
@@ -0,0 +1,120 @@
+# senales_popularidad.py
+"""
+Señales de popularidad que usa el ranking de /buscar.
+
+Además de los contadores absolutos (views, popup_clicks, likes), cada receta tiene
+en OpenSearch una `tendencia`: la suma de su actividad con decaimiento exponencial
+(vida media TENDENCIA_VIDA_MEDIA_HORAS), junto con `tendencia_actualizada`
+(epoch millis) para saber desde cuándo decae.
+
+- El agregador de contadores manda, en cada vaciado, un update con script por
+  receta: suma los deltas, decae la tendencia hasta ahora y le suma la actividad nueva.
+- decaer_tendencias() hace decaer de una vez (un _update_by_query) las recetas que
+  ya no reciben actividad. Es idempotente: decae desde tendencia_actualizada hasta
+  ahora, así que correrlo desde varios procesos no cambia el resultado.
+"""
+import math
+import os
+import time
+
+from opensearch_client import client
+
+TENDENCIA_VIDA_MEDIA_HORAS = float(os.getenv('TENDENCIA_VIDA_MEDIA_HORAS', 24))
+TENDENCIA_INTERVALO_DECAIMIENTO = float(os.getenv('TENDENCIA_INTERVALO_DECAIMIENTO', 900))  # segundos
+TENDENCIA_MINIMA = float(os.getenv('TENDENCIA_MINIMA', 0.01))  # por debajo se deja en 0
+TENDENCIA_PESO_RANKING = float(os.getenv('TENDENCIA_PESO_RANKING', 0.8))
+
+# Cuánto suma a la tendencia cada evento
+PESOS_TENDENCIA = {"views": 1.0, "popup_clicks": 0.5, "likes": 3.0}
+
+# Constante de decaimiento por milisegundo
+LAMBDA_TENDENCIA = math.log(2) / (TENDENCIA_VIDA_MEDIA_HORAS * 3600 * 1000)
+
+MAPEO_SENALES = {
+    "views": {"type": "integer"},
+    "tendencia": {"type": "float"},
+    "tendencia_actualizada": {"type": "date", "format": "epoch_millis"},
+}
+
+# Función de function_score para la tendencia (se suma a las de likes y clicks)
+FUNCION_TENDENCIA = {
+    "field_value_factor": {
+        "field": "tendencia",
+        "factor": TENDENCIA_PESO_RANKING,
+        "modifier": "log1p",
+        "missing": 0
+    }
+}
+
+_DECAER = (
+    " def previo = ctx._source.tendencia_actualizada;"
+    " double t = ctx._source.tendencia == null ? 0 : ctx._source.tendencia;"
+    " if (previo != null && params.ahora > previo) { t = t * Math.exp(-params.lambda * (params.ahora - previo)); }"
+)
+
+# Suma los incrementos sobre el _source (campos nulos cuentan como 0) y actualiza la tendencia
+SCRIPT_SENALES = (
+    "for (e in params.incrementos.entrySet()) {"
+    " def actual = ctx._source[e.getKey()];"
+    " ctx._source[e.getKey()] = (actual == null ? 0 : actual) + e.getValue();"
+    " }"
+    + _DECAER +
+    " ctx._source.tendencia = Math.max(0.0, t + params.peso);"
+    " ctx._source.tendencia_actualizada = params.ahora;"
+)
+
+SCRIPT_DECAIMIENTO = (
+    _DECAER +
+    " ctx._source.tendencia = t < params.minima ? 0.0 : t;"
+    " ctx._source.tendencia_actualizada = params.ahora;"
+)
+
+
+def ahora_ms():
+    return int(time.time() * 1000)
+
+
+def peso_tendencia(deltas):
+    return sum(PESOS_TENDENCIA.get(campo, 0) * delta for campo, delta in deltas.items())
+
+
+def accion_senales(index_name, receta_id, deltas, ahora=None):
+    """
+    Acción _bulk (update con script) con los deltas acumulados de una receta.
+    """
+    return {
+        "_op_type": "update",
+        "_index": index_name,
+        "_id": receta_id,
+        "script": {
+            "source": SCRIPT_SENALES,
+            "lang": "painless",
+            "params": {
+                "incrementos": dict(deltas),
+                "peso": peso_tendencia(deltas),
+                "ahora": ahora or ahora_ms(),
+                "lambda": LAMBDA_TENDENCIA
+            }
+        }
+    }
+
+
+def decaer_tendencias(index_name, ahora=None):
+    """
+    Un solo _update_by_query que decae la tendencia de todas las recetas que la tienen.
+    Devuelve cuántas se actualizaron.
+    """
+    respuesta = client.update_by_query(
+        index=index_name,
+        body={
+            "query": {"range": {"tendencia": {"gt": 0}}},
+            "script": {
+                "source": SCRIPT_DECAIMIENTO,
+                "lang": "painless",
+                "params": {"ahora": ahora or ahora_ms(), "lambda": LAMBDA_TENDENCIA, "minima": TENDENCIA_MINIMA}
+            }
+        },
+        conflicts="proceed",  # si el agregador la tocó mientras tanto, ya quedó decaída
+        refresh=False
+    )
+    return respuesta.get("updated", 0)
@@ -1,5 +1,5 @@
 #!/bin/bash
 set -e
 pip install -r requirements.txt
-python scripts/firestore_to_opensearch.py  # <-- este lo agregas aquí
+python -m scripts.sincronizacion_incremental  # solo sube lo que cambió desde el último arranque
 python main.py
@@ -0,0 +1,158 @@
+# sugerencias.py
+"""
+Autocompletado para /sugerir con el completion suggester de OpenSearch.
+
+Cada receta se indexa con dos campos completion: `sugerir_titulo` (el título
+original) y `sugerir_ingrediente` (los nombres de sus ingredientes), con un peso
+según su popularidad. El completion suggester responde desde un FST en memoria,
+sin function_score, fuzzy ni rescore: es mucho más barato que /buscar.
+Los prefijos coinciden desde el comienzo del título o del ingrediente, sin
+importar mayúsculas ni acentos (analizador con asciifolding).
+
+Cache por prefijo: cada respuesta queda en un CacheLRU. Si un prefijo más corto
+ya trajo menos resultados que los pedidos (la lista estaba completa), el prefijo
+largo se resuelve filtrando esa lista, sin ir a OpenSearch.
+"""
+import os
+
+from cache_lru import CacheLRU
+from normalizacion import normalizar_texto
+from opensearch_client import async_client
+from resiliencia import llamar, circuito_opensearch, CircuitoAbierto, CERRADO
+
+SUGERIR_MIN_CARACTERES = int(os.getenv('SUGERIR_MIN_CARACTERES', 2))
+SUGERIR_MAX_SIZE = int(os.getenv('SUGERIR_MAX_SIZE', 10))
+SUGERIR_CACHE_MAX = int(os.getenv('SUGERIR_CACHE_MAX', 20000))
+SUGERIR_CACHE_TTL = float(os.getenv('SUGERIR_CACHE_TTL', 300))
+SUGERIR_DEADLINE = float(os.getenv('SUGERIR_DEADLINE', 0.3))
+
+ANALIZADOR_SUGERENCIAS = {
+    "sugerencias_analyzer": {
+        "tokenizer": "standard",
+        "filter": ["lowercase", "asciifolding"]
+    }
+}
+
+MAPEO_SUGERENCIAS = {
+    "sugerir_titulo": {"type": "completion", "analyzer": "sugerencias_analyzer"},
+    "sugerir_ingrediente": {"type": "completion", "analyzer": "sugerencias_analyzer"},
+}
+
+PESO_MAXIMO = 2 ** 31 - 1  # límite de weight en los campos completion
+
+
+def campos_sugerencias(data):
+    """
+    Campos completion de una receta de Firestore (para construir_documento).
+    """
+    peso = min(PESO_MAXIMO, 1 + int(data.get("likes", 0) or 0) + int(data.get("popup_clicks", 0) or 0))
+    campos = {}
+    titulo = (data.get("titulo") or "").strip()
+    if titulo:
+        campos["sugerir_titulo"] = {"input": [titulo], "weight": peso}
+    ingredientes = list(dict.fromkeys(
+        nombre.strip() for nombre in (i.get("nombre") for i in data.get("ingredientes", []))
+        if isinstance(nombre, str) and nombre.strip()
+    ))
+    if ingredientes:
+        campos["sugerir_ingrediente"] = {"input": ingredientes, "weight": peso}
+    return campos
+
+
+def normalizar_prefijo(prefijo):
+    return " ".join(normalizar_texto(prefijo).split())
+
+
+def _cuerpo_sugerencias(prefijo, size):
+    completion = {"size": size, "skip_duplicates": True}
+    return {
+        "_source": False,
+        "size": 0,
+        "suggest": {
+            "recetas": {"prefix": prefijo, "completion": {**completion, "field": "sugerir_titulo"}},
+            "ingredientes": {"prefix": prefijo, "completion": {**completion, "field": "sugerir_ingrediente"}},
+        }
+    }
+
+
+class Sugeridor:
+
+    def __init__(self, index="recetas", max_entradas=SUGERIR_CACHE_MAX, ttl=SUGERIR_CACHE_TTL):
+        self.index = index
+        self.cache = CacheLRU(max_entradas=max_entradas, ttl=ttl)
+        self.consultas_opensearch = 0
+        self.resueltas_por_prefijo = 0
+        self.errores = 0
+
+    def _desde_prefijo_corto(self, prefijo, size):
+        """
+        Filtra la lista de un prefijo más corto si esa lista estaba completa.
+        """
+        for largo in range(len(prefijo) - 1, SUGERIR_MIN_CARACTERES - 1, -1):
+            entrada = self.cache.obtener((prefijo[:largo], size))
+            if entrada is None:
+                continue
+            sugerencias, completa = entrada
+            if not completa:
+                return None  # los prefijos más cortos traen aún más candidatos truncados
+            return {
+                "recetas": [r for r in sugerencias["recetas"] if normalizar_prefijo(r["titulo"]).startswith(prefijo)],
+                "ingredientes": [i for i in sugerencias["ingredientes"] if normalizar_prefijo(i).startswith(prefijo)],
+            }
+        return None
+
+    async def sugerir(self, prefijo, size=5):
+        """
+        {"recetas": [{"id", "titulo"}], "ingredientes": [nombre]} para el prefijo.
+        Si OpenSearch no está disponible lanza CircuitoAbierto o el error de la llamada,
+        sin reintentos: el usuario ya está escribiendo la letra siguiente.
+        """
+        prefijo = normalizar_prefijo(prefijo)
+        if len(prefijo) < SUGERIR_MIN_CARACTERES:
+            return {"recetas": [], "ingredientes": []}
+
+        entrada = self.cache.obtener((prefijo, size))
+        if entrada is not None:
+            return entrada[0]
+
+        sugerencias = self._desde_prefijo_corto(prefijo, size)
+        if sugerencias is not None:
+            self.resueltas_por_prefijo += 1
+            self.cache.guardar((prefijo, size), (sugerencias, True))
+            return sugerencias
+
+        if circuito_opensearch.estado != CERRADO:
+            raise CircuitoAbierto("OpenSearch no está disponible")
+        try:
+            self.consultas_opensearch += 1
+            cuerpo = _cuerpo_sugerencias(prefijo, size)
+            respuesta = await llamar(
+                lambda copia: async_client.search(index=self.index, body=cuerpo),
+                "suggest", deadline=SUGERIR_DEADLINE, reintentos=0, hedge_despues=0
+            )
+        except Exception:
+            self.errores += 1
+            raise
+
+        opciones = {nombre: resultado[0]["options"] for nombre, resultado in respuesta.get("suggest", {}).items()}
+        sugerencias = {
+            "recetas": [{"id": o["_id"], "titulo": o["text"]} for o in opciones.get("recetas", [])],
+            "ingredientes": [o["text"] for o in opciones.get("ingredientes", [])],
+        }
+        completa = all(len(lista) < size for lista in opciones.values())
+        self.cache.guardar((prefijo, size), (sugerencias, completa))
+        return sugerencias
+
+    def invalidar(self):
+        self.cache.invalidar()
+
+    def estadisticas(self):
+        return {
+            "cache": self.cache.estadisticas(),
+            "consultas_opensearch": self.consultas_opensearch,
+            "resueltas_por_prefijo": self.resueltas_por_prefijo,
+            "errores": self.errores,
+        }
+
+
+sugeridor = Sugeridor()
@@ -0,0 +1,62 @@
+# tests/conftest.py
+"""
+Las pruebas corren contra el Firestore en memoria (firestore_local.py) y sin
+OpenSearch: el _bulk se reemplaza por una función que junta las acciones.
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clientes import registro  # noqa: E402
+from firestore_local import ClienteFirestoreLocal  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """
+    Firestore en memoria, también detrás de clientes.db.
+    """
+    local = ClienteFirestoreLocal()
+    registro.reemplazar("firestore", local)
+    yield local
+    registro._instancias.pop("firestore", None)
+
+
+@pytest.fixture
+def bulk(monkeypatch):
+    """
+    Reemplaza indexar_en_bulk en los módulos que lo usan; devuelve las acciones enviadas.
+    """
+    import agregador_contadores
+    from scripts import sincronizacion_incremental
+
+    enviadas = []
+
+    def indexar_en_bulk(acciones, **_):
+        acciones = list(acciones)
+        enviadas.extend(acciones)
+        return len(acciones), []
+
+    monkeypatch.setattr(agregador_contadores, "indexar_en_bulk", indexar_en_bulk)
+    monkeypatch.setattr(sincronizacion_incremental, "indexar_en_bulk", indexar_en_bulk)
+    return enviadas
+
+
+@pytest.fixture
+def circuito(monkeypatch):
+    """
+    Circuit breaker nuevo (cerrado) en los módulos que lo usan.
+    """
+    import buscar_recetas
+    import sugerencias
+    from resiliencia import CircuitBreaker
+
+    nuevo = CircuitBreaker("pruebas", umbral_fallos=2, espera_apertura=60)
+    monkeypatch.setattr(buscar_recetas, "circuito_opensearch", nuevo)
+    monkeypatch.setattr(sugerencias, "circuito_opensearch", nuevo)
+    return nuevo
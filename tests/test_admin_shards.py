@@ -0,0 +1,19 @@
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_configurar_shards_desde_admin(db, monkeypatch):
+    from contadores_distribuidos import ContadoresDistribuidos
+
+    contadores = ContadoresDistribuidos(db, shards_por_defecto=10)
+    monkeypatch.setattr(main.agregador, "contadores", contadores)
+    db.collection("recetas").document("1").set({"titulo": "Sopa"})
+    cliente = TestClient(main.app)
+
+    assert cliente.post("/admin/recetas/1/shards", params={"num_shards": 40}).status_code == 200
+    assert db.collection("recetas").document("1").get().to_dict()["num_shards"] == 40
+    assert contadores.configuracion(["1"]) == {"1": 40}
+
+    assert cliente.post("/admin/recetas/1/shards", params={"num_shards": 20}).status_code == 400
+    assert cliente.post("/admin/recetas/no-existe/shards", params={"num_shards": 20}).status_code == 404
@@ -0,0 +1,70 @@
+from agregador_contadores import AgregadorContadores
+from contadores_distribuidos import ContadoresDistribuidos
+
+
+def test_vaciar_receta_sin_num_shards(db, bulk):
+    # Ninguna receta tiene num_shards salvo que lo escriba configurar_shards
+    db.collection("recetas").document("1").set({"titulo": "Sopa", "views": 10})
+    agregador = AgregadorContadores(db, intervalo_decaimiento=0)
+
+    agregador.incrementar("1", views=3, likes=1)
+    agregador.actualizar_campos("1", {"liked_by.u": True})
+    agregador.registrar_vista("u", "1")
+
+    assert agregador.vaciar() == ["1"]
+    assert agregador.pendiente("1", "views") == 0
+    sumas = ContadoresDistribuidos(db).sumas("1")
+    assert (sumas["views"], sumas["likes"]) == (3, 1)
+    assert db.collection("recetas").document("1").get().to_dict()["liked_by"] == {"u": True}
+    assert db.collection("usuarios").document("u").get().to_dict() == {"vistas": ["1"]}
+    assert [accion["_id"] for accion in bulk] == ["1"]
+
+
+def test_vaciar_descarta_recetas_inexistentes(db, bulk):
+    agregador = AgregadorContadores(db, intervalo_decaimiento=0)
+
+    agregador.incrementar("no-existe", views=1)
+
+    assert agregador.vaciar() == []
+    assert agregador.pendiente("no-existe", "views") == 0
+
+
+def test_lote_fallido_no_devuelve_lo_ya_escrito(db, bulk, monkeypatch):
+    for i in range(600):
+        db.collection("recetas").document(str(i)).set({"titulo": f"Receta {i}"})
+    agregador = AgregadorContadores(db, intervalo_decaimiento=0)
+    for i in range(600):
+        agregador.incrementar(str(i), views=1)
+
+    commit_original, llamadas = agregador._commit, []
+
+    def commit_que_falla_una_vez(escrituras):
+        llamadas.append(len(escrituras))
+        if len(llamadas) == 2:
+            raise RuntimeError("deadline exceeded")
+        commit_original(escrituras)
+
+    monkeypatch.setattr(agregador, "_commit", commit_que_falla_una_vez)
+
+    # El primer lote (500) se escribe; los 100 del segundo vuelven al buffer
+    assert len(agregador.vaciar()) == 500
+    assert sum(agregador.pendiente(str(i), "views") for i in range(600)) == 100
+    assert len(agregador.vaciar()) == 100
+
+    contadores = ContadoresDistribuidos(db)
+    assert sum(contadores.sumas(str(i))["views"] for i in range(600)) == 600
+
+
+def test_solo_los_likes_avisan_al_cambiar_likes(db, bulk):
+    db.collection("recetas").document("1").set({"titulo": "Sopa"})
+    agregador = AgregadorContadores(db, intervalo_decaimiento=0)
+    avisos = []
+    agregador.al_cambiar_likes.append(avisos.append)
+
+    agregador.incrementar("1", views=1, popup_clicks=1)
+    agregador.vaciar()
+    assert avisos == []
+
+    agregador.incrementar("1", views=1, likes=1)
+    agregador.vaciar()
+    assert avisos == [["1"]]
@@ -0,0 +1,63 @@
+import json
+from types import SimpleNamespace
+
+from opensearchpy import exceptions
+
+from scripts import firestore_to_opensearch as reindexado
+
+
+def acciones(n):
+    return [{"_index": "recetas", "_id": str(i), "_source": {"titulo": f"Receta {i}"}} for i in range(n)]
+
+
+def ids_del_body(body):
+    lineas = body.splitlines()
+    return [json.loads(meta)["index"]["_id"] for meta in lineas[::2]]
+
+
+def test_lotes_por_documentos_y_por_bytes():
+    lotes = list(reindexado.generar_lotes(acciones(5), max_docs=2))
+    assert [len(lote) for lote in lotes] == [2, 2, 1]
+
+    peso = len(reindexado._serializar_accion(acciones(1)[0]).encode("utf-8"))
+    lotes = list(reindexado.generar_lotes(acciones(5), max_docs=100, max_bytes=peso * 3 + 10))
+    assert [len(lote) for lote in lotes] == [3, 2]
+
+
+def test_reintenta_solo_los_documentos_rechazados(monkeypatch):
+    enviados = []
+
+    def bulk(body):
+        ids = ids_del_body(body)
+        enviados.append(ids)
+        if len(enviados) == 1:
+            raise exceptions.TransportError(503, "unavailable", {})
+        if len(enviados) == 2:
+            estados = {"1": 429, "2": 400}
+            return {"errors": True, "items": [
+                {"index": {"_id": i, "status": estados.get(i, 201), "error": "x" if i in estados else None}}
+                for i in ids
+            ]}
+        return {"errors": False, "items": [{"index": {"_id": i, "status": 201}} for i in ids]}
+
+    monkeypatch.setattr(reindexado, "client", SimpleNamespace(bulk=bulk))
+    monkeypatch.setattr(reindexado, "_espera_reintento", lambda intento: 0)
+
+    ok, errores = reindexado.enviar_lote(list(reindexado.generar_lotes(acciones(4)))[0])
+
+    assert enviados == [["0", "1", "2", "3"], ["0", "1", "2", "3"], ["1"]]
+    assert ok == 3
+    assert [(e["_id"], e["status"]) for e in errores] == [("2", 400)]
+
+
+def test_reintentos_agotados(monkeypatch):
+    def bulk(body):
+        return {"errors": True, "items": [{"index": {"_id": i, "status": 429}} for i in ids_del_body(body)]}
+
+    monkeypatch.setattr(reindexado, "client", SimpleNamespace(bulk=bulk))
+    monkeypatch.setattr(reindexado, "_espera_reintento", lambda intento: 0)
+
+    ok, errores = reindexado.indexar_en_bulk(acciones(3), max_docs=2, workers=2, max_reintentos=1)
+
+    assert ok == 0
+    assert sorted(e["_id"] for e in errores) == ["0", "1", "2"]
@@ -0,0 +1,47 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import buscar_recetas
+from cache_lru import CacheLRU
+from consultas_frecuentes import ConsultasFrecuentes
+
+
+@pytest.fixture
+def msearch(monkeypatch, circuito):
+    """
+    async_client falso: cada búsqueda del _msearch devuelve un hit con su frase.
+    """
+    enviadas = []
+
+    async def msearch(body):
+        cuerpos = [json.loads(linea) for linea in body.splitlines()[1::2]]
+        frases = [c["rescore"]["query"]["rescore_query"]["multi_match"]["query"] for c in cuerpos]
+        enviadas.append(frases)
+        return {"responses": [{"hits": {"hits": [{"_id": frase, "_source": {}}]}} for frase in frases]}
+
+    monkeypatch.setattr(buscar_recetas, "async_client", SimpleNamespace(msearch=msearch))
+    monkeypatch.setattr(buscar_recetas, "BUSQUEDA_USAR_PLANTILLA", False)
+    monkeypatch.setattr(buscar_recetas, "cache_busquedas", CacheLRU(max_entradas=100))
+    monkeypatch.setattr(buscar_recetas, "consultas_frecuentes", ConsultasFrecuentes(db=None))
+    return enviadas
+
+
+def test_solo_viajan_las_que_no_estan_en_cache(msearch):
+    campos = ("titulo",)
+    asyncio.run(buscar_recetas.buscar_multi_async([("arroz con pollo", 5, 1)], campos))
+    msearch.clear()
+    cache = buscar_recetas.cache_busquedas
+    antes = cache.estadisticas()
+
+    salida = asyncio.run(buscar_recetas.buscar_multi_async(
+        [("Arroz con  pollo", 5, 1), ("sopa de lentejas", 5, 1), ("sopa de lentejas", 5, 1)], campos
+    ))
+
+    assert msearch == [["sopa lentejas"]]
+    assert [item["resultados"][0]["id"] for item in salida] == ["arroz pollo", "sopa lentejas", "sopa lentejas"]
+    despues = cache.estadisticas()
+    # Una búsqueda en el cache por clave distinta: 1 acierto y 1 fallo
+    assert (despues["aciertos"] - antes["aciertos"], despues["fallos"] - antes["fallos"]) == (1, 1)
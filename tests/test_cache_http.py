@@ -0,0 +1,51 @@
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.testclient import TestClient
+
+from cache_http import MiddlewareCacheHTTP, ReglaCache
+
+
+async def etag_fijo(path, query_string, match):
+    return 'W/"v1"'
+
+
+def crear_app():
+    app = FastAPI()
+
+    @app.get("/buscar")
+    def buscar(response: Response, respaldo: bool = False, falta: bool = False):
+        if falta:
+            raise HTTPException(status_code=404, detail="Receta no encontrada")
+        if respaldo:
+            response.headers["Cache-Control"] = "no-store"
+        return {"resultados": []}
+
+    app.add_middleware(MiddlewareCacheHTTP, reglas=[ReglaCache(r"/buscar", 30, etag_fijo)])
+    return TestClient(app)
+
+
+def test_respuesta_normal_cacheable():
+    respuesta = crear_app().get("/buscar")
+
+    assert respuesta.headers["cache-control"] == "public, max-age=30"
+    assert respuesta.headers["etag"] == 'W/"v1"'
+
+
+def test_no_store_del_handler_se_respeta():
+    respuesta = crear_app().get("/buscar", params={"respaldo": "true"})
+
+    assert respuesta.headers["cache-control"] == "no-store"
+    assert "etag" not in respuesta.headers
+
+
+def test_304_con_etag_coincidente():
+    respuesta = crear_app().get("/buscar", headers={"If-None-Match": 'W/"v1"'})
+
+    assert respuesta.status_code == 304
+
+
+def test_404_no_se_cachea():
+    respuesta = crear_app().get("/buscar", params={"falta": "true"})
+
+    assert respuesta.status_code == 404
+    assert respuesta.headers["cache-control"] == "no-store"
+    assert "etag" not in respuesta.headers
@@ -0,0 +1,21 @@
+from cache_recetas import BackendRedis
+from redis_local import RedisLocal
+
+
+def test_invalidar_todo_con_redis_local():
+    backend = BackendRedis(RedisLocal())
+    backend.guardar_varias({"1": {"titulo": "Sopa"}, "2": {"titulo": "Guiso"}})
+    assert set(backend.obtener_varias(["1", "2"])) == {"1", "2"}
+
+    backend.invalidar()
+
+    assert backend.obtener_varias(["1", "2"]) == {}
+
+
+def test_invalidar_algunas_con_redis_local():
+    backend = BackendRedis(RedisLocal())
+    backend.guardar_varias({"1": {"titulo": "Sopa"}, "2": {"titulo": "Guiso"}})
+
+    backend.invalidar(["1"])
+
+    assert backend.obtener_varias(["1", "2"]) == {"2": {"titulo": "Guiso"}}
@@ -0,0 +1,40 @@
+import asyncio
+import json
+
+import calentamiento
+from motor_local import RespaldoLocal
+
+
+def test_snapshot_local_sin_opensearch(tmp_path, monkeypatch):
+    ruta = tmp_path / "snapshot.jsonl"
+    ruta.write_text(json.dumps({"_id": "1", "_source": {"titulo": "Arroz con pollo"}}) + "\n")
+    respaldo = RespaldoLocal(str(ruta))
+    cluster = {"arriba": False}
+
+    async def abrir_conexiones():
+        if not cluster["arriba"]:
+            raise ConnectionError("OpenSearch no responde")
+        return {"abiertas": 1}
+
+    async def nada():
+        return None
+
+    monkeypatch.setattr(calentamiento, "estado", calentamiento.EstadoCalentamiento())
+    monkeypatch.setattr(calentamiento, "respaldo_local", respaldo)
+    monkeypatch.setattr(calentamiento, "crear_clientes", nada)
+    monkeypatch.setattr(calentamiento, "abrir_conexiones", abrir_conexiones)
+    monkeypatch.setattr(calentamiento, "repetir_consultas", nada)
+    monkeypatch.setattr(calentamiento.consultas_frecuentes, "cargar", lambda: 0)
+
+    async def arrancar():
+        tarea = asyncio.create_task(calentamiento.calentar())
+        while not calentamiento.estado.listo:
+            await asyncio.sleep(0.01)
+        # Lista en modo degradado antes de que OpenSearch responda
+        assert calentamiento.estado.degradado
+        assert respaldo.disponible
+        cluster["arriba"] = True
+        await asyncio.wait_for(tarea, 5)
+
+    asyncio.run(arrancar())
+    assert calentamiento.estado.listo and not calentamiento.estado.degradado
@@ -0,0 +1,39 @@
+from constructor_consultas import ConstructorConsultas
+from normalizacion import limpiar_consulta
+
+SINONIMOS = {
+    "azúcar refinado": ["azúcar", "azucar"],
+    "azucar": ["endulzante"],
+    "azúcar": ["Endulzante", "panela"],
+    "diente de ajo": ["ajo", "diente de ajo"],
+    "ajo": ["diente de ajo", "ajo fresco"],
+}
+
+
+def constructor():
+    return ConstructorConsultas(SINONIMOS, tokenizar=lambda texto: limpiar_consulta(texto).split())
+
+
+def consultas(expandida):
+    return [clausula["multi_match"]["query"] for clausula in expandida["bool"]["must"]]
+
+
+def test_frases_y_sinonimos_sin_acentos_ni_repetidos():
+    assert consultas(constructor().expandir("azucar refinado")) == ["azucar refinado"]
+    assert consultas(constructor().expandir("Azúcar refinado")) == ["azucar refinado"]
+    # Las claves que se normalizan igual juntan sus sinónimos
+    assert constructor().segmentar("azúcar") == (("azucar", ("endulzante", "panela")),)
+
+
+def test_frase_de_varias_palabras_gana_a_la_palabra_suelta():
+    c = constructor()
+    assert c.segmentar("quiero un diente de ajo") == (("diente ajo", ("ajo",)),)
+    assert c.segmentar("ajo y sal") == (("ajo", ("diente ajo", "ajo fresco")), ("sal", ()))
+    assert consultas(c.expandir("ajo")) == ["ajo diente fresco"]
+
+
+def test_plantilla_usa_el_mismo_texto_que_la_clausula():
+    import buscar_recetas
+
+    textos = [c["texto"] for c in buscar_recetas.parametros_plantilla("ajo")["clausulas"]]
+    assert textos == consultas(buscar_recetas.expandir_con_sinonimos("ajo"))
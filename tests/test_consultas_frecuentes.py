@@ -0,0 +1,25 @@
+from consultas_frecuentes import ConsultasFrecuentes
+
+
+def test_top_sobrevive_al_reinicio_en_firestore(db):
+    anterior = ConsultasFrecuentes(db=db)
+    for _ in range(3):
+        anterior.registrar("arroz", 5, 0, None)
+    anterior.registrar("sopa", 5, 0, ["titulo"])
+
+    assert anterior.guardar() == 2
+
+    # Dyno nuevo: nada en disco, el top sale de Firestore
+    nuevo = ConsultasFrecuentes(db=db)
+    assert nuevo.cargar() == 2
+    assert nuevo.top(2) == [("arroz", 5, 0, None), ("sopa", 5, 0, ("titulo",))]
+
+
+def test_archivo_local_opcional(db, tmp_path):
+    ruta = str(tmp_path / "consultas.json")
+    anterior = ConsultasFrecuentes(ruta=ruta, db=db)
+    anterior.registrar("arroz", 5, 0, None)
+    anterior.guardar()
+
+    assert ConsultasFrecuentes(ruta=ruta, db=db).cargar() == 1
+    assert ConsultasFrecuentes(db=db).cargar() == 0
@@ -0,0 +1,32 @@
+import json
+
+import buscar_recetas
+from buscar_recetas import VISTAS, cuerpo_busqueda_json
+
+
+def test_cuerpo_memorizado_por_query_pagina_y_campos():
+    cuerpo_busqueda_json.cache_clear()
+
+    primero = cuerpo_busqueda_json("arroz pollo", 0, 5, VISTAS["card"])
+    assert cuerpo_busqueda_json("arroz pollo", 0, 5, VISTAS["card"]) is primero
+    assert cuerpo_busqueda_json.cache_info().hits == 1
+
+    # Cada parte de la clave da otro cuerpo
+    distintos = {
+        primero,
+        cuerpo_busqueda_json("arroz", 0, 5, VISTAS["card"]),
+        cuerpo_busqueda_json("arroz pollo", 5, 5, VISTAS["card"]),
+        cuerpo_busqueda_json("arroz pollo", 0, 10, VISTAS["card"]),
+        cuerpo_busqueda_json("arroz pollo", 0, 5, VISTAS["full"]),
+        cuerpo_busqueda_json("arroz pollo", 0, 5, ()),
+    }
+    assert len(distintos) == 6
+    assert cuerpo_busqueda_json.cache_info().misses == 6
+
+
+def test_cuerpo_memorizado_igual_al_construido():
+    cuerpo = json.loads(cuerpo_busqueda_json("arroz pollo", 10, 5, ("titulo",)))
+
+    assert cuerpo == buscar_recetas.construir_cuerpo_busqueda("arroz pollo", desde=10, size=5, campos=("titulo",))
+    assert cuerpo["from"] == 10 and cuerpo["_source"] == [buscar_recetas.CAMPOS_FUENTE.get("titulo", "titulo")]
+    assert cuerpo["rescore"]["window_size"] == max(buscar_recetas.RESCORE_VENTANA_MIN, 15)
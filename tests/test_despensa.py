@@ -0,0 +1,76 @@
+import asyncio
+import json
+import math
+from types import SimpleNamespace
+
+import buscar_recetas
+from despensa import DESPENSA_COBERTURA_MINIMA, campos_despensa, construir_cuerpo_despensa, terminos_despensa
+
+RECETAS = {
+    "tortilla": {"titulo": "Tortilla", "ingredientes": ["Huevo", "Papa", "Cebolla"], "likes": 0},
+    "huevo-frito": {"titulo": "Huevo frito", "ingredientes": ["Huevo", "Aceite de oliva"], "likes": 50},
+    "guiso": {"titulo": "Guiso", "ingredientes": ["Carne", "Papa", "Zanahoria", "Cebolla", "Arvejas"], "likes": 0},
+}
+
+
+def indice():
+    return {
+        receta_id: {"titulo": receta["titulo"], "likes": receta["likes"], **campos_despensa(receta["ingredientes"])}
+        for receta_id, receta in RECETAS.items()
+    }
+
+
+def evaluar(body, documentos):
+    """
+    Lo que haría OpenSearch con el cuerpo: filtro terms_set, un punto por
+    ingrediente presente y cobertura + popularidad.
+    """
+    consulta = body["query"]["function_score"]
+    terms_set = consulta["query"]["bool"]["filter"][0]["terms_set"]["ingredientes_claves"]
+    parametros = terms_set["minimum_should_match_script"]["params"]
+    peso = consulta["script_score"]["script"]["params"]["peso_popularidad"]
+    hits = []
+    for receta_id, doc in documentos.items():
+        n = doc["num_ingredientes"] or 1
+        presentes = len(set(doc["ingredientes_claves"]) & set(terms_set["terms"]))
+        minimo = max(1, min(parametros["despensa"], math.ceil(n * parametros["cobertura"])))
+        if presentes < minimo:
+            continue
+        score = min(1.0, presentes / n) + peso * math.log10(1 + doc["likes"])
+        hits.append({"_id": receta_id, "_score": score, "_source": doc})
+    hits.sort(key=lambda hit: -hit["_score"])
+    return hits[body["from"]:body["from"] + body["size"]]
+
+
+def test_cuerpo_terms_set():
+    candidatos, cantidad = terminos_despensa("huevo, papa y aceite de oliva", buscar_recetas.constructor_consultas.segmentar)
+    body = construir_cuerpo_despensa(candidatos, cantidad, size=10)
+
+    assert {"huevo", "papa", "aceite oliva"} <= set(candidatos)
+    assert cantidad == 3
+    terms_set = body["query"]["function_score"]["query"]["bool"]["filter"][0]["terms_set"]["ingredientes_claves"]
+    assert terms_set["terms"] == candidatos
+    assert terms_set["minimum_should_match_script"]["params"] == {"despensa": 3, "cobertura": DESPENSA_COBERTURA_MINIMA}
+    assert len(body["query"]["function_score"]["query"]["bool"]["should"]) == len(candidatos)
+    assert body["query"]["function_score"]["boost_mode"] == "replace"
+
+
+def test_ranking_por_cobertura(monkeypatch, circuito):
+    documentos = indice()
+
+    async def search(index, body, preference=None):
+        return {"hits": {"hits": evaluar(json.loads(body), documentos)}}
+
+    monkeypatch.setattr(buscar_recetas, "async_client", SimpleNamespace(search=search))
+
+    def buscar(despensa):
+        return asyncio.run(buscar_recetas.buscar_despensa_async(despensa, size=10, campos=("titulo",)))
+
+    resultados = buscar("huevo, cebolla y aceite de oliva")
+    # El guiso (1 de 5) no llega a la cobertura mínima; a la tortilla le falta la papa
+    assert [r["id"] for r in resultados] == ["huevo-frito", "tortilla"]
+    assert (resultados[1]["cobertura"], resultados[1]["ingredientes_faltantes"]) == (0.667, ["papa"])
+
+    # Con la misma cobertura desempata la popularidad
+    resultados = buscar("huevo, papa, cebolla y aceite de oliva")
+    assert [(r["id"], r["cobertura"]) for r in resultados] == [("huevo-frito", 1.0), ("tortilla", 1.0)]
@@ -0,0 +1,30 @@
+import pytest
+
+from clientes import db as db_clientes
+
+
+def test_get_de_campo_faltante_lanza_key_error(db):
+    db.collection("recetas").document("1").set({"titulo": "Sopa", "meta": {"a": 1}})
+    snapshot = db.collection("recetas").document("1").get()
+
+    assert snapshot.get("titulo") == "Sopa"
+    assert snapshot.get("meta.a") == 1
+    with pytest.raises(KeyError):
+        snapshot.get("num_shards")
+    with pytest.raises(KeyError):
+        snapshot.get("meta.b")
+    assert (snapshot.to_dict() or {}).get("num_shards") is None
+
+
+def test_documento_inexistente(db):
+    snapshot = db.collection("recetas").document("no-existe").get()
+
+    assert not snapshot.exists
+    assert snapshot.get("titulo") is None
+    assert snapshot.to_dict() is None
+
+
+def test_registro_inyecta_el_cliente_local(db):
+    db.collection("recetas").document("1").set({"titulo": "Sopa"})
+
+    assert db_clientes.collection("recetas").document("1").get().to_dict() == {"titulo": "Sopa"}
@@ -0,0 +1,34 @@
+import pytest
+
+from agregador_contadores import AgregadorContadores
+from motor_likes import MotorLikes
+
+
+@pytest.fixture
+def motor(db, bulk):
+    agregador = AgregadorContadores(db, intervalo_decaimiento=0)
+    return MotorLikes(db, agregador)
+
+
+def test_like_de_usuario_sin_likes(db, motor):
+    db.collection("recetas").document("1").set({"titulo": "Sopa", "likes": 4})
+    # Usuario creado por el agregador de vistas: sin `likes` ni `likes_migrados`
+    db.collection("usuarios").document("u").set({"vistas": ["1"]})
+
+    assert motor.dar("1", "u") == (1, 5)
+    assert motor.quitar("1", "u") == (-1, 4)
+
+
+def test_like_de_usuario_nuevo(db, motor):
+    db.collection("recetas").document("1").set({"titulo": "Sopa"})
+
+    assert motor.dar("1", "nuevo") == (1, 1)
+    assert motor.dar("1", "nuevo") == (0, 1)
+
+
+def test_like_legado_en_el_array_cuenta(db, motor):
+    db.collection("recetas").document("1").set({"titulo": "Sopa", "likes": 1})
+    db.collection("usuarios").document("legado").set({"likes": ["1"]})
+
+    assert motor.dar("1", "legado")[0] == 0
+    assert motor.quitar("1", "legado") == (-1, 0)
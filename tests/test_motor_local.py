@@ -0,0 +1,30 @@
+import os
+
+import motor_local
+from motor_local import RespaldoLocal
+
+DOCUMENTOS = [
+    {"_id": "1", "_source": {"titulo": "Arroz con pollo", "ingredientes_texto": "arroz pollo", "likes": 3}},
+    {"_id": "2", "_source": {"titulo": "Sopa de lentejas", "ingredientes_texto": "lentejas cebolla", "likes": 0}},
+]
+
+
+def test_necesita_snapshot(tmp_path):
+    respaldo = RespaldoLocal(str(tmp_path / "snapshot.jsonl"))
+    assert respaldo.necesita_snapshot()
+
+    (tmp_path / "snapshot.jsonl").write_text("")
+    assert not respaldo.necesita_snapshot()
+    os.utime(respaldo.ruta, (0, 0))
+    assert respaldo.necesita_snapshot(max_edad=60)
+    assert not RespaldoLocal(None).necesita_snapshot()
+
+
+def test_exportar_desde_indice(tmp_path, monkeypatch):
+    monkeypatch.setattr(motor_local.helpers, "scan", lambda client, index, **_: iter(DOCUMENTOS))
+    respaldo = RespaldoLocal(str(tmp_path / "snapshot.jsonl"))
+
+    assert respaldo.exportar_desde_indice(client=None) == 2
+    assert not respaldo.necesita_snapshot()
+    assert [hit["_id"] for hit in respaldo.buscar([("pollo", ())])] == ["1"]
+    assert os.listdir(tmp_path) == ["snapshot.jsonl"]
@@ -0,0 +1,66 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import buscar_recetas
+
+# Empates de score a propósito: solo _id los ordena
+PUNTAJES = {"a": 3.0, "b": 2.0, "c": 2.0, "d": 2.0, "e": 1.0}
+
+
+@pytest.fixture
+def cluster(monkeypatch, circuito):
+    """
+    async_client falso con PIT: ordena por el sort del body y respeta search_after.
+    """
+    estado = SimpleNamespace(cuerpos=[], cerrados=[])
+
+    async def create_point_in_time(index, keep_alive):
+        return {"pit_id": "pit-1"}
+
+    async def search(body):
+        estado.cuerpos.append(body)
+        assert body["sort"] == [{"_score": "desc"}, {"_id": "asc"}]
+        hits = sorted(({"_id": i, "_score": s, "sort": [s, i], "_source": {"titulo": i}} for i, s in PUNTAJES.items()),
+                      key=lambda hit: (-hit["_score"], hit["_id"]))
+        if "search_after" in body:
+            score, ultimo = body["search_after"]
+            hits = [hit for hit in hits if (-hit["_score"], hit["_id"]) > (-score, ultimo)]
+        return {"pit_id": body["pit"]["id"], "hits": {"hits": hits[:body["size"]]}}
+
+    async def delete_point_in_time(body):
+        estado.cerrados.extend(body["pit_id"])
+
+    monkeypatch.setattr(buscar_recetas, "async_client", SimpleNamespace(
+        create_point_in_time=create_point_in_time, search=search, delete_point_in_time=delete_point_in_time
+    ))
+    return estado
+
+
+def test_cursor_ida_y_vuelta():
+    cursor = buscar_recetas.codificar_cursor("arroz pollo", "pit-1", [2.0, "c"])
+    assert buscar_recetas.decodificar_cursor(cursor) == ("arroz pollo", "pit-1", [2.0, "c"])
+    with pytest.raises(ValueError):
+        buscar_recetas.decodificar_cursor("no-es-un-cursor")
+
+
+def test_recorre_todo_sin_repetir_con_empates(cluster):
+    async def recorrer():
+        ids, cursor, paginas = [], None, 0
+        while True:
+            query, resultados, cursor = await buscar_recetas.buscar_pagina_profunda_async(
+                "arroz con pollo", size=2, cursor=cursor, campos=("titulo",)
+            )
+            assert query == "arroz pollo"
+            ids.extend(receta["id"] for receta in resultados)
+            paginas += 1
+            if cursor is None:
+                return ids, paginas
+
+    ids, paginas = asyncio.run(recorrer())
+
+    assert ids == ["a", "b", "c", "d", "e"]
+    assert paginas == 3
+    assert cluster.cuerpos[1]["search_after"] == [2.0, "b"]
+    assert cluster.cerrados == ["pit-1"]
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import pytest
+
+from scripts import firestore_to_opensearch as reindexado
+from scripts import sincronizacion_incremental as sincronizacion
+
+
+@pytest.fixture
+def indice(db, monkeypatch):
+    """
+    Un índice de OpenSearch en memoria ({_id: _source}) detrás del alias "recetas".
+    """
+    documentos, estado = {}, {"existe": False, "reindexados": 0}
+
+    def indexar_en_bulk(acciones, **_):
+        ok = 0
+        for accion in acciones:
+            if accion.get("_op_type") == "delete":
+                documentos.pop(accion["_id"], None)
+            else:
+                documentos[accion["_id"]] = accion.get("_source") or accion.get("doc")
+            ok += 1
+        return ok, []
+
+    def activar_indice(index_name, alias):
+        estado["existe"] = True
+        estado["reindexados"] += 1
+
+    cliente = SimpleNamespace(
+        indices=SimpleNamespace(
+            exists=lambda index: estado["existe"],
+            refresh=lambda index: None,
+            delete=lambda index, **_: None,
+        ),
+        count=lambda index: {"count": len(documentos)},
+    )
+    monkeypatch.setattr(sincronizacion, "client", cliente)
+    monkeypatch.setattr(reindexado, "client", cliente)
+    monkeypatch.setattr(sincronizacion, "indexar_en_bulk", indexar_en_bulk)
+    monkeypatch.setattr(reindexado, "indexar_en_bulk", indexar_en_bulk)
+    monkeypatch.setattr(reindexado, "siguiente_indice_versionado", lambda alias: "recetas_v1")
+    monkeypatch.setattr(reindexado, "crear_indice_con_sinonimos", lambda **_: None)
+    monkeypatch.setattr(reindexado, "copiar_senales", lambda origen, destino: 0)
+    monkeypatch.setattr(reindexado, "activar_indice", activar_indice)
+    monkeypatch.setattr(reindexado, "limpiar_versiones_antiguas", lambda alias: [])
+    monkeypatch.setattr(reindexado.respaldo_local, "ruta", None)
+    return SimpleNamespace(documentos=documentos, estado=estado)
+
+
+def test_segundo_arranque_no_reindexa(db, indice):
+    db.collection("recetas").document("1").set({"titulo": "Sopa"})
+    db.collection("recetas").document("2").set({"titulo": "Guiso"})
+    db.collection("recetas").document("3").set({"titulo": "Tarta", "eliminada": True})
+
+    assert sincronizacion.preparar_indice_al_arrancar()["accion"] == "reindexado"
+    assert sorted(indice.documentos) == ["1", "2"]
+
+    resultado = sincronizacion.preparar_indice_al_arrancar()
+
+    assert resultado == {"accion": "sincronizado", "sincronizadas": 0, "total": 2}
+    assert indice.estado["reindexados"] == 1
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import pytest
+
+from scripts import firestore_to_opensearch as reindexado
+
+
+@pytest.fixture
+def opensearch(db, monkeypatch):
+    """
+    Lo mínimo de OpenSearch para reindexar_blue_green; anota qué se hizo.
+    """
+    hechos = {"borrados": [], "activados": []}
+    indices = SimpleNamespace(delete=lambda index, **_: hechos["borrados"].append(index))
+    monkeypatch.setattr(reindexado, "client", SimpleNamespace(indices=indices))
+    monkeypatch.setattr(reindexado, "siguiente_indice_versionado", lambda alias: "recetas_v2")
+    monkeypatch.setattr(reindexado, "crear_indice_con_sinonimos", lambda **_: None)
+    monkeypatch.setattr(reindexado, "copiar_senales", lambda origen, destino: 0)
+    monkeypatch.setattr(reindexado, "activar_indice", lambda indice, alias: hechos["activados"].append(indice))
+    monkeypatch.setattr(reindexado, "limpiar_versiones_antiguas", lambda alias: [])
+    monkeypatch.setattr(reindexado.respaldo_local, "ruta", None)
+    for i in range(3):
+        db.collection("recetas").document(str(i)).set({"titulo": f"Receta {i}"})
+    return hechos
+
+
+def test_carga_completa_activa_el_indice(opensearch, monkeypatch):
+    monkeypatch.setattr(reindexado, "indexar_en_bulk", lambda acciones: (len(list(acciones)), []))
+
+    assert reindexado.reindexar_blue_green()["total"] == 3
+    assert opensearch == {"borrados": [], "activados": ["recetas_v2"]}
+
+
+def test_carga_con_errores_no_cambia_el_alias(opensearch, monkeypatch):
+    def indexar_en_bulk(acciones):
+        acciones = list(acciones)
+        return len(acciones) - 1, [{"index": {"_id": acciones[-1]["_id"], "status": 400}}]
+
+    monkeypatch.setattr(reindexado, "indexar_en_bulk", indexar_en_bulk)
+
+    with pytest.raises(RuntimeError, match="2 de 3"):
+        reindexado.reindexar_blue_green()
+    assert opensearch == {"borrados": ["recetas_v2"], "activados": []}
+
+
+def test_recetas_eliminadas_no_se_reindexan(db, opensearch, monkeypatch, tmp_path):
+    db.collection("recetas").document("borrada").set({"titulo": "Vieja", "eliminada": True})
+    indexadas = []
+
+    def indexar_en_bulk(acciones):
+        indexadas.extend(accion["_id"] for accion in acciones)
+        return len(indexadas), []
+
+    monkeypatch.setattr(reindexado, "indexar_en_bulk", indexar_en_bulk)
+    monkeypatch.setattr(reindexado.respaldo_local, "ruta", str(tmp_path / "snapshot.jsonl"))
+
+    assert reindexado.reindexar_blue_green()["total"] == 3
+    assert sorted(indexadas) == ["0", "1", "2"]
+    assert sorted(reindexado.respaldo_local.motor.ids) == ["0", "1", "2"]
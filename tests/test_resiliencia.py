@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import pytest
+from opensearchpy import exceptions
+
+from resiliencia import (ABIERTO, CERRADO, SEMIABIERTO, CircuitBreaker, CircuitoAbierto, PlazoVencido,
+                         llamar, llamar_con_circuito)
+
+
+def falla_de_conexion():
+    return exceptions.ConnectionError("N/A", "connection refused", None)
+
+
+def abrir(circuito):
+    circuito.registrar_fallo()
+    circuito.registrar_fallo()
+    assert circuito.estado == ABIERTO
+
+
+def test_abierto_semiabierto_cerrado():
+    circuito = CircuitBreaker("pruebas", umbral_fallos=2, espera_apertura=60)
+    abrir(circuito)
+    assert not circuito.permite()
+
+    circuito.abierto_en -= 60
+    assert circuito.permite()
+    assert circuito.estado == SEMIABIERTO
+    assert not circuito.permite()  # una sola prueba a la vez
+
+    circuito.registrar_exito()
+    assert circuito.estado == CERRADO
+    assert circuito.permite()
+
+
+def test_prueba_fallida_vuelve_a_abrir():
+    circuito = CircuitBreaker("pruebas", umbral_fallos=2, espera_apertura=60)
+    abrir(circuito)
+    circuito.abierto_en -= 60
+
+    async def falla(copia):
+        raise falla_de_conexion()
+
+    with pytest.raises(exceptions.ConnectionError):
+        asyncio.run(llamar_con_circuito(circuito, falla, "pruebas", reintentos=0))
+    assert circuito.estado == ABIERTO
+    with pytest.raises(CircuitoAbierto):
+        asyncio.run(llamar_con_circuito(circuito, falla, "pruebas", reintentos=0))
+
+
+def test_prueba_cancelada_libera_el_semiabierto():
+    circuito = CircuitBreaker("pruebas", umbral_fallos=2, espera_apertura=60)
+    abrir(circuito)
+    circuito.abierto_en -= 60
+
+    async def colgada(copia):
+        await asyncio.sleep(10)
+
+    async def cancelar_la_prueba():
+        tarea = asyncio.ensure_future(llamar_con_circuito(circuito, colgada, "pruebas"))
+        await asyncio.sleep(0.01)
+        tarea.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarea
+
+    asyncio.run(cancelar_la_prueba())
+
+    assert circuito.estado == SEMIABIERTO
+    assert circuito.permite()  # la siguiente llamada puede volver a probar
+
+
+def test_plazo_vencido():
+    async def lenta(copia):
+        await asyncio.sleep(1)
+
+    inicio = time.monotonic()
+    with pytest.raises(PlazoVencido):
+        asyncio.run(llamar(lenta, "pruebas", deadline=0.05, hedge_despues=0))
+    assert time.monotonic() - inicio < 0.5
+
+
+def test_gana_la_copia_de_cobertura():
+    copias = []
+
+    async def original_lenta(copia):
+        copias.append(copia)
+        await asyncio.sleep(1 if copia == 0 else 0)
+        return copia
+
+    assert asyncio.run(llamar(original_lenta, "pruebas", deadline=0.5, hedge_despues=0.02)) == 1
+    assert copias == [0, 1]
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from scripts.sincronizacion_incremental import CheckpointFirestore, SincronizadorIncremental
+
+
+def test_primera_pasada_sin_campo_de_marca(db, bulk):
+    # Las recetas existentes no tienen `actualizado_en`
+    db.collection("recetas").document("1").set({"titulo": "Sopa de lentejas"})
+    db.collection("recetas").document("2").set({"titulo": "Arroz con pollo", "eliminada": True})
+    sincronizador = SincronizadorIncremental(db=db, checkpoint=CheckpointFirestore(db))
+
+    resultado = sincronizador.sincronizar()
+
+    assert resultado["sincronizadas"] == 2
+    assert resultado["eliminadas"] == 1
+    assert sorted((accion["_op_type"], accion["_id"]) for accion in bulk) == [("delete", "2"), ("update", "1")]
+    marca, ids = sincronizador.checkpoint.leer()
+    assert marca is not None and ids == []
+
+
+def test_pasada_incremental_desde_la_marca(db, bulk):
+    ahora = datetime.now(timezone.utc)
+    db.collection("recetas").document("viejo").set({"titulo": "Sopa", "actualizado_en": ahora - timedelta(days=1)})
+    db.collection("recetas").document("nuevo").set({"titulo": "Guiso", "actualizado_en": ahora})
+    db.collection("recetas").document("sin-marca").set({"titulo": "Tarta"})
+    sincronizador = SincronizadorIncremental(db=db, checkpoint=CheckpointFirestore(db))
+    sincronizador.checkpoint.guardar(ahora - timedelta(hours=1), [])
+
+    resultado = sincronizador.sincronizar()
+
+    assert [accion["_id"] for accion in bulk] == ["nuevo"]
+    assert resultado["marca"] == ahora
+    assert sincronizador.checkpoint.leer() == (ahora, ["nuevo"])
+
+    bulk.clear()
+    assert sincronizador.sincronizar()["sincronizadas"] == 0
+    assert bulk == []
+
+
+def _con_shards(db, receta_id, datos, views):
+    db.collection("recetas").document(receta_id).set(datos)
+    db.collection("recetas").document(receta_id).collection("contadores_shards").document("0").set({"views": views})
+
+
+def test_sumas_de_shards_una_vez_por_pagina(db, bulk, monkeypatch):
+    ahora = datetime.now(timezone.utc)
+    for i in range(5):
+        _con_shards(db, str(i), {"titulo": f"Receta {i}", "views": 1, "actualizado_en": ahora}, views=i)
+    sincronizador = SincronizadorIncremental(db=db, checkpoint=CheckpointFirestore(db), tamano_pagina=2)
+    sincronizador.checkpoint.guardar(ahora - timedelta(hours=1), [])
+    contadores = sincronizador.contadores
+    paginas = []
+    sumas_varias = contadores.sumas_varias
+    monkeypatch.setattr(contadores, "sumas_varias", lambda recetas: paginas.append(len(recetas)) or sumas_varias(recetas))
+    monkeypatch.setattr(contadores, "sumas", lambda receta_id: pytest.fail("lectura de shards por receta"))
+
+    sincronizador.sincronizar()
+
+    assert paginas == [2, 2, 1]
+    assert {accion["_id"]: accion["doc"]["views"] for accion in bulk} == {str(i): 1 + i for i in range(5)}
+
+
+def test_pasada_completa_suma_todos_los_shards_juntos(db, bulk, monkeypatch):
+    for i in range(3):
+        _con_shards(db, str(i), {"titulo": f"Receta {i}"}, views=i + 1)
+    sincronizador = SincronizadorIncremental(db=db, checkpoint=CheckpointFirestore(db), tamano_pagina=2)
+    contadores = sincronizador.contadores
+    monkeypatch.setattr(contadores, "sumas_varias", lambda recetas: pytest.fail("get_all por página"))
+    monkeypatch.setattr(contadores, "sumas", lambda receta_id: pytest.fail("lectura de shards por receta"))
+
+    sincronizador.sincronizar()
+
+    assert {accion["_id"]: accion["doc"]["views"] for accion in bulk} == {"0": 1, "1": 2, "2": 3}
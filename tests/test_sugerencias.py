@@ -0,0 +1,58 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import sugerencias
+from sugerencias import Sugeridor
+
+TITULOS = {"1": "Arroz con pollo", "2": "Árroz al horno", "3": "Arepas", "4": "Sopa de arroz"}
+INGREDIENTES = ["Arroz", "Arvejas", "Aceite"]
+
+
+@pytest.fixture
+def suggest(monkeypatch, circuito):
+    """
+    async_client falso para el completion suggester; anota los prefijos pedidos.
+    """
+    pedidos = []
+
+    async def search(index, body):
+        sugerir = body["suggest"]
+        prefijo = sugerir["recetas"]["prefix"]
+        size = sugerir["recetas"]["completion"]["size"]
+        pedidos.append(prefijo)
+        recetas = [{"_id": i, "text": t} for i, t in TITULOS.items()
+                   if sugerencias.normalizar_prefijo(t).startswith(prefijo)]
+        ingredientes = [{"_id": "x", "text": n} for n in INGREDIENTES
+                        if sugerencias.normalizar_prefijo(n).startswith(prefijo)]
+        return {"suggest": {"recetas": [{"options": recetas[:size]}],
+                            "ingredientes": [{"options": ingredientes[:size]}]}}
+
+    monkeypatch.setattr(sugerencias, "async_client", SimpleNamespace(search=search))
+    return pedidos
+
+
+def test_prefijo_largo_sale_de_la_lista_completa(suggest):
+    sugeridor = Sugeridor()
+
+    asyncio.run(sugeridor.sugerir("ar", size=5))
+    resultado = asyncio.run(sugeridor.sugerir("Arr", size=5))
+
+    assert suggest == ["ar"]
+    assert resultado == {
+        "recetas": [{"id": "1", "titulo": "Arroz con pollo"}, {"id": "2", "titulo": "Árroz al horno"}],
+        "ingredientes": ["Arroz"],
+    }
+    assert sugeridor.resueltas_por_prefijo == 1
+
+
+def test_lista_truncada_no_sirve_para_el_prefijo_largo(suggest):
+    sugeridor = Sugeridor()
+
+    asyncio.run(sugeridor.sugerir("ar", size=2))
+    asyncio.run(sugeridor.sugerir("arr", size=2))
+    asyncio.run(sugeridor.sugerir("arr", size=2))
+
+    assert suggest == ["ar", "arr"]  # la segunda "arr" sale del cache
+    assert sugeridor.resueltas_por_prefijo == 0
@@ -0,0 +1,53 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import buscar_recetas
+
+
+@pytest.fixture
+def get_alias(monkeypatch, circuito):
+    """
+    async_client falso: get_alias tarda `demora` segundos; cuenta las llamadas.
+    """
+    estado = SimpleNamespace(llamadas=0, demora=0.01, indices={"recetas_v3": {}})
+
+    async def pedir(name):
+        estado.llamadas += 1
+        await asyncio.sleep(estado.demora)
+        return estado.indices
+
+    monkeypatch.setattr(buscar_recetas, "async_client", SimpleNamespace(indices=SimpleNamespace(get_alias=pedir)))
+    monkeypatch.setattr(buscar_recetas, "_ultima_version", {})
+    buscar_recetas.invalidar_version_indice()
+    yield estado
+    buscar_recetas.invalidar_version_indice()
+
+
+def test_una_sola_llamada_en_curso(get_alias):
+    async def varias():
+        return await asyncio.gather(*(buscar_recetas.version_indice_async() for _ in range(20)))
+
+    assert set(asyncio.run(varias())) == {"recetas_v3"}
+    assert get_alias.llamadas == 1
+
+
+def test_circuito_abierto_usa_la_ultima_version(get_alias, circuito):
+    asyncio.run(buscar_recetas.version_indice_async())
+    buscar_recetas.invalidar_version_indice()
+    circuito.registrar_fallo()
+    circuito.registrar_fallo()
+
+    assert asyncio.run(buscar_recetas.version_indice_async()) == "recetas_v3"
+    assert get_alias.llamadas == 1
+
+
+def test_cluster_lento_no_bloquea(get_alias, circuito):
+    get_alias.demora = 5
+    inicio = time.monotonic()
+
+    assert asyncio.run(buscar_recetas.version_indice_async()) == "recetas"
+    assert time.monotonic() - inicio < 1
+    assert circuito.fallos == 1